@@ -0,0 +1,178 @@
+# batch_evaluate.py
+# Concurrent, resumable evaluation of the FinPal agent over the test query set.
+#
+# Queries run on a worker pool (one fresh FinPalAgent per query, so runs are independent),
+# optionally throttled to a maximum request rate. Each result is appended to a JSONL checkpoint
+# as soon as it completes, so an interrupted run picks up where it stopped when started again.
+# At the end the checkpoint is exported to the usual test_results.csv layout, with latency,
+# step count and tool calls added.
+#
+#   python batch_evaluate.py --workers 4 --rate-limit 2          # real Mistral + OpenSearch
+#   python batch_evaluate.py --offline                           # deterministic fakes, no network
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "finchat_app"))
+
+from test_queries import test_queries
+
+
+class RateLimiter:
+    """Spaces calls to `acquire` at least 1/rate seconds apart, across all worker threads."""
+
+    def __init__(self, rate_per_second: Optional[float]):
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """Append-only JSONL file of finished results; every line is flushed to disk as it is written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        results: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return results
+        damaged = False
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    damaged = True # A line cut short by a crash; that query simply runs again
+                    continue
+                results[record["query_id"]] = record
+        if damaged:
+            # Rewrite without the broken line, so new records do not get appended onto it
+            with open(self.path, "w", encoding="utf-8") as f:
+                for record in results.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return results
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def evaluate_query(query_id: int, user_input: str, agent_factory, limiter: RateLimiter, max_steps: int) -> Dict[str, Any]:
+    """Run one query on a fresh agent and describe the run."""
+    from langchain_core.messages import AIMessage
+
+    agent = agent_factory()
+    limiter.acquire()
+    start = time.perf_counter()
+    error = None
+    try:
+        response = agent.run_for_testing(user_input, max_steps=max_steps, verbose=False)
+    except Exception as e: # run_for_testing reports its own errors; this guards the harness itself
+        response, error = "", repr(e)
+    latency = time.perf_counter() - start
+
+    ai_messages = [m for m in agent.last_test_history if isinstance(m, AIMessage)]
+    tool_calls = [tc["name"] for m in ai_messages for tc in m.tool_calls]
+    if error is None and response.startswith("An unexpected internal error occurred"):
+        error = response
+    return {
+        "query_id": query_id,
+        "query": user_input,
+        "response": response,
+        "latency_s": round(latency, 4),
+        "steps": len(ai_messages),
+        "tool_calls": tool_calls,
+        "error": error,
+    }
+
+
+def export_csv(results: Dict[int, Dict[str, Any]], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Query ID", "User Query", "FinPal Advisor Response",
+                             "Latency (s)", "Steps", "Tool Calls", "Error"])
+        for query_id in sorted(results):
+            r = results[query_id]
+            csv_writer.writerow([query_id, r["query"], r["response"], r["latency_s"], r["steps"],
+                                 ";".join(r["tool_calls"]), r["error"] or ""])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the FinPal test queries concurrently with checkpoint/resume.")
+    parser.add_argument("--workers", type=int, default=4, help="Queries evaluated concurrently.")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Maximum queries started per second.")
+    parser.add_argument("--max-steps", type=int, default=5, help="Agent steps per query.")
+    parser.add_argument("--checkpoint", default="test_results.jsonl", help="JSONL file results are appended to.")
+    parser.add_argument("--output", default="test_results.csv", help="CSV exported when the run finishes.")
+    parser.add_argument("--fresh", action="store_true", help="Ignore (and overwrite) an existing checkpoint.")
+    parser.add_argument("--retry-errors", action="store_true", help="Run again the queries that ended in an error.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the deterministic fake LLM, embeddings and vector store (no API keys, no network).")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        os.environ.setdefault("MISTRAL_API_KEY", "offline") # finPalChatNew checks for a key at import
+    import finPalChatNew
+    from finPalChatNew import FinPalAgent, tools, SYSTEM_MESSAGE_CONTENT
+
+    if args.offline:
+        from fake_backends import install_fake_backends
+        install_fake_backends(finPalChatNew.resources)
+    llm = finPalChatNew.resources.get("llm")
+
+    def agent_factory():
+        return FinPalAgent(llm=llm, tools=tools, system_message_content=SYSTEM_MESSAGE_CONTENT)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    results = checkpoint.load()
+    if args.retry_errors:
+        results = {qid: r for qid, r in results.items() if not r["error"]}
+    pending = [(i + 1, q) for i, q in enumerate(test_queries) if i + 1 not in results]
+    print(f"--- {len(results)} queries already in {args.checkpoint}, {len(pending)} to run "
+          f"with {args.workers} workers ---")
+
+    limiter = RateLimiter(args.rate_limit)
+    run_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="finpal-eval") as executor:
+        futures = [executor.submit(evaluate_query, qid, q, agent_factory, limiter, args.max_steps)
+                   for qid, q in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            checkpoint.append(record)
+            results[record["query_id"]] = record
+            status = "ERROR" if record["error"] else "ok"
+            print(f"[{len(results)}/{len(test_queries)}] Query {record['query_id']} {status} in "
+                  f"{record['latency_s']:.2f}s, {record['steps']} steps, tools: {record['tool_calls']}")
+
+    export_csv(results, args.output)
+    latencies = sorted(r["latency_s"] for r in results.values())
+    if latencies:
+        print(f"\n--- Evaluation complete in {time.perf_counter() - run_start:.1f}s. "
+              f"Median latency {latencies[len(latencies) // 2]:.2f}s, "
+              f"errors: {sum(1 for r in results.values() if r['error'])}. Results saved to {args.output} ---")
+
+
+if __name__ == "__main__":
+    main()
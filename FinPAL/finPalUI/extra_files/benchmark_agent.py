@@ -0,0 +1,245 @@
+# benchmark_agent.py
+# Latency benchmark for the FinPal agent loop.
+#
+# Drives real FinPalAgent chat sessions (FinPalAgent.achat, the code path Chainlit uses) over the
+# test query set against the fake backends from fake_backends.py, each with a configurable latency,
+# and reports for every concurrency level:
+#   - per-turn latency percentiles (p50/p95/p99) and throughput (turns per second)
+#   - where the time went, per stage: llm, tool (whole tool call), embedding, search, generation
+# The report is JSON, so runs from two releases can be diffed (or compared with --compare).
+#
+#   python benchmark_agent.py --concurrency 1 8 32 --turns 32 --output bench.json
+#   python benchmark_agent.py --llm-latency-ms 300 --compare bench_previous.json
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "finchat_app"))
+
+from test_queries import test_queries
+
+STAGES = ["llm", "tool", "embedding", "search", "generation"]
+PERCENTILES = (50, 95, 99)
+
+# Stage timings of the turn currently running in this task (asyncio copies it into tool tasks/threads)
+_current_turn: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("finpal_turn", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stages = _current_turn.get()
+    if stages is not None:
+        stages[stage] += seconds
+
+
+class TimedLLM:
+    """Wraps the agent LLM and records every invoke/ainvoke/astream call as the 'llm' stage."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.llm.invoke(*args, **kwargs)
+        finally:
+            record_stage("llm", time.perf_counter() - start)
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await self.llm.ainvoke(*args, **kwargs)
+        finally:
+            record_stage("llm", time.perf_counter() - start)
+
+    async def astream(self, *args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(*args, **kwargs):
+                yield chunk
+        finally:
+            record_stage("llm", time.perf_counter() - start)
+
+
+class TimedTool:
+    """Wraps a tool (keeping its name) and records each call as the 'tool' stage."""
+
+    def __init__(self, tool: Any):
+        self.tool = tool
+        self.name = tool.name
+
+    def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.tool.invoke(*args, **kwargs)
+        finally:
+            record_stage("tool", time.perf_counter() - start)
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await self.tool.ainvoke(*args, **kwargs)
+        finally:
+            record_stage("tool", time.perf_counter() - start)
+
+
+class TimedEmbeddings(Embeddings):
+    """Wraps an embedder and records every call as the 'embedding' stage."""
+
+    def __init__(self, underlying: Embeddings):
+        self.underlying = underlying
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            return self.underlying.embed_documents(texts)
+        finally:
+            record_stage("embedding", time.perf_counter() - start)
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        try:
+            return self.underlying.embed_query(text)
+        finally:
+            record_stage("embedding", time.perf_counter() - start)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {**{f"p{p}": 0.0 for p in PERCENTILES}, "mean": 0.0}
+    array = np.asarray(values) * 1000
+    summary = {f"p{p}": round(float(np.percentile(array, p)), 3) for p in PERCENTILES}
+    summary["mean"] = round(float(array.mean()), 3)
+    return summary
+
+
+async def run_session(session_id: int, turns: int, make_agent, results: List[Dict[str, Any]]) -> None:
+    """One chat session: `turns` consecutive turns on the same agent (history grows as in the UI)."""
+    agent = make_agent()
+    for turn in range(turns):
+        query = test_queries[(session_id + turn) % len(test_queries)]
+        stages: Dict[str, float] = defaultdict(float)
+        token = _current_turn.set(stages)
+        start = time.perf_counter()
+        try:
+            response = await agent.achat(query)
+        finally:
+            _current_turn.reset(token)
+        results.append({
+            "latency": time.perf_counter() - start,
+            "stages": dict(stages),
+            "error": response.startswith("An unexpected internal error occurred"),
+        })
+
+
+async def run_level(concurrency: int, total_turns: int, make_agent) -> Dict[str, Any]:
+    """Run `total_turns` turns spread over `concurrency` concurrent sessions."""
+    turns_per_session = max(1, total_turns // concurrency)
+    results: List[Dict[str, Any]] = []
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_session(s, turns_per_session, make_agent, results) for s in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = [r["latency"] for r in results]
+    total_latency = sum(latencies) or 1.0
+    stages = {}
+    for stage in STAGES:
+        per_turn = [r["stages"].get(stage, 0.0) for r in results]
+        stages[stage] = percentiles(per_turn)
+        stages[stage]["share_of_turn"] = round(sum(per_turn) / total_latency, 4)
+    return {
+        "concurrency": concurrency,
+        "turns": len(results),
+        "errors": sum(r["error"] for r in results),
+        "wall_s": round(wall, 3),
+        "throughput_turns_per_s": round(len(results) / wall, 3) if wall else 0.0,
+        "turn_latency_ms": percentiles(latencies),
+        "stages_ms": stages,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print turn-latency and throughput changes against an earlier report."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print("\n--- Comparison with baseline ---")
+    for level in report["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        parts = []
+        for key in ("p50", "p95", "p99"):
+            before, after = old["turn_latency_ms"][key], level["turn_latency_ms"][key]
+            change = (after - before) / before * 100 if before else 0.0
+            parts.append(f"{key} {before:.1f} -> {after:.1f} ms ({change:+.1f}%)")
+        parts.append(f"throughput {old['throughput_turns_per_s']} -> {level['throughput_turns_per_s']} turns/s")
+        print(f"concurrency {level['concurrency']}: " + ", ".join(parts))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark FinPalAgent turn latency against fake backends.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrent sessions per level.")
+    parser.add_argument("--turns", type=int, default=32, help="Turns per concurrency level (split across sessions).")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0, help="Simulated time per agent LLM call.")
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0, help="Simulated time per embedding call.")
+    parser.add_argument("--search-latency-ms", type=float, default=10.0, help="Simulated OpenSearch round trip.")
+    parser.add_argument("--generation-latency-ms", type=float, default=20.0, help="Simulated RAG answer generation.")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report.")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("MISTRAL_API_KEY", "offline") # finPalChatNew checks for a key at import
+    import finPalChatNew
+    from finPalChatNew import FinPalAgent, build_history_manager, tools, SYSTEM_MESSAGE_CONTENT
+    from fake_backends import install_fake_backends
+
+    llm = install_fake_backends(
+        finPalChatNew.resources,
+        llm_latency_s=args.llm_latency_ms / 1000,
+        embed_latency_s=args.embed_latency_ms / 1000,
+        search_latency_s=args.search_latency_ms / 1000,
+        generation_latency_s=args.generation_latency_ms / 1000,
+        answer_cache=args.answer_cache,
+        on_stage=record_stage,
+        embedding_wrapper=TimedEmbeddings,
+    )
+    timed_llm = TimedLLM(llm)
+    timed_tools = [TimedTool(t) for t in tools]
+
+    def make_agent():
+        return FinPalAgent(llm=timed_llm, tools=timed_tools, system_message_content=SYSTEM_MESSAGE_CONTENT,
+                           history_manager=build_history_manager())
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "levels": [],
+    }
+    for concurrency in args.concurrency:
+        level = asyncio.run(run_level(concurrency, args.turns, make_agent))
+        report["levels"].append(level)
+        latency = level["turn_latency_ms"]
+        print(f"--- concurrency {concurrency}: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+              f"p99 {latency['p99']:.1f} ms, {level['throughput_turns_per_s']} turns/s ---")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
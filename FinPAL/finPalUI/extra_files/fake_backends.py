@@ -0,0 +1,229 @@
+# fake_backends.py
+# Deterministic, offline stand-ins for the Mistral models, the embedding model and OpenSearch,
+# so the evaluation and benchmark scripts can drive the real FinPalAgent loop and tools without
+# API keys or a cluster. Every fake can add an artificial latency to mimic the real backend.
+import asyncio
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.vectorstores import InMemoryVectorStore
+
+# A handful of passages so document_qa has something to retrieve
+KNOWLEDGE_BASE = [
+    "Inflation is the rate at which the general level of prices rises, reducing the purchasing power of money over time.",
+    "A mutual fund pools money from many investors and is priced once a day; an ETF holds a similar basket but trades on an exchange like a stock.",
+    "Compounding means earning returns on both the original investment and the returns already earned.",
+    "A bond is a loan to a government or company that pays periodic interest and returns the principal at maturity.",
+    "An emergency fund should cover three to six months of essential expenses and be kept in a liquid, low-risk account.",
+    "Diversification spreads investments across asset classes so that a loss in one does not dominate the portfolio.",
+    "A budget commonly follows the 50/30/20 rule: needs, wants and savings.",
+    "Individual stock picks are outside the scope of general financial education; consider diversified funds instead.",
+]
+
+_CURRENCY_ALIASES = {"$": "USD", "usd": "USD", "dollar": "USD", "₹": "INR", "inr": "INR", "rupee": "INR",
+                     "eur": "EUR", "euro": "EUR", "gbp": "GBP", "pound": "GBP"}
+
+
+def _numbers(text: str) -> List[float]:
+    return [float(n.replace(",", "")) for n in re.findall(r"\d[\d,]*\.?\d*", text)]
+
+
+def _currencies(text: str) -> List[str]:
+    found = []
+    for match in re.finditer(r"\$|₹|[a-zA-Z]+", text):
+        word = match.group(0).lower().rstrip("s")
+        code = _CURRENCY_ALIASES.get(word) or _CURRENCY_ALIASES.get(match.group(0).lower())
+        if code and code not in found:
+            found.append(code)
+    return found
+
+
+def _rate(text: str) -> Optional[float]:
+    match = re.search(r"(\d+\.?\d*)\s*%", text)
+    return float(match.group(1)) / 100 if match else None
+
+
+def _years(text: str) -> Optional[int]:
+    match = re.search(r"(\d+)\s*years?", text)
+    return int(match.group(1)) if match else None
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Rule-based stand-in for the tool-bound Mistral model.
+
+    It reads the user's query and answers the way the real agent usually does: currency
+    conversion first when currencies are mentioned, then sip_calculator when there is an
+    amount, a rate and a tenure, and document_qa for everything else. Once the tools have
+    answered it returns a final message built from their outputs. The same query always
+    produces the same tool calls and answer.
+    """
+
+    latency_s: float = 0.0  # Simulated time per LLM call
+
+    @property
+    def _llm_type(self) -> str:
+        return "finpal-scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        # Only the current turn matters: the last user message and whatever followed it
+        last_human = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        query = str(messages[last_human].content)
+        turn = messages[last_human + 1:]
+        tool_results = []
+        for message in reversed(turn):
+            if not isinstance(message, ToolMessage):
+                break
+            tool_results.insert(0, str(message.content))
+        rounds = sum(1 for m in turn if isinstance(m, AIMessage) and m.tool_calls)
+        lowered = query.lower()
+        rate, years = _rate(query), _years(query)
+        numbers = _numbers(query)
+        currencies = _currencies(query)
+        converts = "convert" in lowered and len(currencies) >= 1
+        invests = rate is not None and years is not None and bool(numbers)
+
+        tool_calls = []
+        if rounds == 0 and converts:
+            to_currency = currencies[1] if len(currencies) > 1 else "INR"
+            tool_calls.append({"name": "currency_converter",
+                               "args": {"amount": numbers[0] if numbers else 1.0,
+                                        "from_currency": currencies[0], "to_currency": to_currency}})
+        elif rounds == 0 and invests:
+            tool_calls.append({"name": "sip_calculator",
+                               "args": {"monthly_investment": numbers[0], "annual_interest_rate": rate,
+                                        "years": years}})
+        elif rounds == 0:
+            tool_calls.append({"name": "document_qa", "args": {"query": query}})
+        elif rounds == 1 and converts and invests and tool_results:
+            try:
+                amount = float(tool_results[-1])
+            except ValueError:
+                amount = numbers[0]
+            tool_calls.append({"name": "sip_calculator",
+                               "args": {"monthly_investment": amount, "annual_interest_rate": rate,
+                                        "years": years}})
+
+        if tool_calls:
+            return AIMessage(content="", tool_calls=[
+                {**call, "id": f"call_{rounds}_{i}", "type": "tool_call"} for i, call in enumerate(tool_calls)
+            ])
+        return AIMessage(content="Here is what I found: " + " | ".join(tool_results or ["no tool output"]))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """DeterministicFakeEmbedding (same text -> same vector) with a simulated per-call latency."""
+
+    latency_s: float = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return super().embed_query(text)
+
+
+def build_fake_vectorstore(embedding_function: Any) -> InMemoryVectorStore:
+    """In-memory vector store holding KNOWLEDGE_BASE, in place of the OpenSearch index."""
+    store = InMemoryVectorStore(embedding_function)
+    store.add_documents([Document(page_content=text, metadata={"source": f"kb-{i}"})
+                         for i, text in enumerate(KNOWLEDGE_BASE)])
+    return store
+
+
+def build_fake_rag_chain(vectorstore: InMemoryVectorStore, search_latency_s: float = 0.0,
+                         generation_latency_s: float = 0.0, k: int = 2,
+                         on_stage: Optional[Callable[[str, float], None]] = None) -> RunnableLambda:
+    """
+    Stand-in for the RetrievalQA chain: same input ({"query": ...}) and output
+    ({"result": ..., "source_documents": [...]}) shape, answering with the best passages.
+    `on_stage(stage, seconds)` is told how long the "search" and "generation" parts took.
+    """
+    def _report(stage: str, start: float) -> None:
+        if on_stage is not None:
+            on_stage(stage, time.perf_counter() - start)
+
+    def _answer(query: str, docs: List[Document]) -> Dict[str, Any]:
+        return {"result": " ".join(doc.page_content for doc in docs), "source_documents": docs}
+
+    def _invoke(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        embedding = vectorstore.embeddings.embed_query(inputs["query"])
+        start = time.perf_counter()
+        if search_latency_s:
+            time.sleep(search_latency_s)
+        docs = vectorstore.similarity_search_by_vector(embedding, k=k)
+        _report("search", start)
+        start = time.perf_counter()
+        if generation_latency_s:
+            time.sleep(generation_latency_s)
+        _report("generation", start)
+        return _answer(inputs["query"], docs)
+
+    async def _ainvoke(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        embedding = await vectorstore.embeddings.aembed_query(inputs["query"])
+        start = time.perf_counter()
+        if search_latency_s:
+            await asyncio.sleep(search_latency_s)
+        docs = await vectorstore.asimilarity_search_by_vector(embedding, k=k)
+        _report("search", start)
+        start = time.perf_counter()
+        if generation_latency_s:
+            await asyncio.sleep(generation_latency_s)
+        _report("generation", start)
+        return _answer(inputs["query"], docs)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+def install_fake_backends(resources: Any, llm_latency_s: float = 0.0, embed_latency_s: float = 0.0,
+                          search_latency_s: float = 0.0, generation_latency_s: float = 0.0,
+                          answer_cache: bool = False,
+                          on_stage: Optional[Callable[[str, float], None]] = None,
+                          embedding_wrapper: Optional[Callable[[Any], Any]] = None) -> ScriptedChatModel:
+    """
+    Replace the lazily built resources of finPalChatNew (see its LazyResourceRegistry) with fakes,
+    so nothing contacts Mistral, HuggingFace or OpenSearch. Returns the scripted agent LLM.
+    The semantic answer cache is disabled unless `answer_cache=True`, so every run does the full work.
+    `on_stage` is passed on to build_fake_rag_chain; `embedding_wrapper`, if given, wraps the fake
+    embedder everywhere it is used (e.g. to time it).
+    """
+    embedding_function = FakeEmbeddings(size=768, latency_s=embed_latency_s)
+    if embedding_wrapper is not None:
+        embedding_function = embedding_wrapper(embedding_function)
+    vectorstore = build_fake_vectorstore(embedding_function)
+    llm = ScriptedChatModel(latency_s=llm_latency_s)
+    resources.set("embedding_function", embedding_function)
+    resources.set("vectorstore", vectorstore)
+    resources.set("rag_chain", build_fake_rag_chain(vectorstore, search_latency_s, generation_latency_s,
+                                                          on_stage=on_stage))
+    resources.set("llm", llm)
+    if not answer_cache:
+        resources.set("answer_cache", None)
+    return llm
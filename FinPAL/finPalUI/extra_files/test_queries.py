@@ -0,0 +1,21 @@
+# test_queries.py
+# The FinPal evaluation query set, shared by the evaluation and benchmark scripts.
+
+test_queries = [
+    "I want to invest ₹5000 monthly in SIP for 15 years with 12% expected returns. What will be my corpus?",
+    "What's the difference between a mutual fund and an ETF?",
+    "Convert $100 to INR. Then, if I invest that amount monthly for 5 years with 8% expected returns, what will be my corpus?", # Complex query combining tools
+    "What is inflation and why is it important for my investments?", # Another general knowledge query
+    "How much will $1000 grow to in 10 years at an annual return of 7%?", # Lump sum growth
+    "Calculate the SIP value if I put 2000 rupees every month for 10 years at 10.5% annual interest.",
+    "How much should I save from my ₹8K/month student income in Bengaluru for essentials?", # Budgeting advice
+    "If I invest 10000 INR per month at 15% for 20 years, what's the final amount?",
+    "Should I buy Google stock today?", # Out of scope
+    "How can I start building an emergency fund?", # General advice
+    "Convert 50 GBP to USD and then tell me how much I'd have if I invested that amount for 3 years at 6% annually.", # Multi-step, multi-tool
+    "What are the benefits of diversifying my investment portfolio?",
+    "What is compounding?", # General knowledge
+    "Can you explain what a bond is?", # General knowledge
+    "I have 500 USD, convert it to EUR, then calculate its SIP value if I invest that EUR amount monthly for 7 years with 9% annual return.", # More complex multi-tool
+    "What is the SIP amount if I want to reach 1,00,000 in 5 years with 10% annual return?", # Inverse SIP (agent might not know this)
+]
@@ -1,18 +1,37 @@
+import asyncio
+import logging
 import os
+import threading
+import time
+from concurrent.futures import CancelledError, Executor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage, BaseMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, AIMessageChunk, ToolMessage, BaseMessage, message_chunk_to_message
 from langchain_core.tools import tool
 from langchain_mistralai import ChatMistralAI
-from typing import List, Dict, Union, Any, Tuple
+from typing import AsyncIterator, List, Dict, Union, Any, Optional, Tuple
 ##For RAG
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from langchain_community.vectorstores import OpenSearchVectorSearch
-#from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.chains import RetrievalQA
-from requests_aws4auth import AWS4Auth
-import boto3
+from utils.opensearch_client import OpenSearchClientFactory
+from utils.opensearch_vector_search import OpenSearchVectorSearch
+from utils.resource_registry import LazyResourceRegistry
+from utils.chat_history import ChatHistoryWindow
+from utils.semantic_cache import SemanticCache
+from utils.embeddings import BatchingEmbeddings, CachedEmbeddings
+from utils.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResiliencePolicy, is_transient
+from utils.tracing import configure_tracing_from_env, payload_size, run_in_context, traced, tracer
+import numpy as np
+from financial_math import (
+    format_table,
+    inflation_adjusted_value,
+    lumpsum_future_value,
+    required_monthly_sip,
+    scenario_grid,
+    sip_future_value,
+    step_up_sip_future_value,
+)
+
+logger = logging.getLogger(__name__)
 
 # --- 0. Pre-Steps ---
 load_dotenv()
@@ -20,66 +39,278 @@ MISTRAL_API_KEY = os.getenv('MISTRAL_API_KEY')
 if not MISTRAL_API_KEY:
     raise ValueError("MISTRAL_API_KEY environment variable not set. Please create a .env file with your Mistral API key.")
 
-# --- For RAG set up ---
-# Initialize the HuggingFace embeddings model
-embedding_function = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+# Spans for turns, steps, LLM/tool calls, embeddings and OpenSearch searches (FINPAL_TRACING=jsonl|otlp; off by default)
+configure_tracing_from_env()
 
 #region = "ap-south-1"
 #host = "search-findomain1-lgyucsnynjo3aejlv5cmxnp64q.ap-south-1.es.amazonaws.com"
 region = os.getenv("AWS_REGION", "ap-south-1") # Default to ap-south-1 if not set
 host = os.getenv("OPENSEARCH_HOST") # No default needed here, as it's critical
-if not host:
-    raise ValueError("OPENSEARCH_HOST environment variable not set.")
-
-# Get AWS credentials (frozen)
-try:
-    credentials = boto3.Session().get_credentials().get_frozen_credentials()
-except Exception as e:
-    # Handle the case where credentials are not found
-    print("Error: AWS credentials not found. Please set them in your .env file or environment.")
-    raise e
-# credentials = boto3.Session().get_credentials().get_frozen_credentials()
-# awsauth = AWS4Auth(
-#     credentials.access_key,
-#     credentials.secret_key,
-#     region,
-#     "es",
-#     session_token=credentials.token
-# )
-awsauth = AWS4Auth(
-    credentials.access_key,
-    credentials.secret_key,
-    region, # You can store region in .env, default to ap-south-1
-    "es",
-    session_token=credentials.token
-)
 
-client = OpenSearch(
-    hosts=[{"host": host, "port": 443}],
-    http_auth=awsauth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
+# --- For RAG set up ---
+# Everything below is expensive (model download/load, AWS credential resolution, network clients),
+# so it is registered as a lazy resource instead of being built at import time.
+# Call `resources.warm_up()` to build them in parallel in the background, or just use them:
+# the first `resources.get(...)` (or module attribute access such as `finPalChatNew.llm`) builds on demand.
+resources = LazyResourceRegistry()
 
-#Connect to OpenSearch
-vectorstore = OpenSearchVectorSearch(
-    index_name="financialinfo",
-    opensearch_url=f"https://{host}",
-    opensearch_client=client,
-    embedding_function=embedding_function
-     
-)
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+INDEX_NAME = "financialinfo"
+
+def build_base_embedding_model():
+    """The bare embedding model (no batching/caching); also used by the ingestion worker processes."""
+    if os.getenv("FINPAL_EMBEDDING_BACKEND", "pytorch").lower() == "onnx":
+        # Same model exported to ONNX with int8 weights (faster and lighter on CPU-only hosts);
+        # run `python -m utils.onnx_embeddings` to check its agreement with the PyTorch embeddings
+        from utils.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            EMBEDDING_MODEL_NAME,
+            cache_dir=os.getenv("FINPAL_ONNX_CACHE_DIR", "onnx_models")
+        )
+    # Imported here because importing sentence-transformers/torch alone takes seconds
+    from langchain_huggingface import HuggingFaceEmbeddings
+    # Initialize the HuggingFace embeddings model
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+def _build_embedding_function():
+    embedding_function = build_base_embedding_model()
+    # Concurrent embed_query calls from different sessions share one forward pass (0 disables batching)
+    batch_wait_ms = float(os.getenv("FINPAL_EMBEDDING_BATCH_WAIT_MS", "5"))
+    if batch_wait_ms > 0:
+        embedding_function = BatchingEmbeddings(embedding_function, max_wait_ms=batch_wait_ms)
+    # Repeated queries (and the cache lookup + retriever embedding the same query) hit the LRU (0 disables it)
+    cache_size = int(os.getenv("FINPAL_EMBEDDING_CACHE_SIZE", "4096"))
+    if cache_size > 0:
+        embedding_function = CachedEmbeddings(embedding_function, maxsize=cache_size)
+    return embedding_function
+
+def _build_opensearch_clients():
+    # Pooled keep-alive connections, gzip bodies and SigV4 signing with refreshable credentials, shared
+    # by the sync and async clients; OPENSEARCH_HOST=http://localhost:9200 targets an unsigned local stand-in
+    return OpenSearchClientFactory.from_env()
+
+# "client"/"async_client" keep the transport defaults; they serve writes and admin calls (ingest.py bulk
+# loads, refreshes, settings, deletes, local index snapshots), which can take far longer than a search.
+def _build_opensearch_client():
+    return resources.get("opensearch_clients").sync_client()
+
+def _build_async_opensearch_client():
+    # Used by the async (achat) path; same domain, signed with the same credentials
+    return resources.get("opensearch_clients").async_client()
+
+# Search reads run under SEARCH_POLICY, which retries and hedges them within its deadline (and retry
+# budget); transport-level retries underneath would multiply them, and a longer transport timeout would
+# outlive the deadline. So searches get their own deadline-capped clients.
+def _build_search_client():
+    if SEARCH_POLICY is None:
+        return resources.get("client")
+    return resources.get("opensearch_clients").under_deadline(SEARCH_POLICY.deadline).sync_client()
+
+def _build_async_search_client():
+    if SEARCH_POLICY is None:
+        return resources.get("async_client")
+    return resources.get("opensearch_clients").under_deadline(SEARCH_POLICY.deadline).async_client()
+
+def _build_local_vectorstore():
+    # In-process copy of the index (FINPAL_VECTOR_BACKEND=local): retrieval without a network round trip.
+    # The snapshot is taken from OpenSearch when missing (or on every start with FINPAL_LOCAL_INDEX_SYNC=true)
+    # and, with FINPAL_LOCAL_INDEX_REFRESH_S > 0, re-taken periodically in the background.
+    from utils.local_vector_store import LocalVectorStore, snapshot_from_opensearch
+    path = os.getenv("FINPAL_LOCAL_INDEX_DIR", "local_index")
+    snapshot_kwargs = dict(
+        dtype=os.getenv("FINPAL_LOCAL_INDEX_DTYPE", "float16"), # Half the memory; recall is unaffected in practice
+        build_hnsw=os.getenv("FINPAL_LOCAL_INDEX_HNSW", "false").lower() in ("1", "true", "yes"), # Exact search is fast enough below ~100k chunks
+    )
+    sync_on_start = os.getenv("FINPAL_LOCAL_INDEX_SYNC", "false").lower() in ("1", "true", "yes")
+    if sync_on_start or not os.path.exists(os.path.join(path, "meta.json")):
+        snapshot_from_opensearch(resources.get("client"), INDEX_NAME, path, **snapshot_kwargs)
+    vectorstore = LocalVectorStore.load(path, resources.get("embedding_function"))
+
+    refresh_s = float(os.getenv("FINPAL_LOCAL_INDEX_REFRESH_S", "0"))
+    if refresh_s > 0:
+        def _refresh_loop():
+            while True:
+                time.sleep(refresh_s)
+                try:
+                    vectorstore.sync_from_opensearch(resources.get("client"), INDEX_NAME, **snapshot_kwargs)
+                except Exception as e:
+                    # Keep serving the previous snapshot
+                    logger.warning("Local index refresh failed: %s", e)
+        threading.Thread(target=_refresh_loop, name="finpal-local-index-sync", daemon=True).start()
+    return vectorstore
 
-# Create the RetrievalQA chain
-rag_chain = RetrievalQA.from_chain_type(
-    llm=ChatMistralAI(model="mistral-large-latest", temperature=0.2), # You can use a different, more powerful model for final answers
-    retriever=vectorstore.as_retriever(search_type="similarity", k=3),
-    return_source_documents=True
+# --- Resilience: per-dependency deadlines, retries (bounded by a retry budget) and circuit breakers ---
+# OpenSearch reads are idempotent, so a search still outstanding at its recent p95 latency is hedged
+# with a duplicate request. Mistral calls are not hedged (every duplicate is billed and counts against
+# the rate limit); 429s and 5xx are retried instead. While a circuit is open, document_qa answers from
+# the answer cache or without context rather than waiting. Set FINPAL_RESILIENCE=false to disable.
+RESILIENCE_ENABLED = os.getenv("FINPAL_RESILIENCE", "true").lower() in ("1", "true", "yes")
+SEARCH_POLICY = ResiliencePolicy(
+    "opensearch",
+    deadline=float(os.getenv("FINPAL_SEARCH_DEADLINE_S", "3")),
+    hedge=os.getenv("FINPAL_SEARCH_HEDGE", "true").lower() in ("1", "true", "yes"),
+    max_retries=1,
+    breaker=CircuitBreaker(failure_threshold=5, reset_timeout=float(os.getenv("FINPAL_CIRCUIT_RESET_S", "30"))),
+) if RESILIENCE_ENABLED else None
+RAG_POLICY = ResiliencePolicy(
+    "rag_chain",
+    deadline=float(os.getenv("FINPAL_RAG_DEADLINE_S", "45")),
+    breaker=CircuitBreaker(failure_threshold=3, reset_timeout=float(os.getenv("FINPAL_CIRCUIT_RESET_S", "30"))),
+) if RESILIENCE_ENABLED else None
+LLM_POLICY = ResiliencePolicy(
+    "mistral",
+    deadline=float(os.getenv("FINPAL_LLM_DEADLINE_S", "60")),
+    max_retries=int(os.getenv("FINPAL_LLM_MAX_RETRIES", "2")),
+    backoff=1.0, # Rate limits need more than a fraction of a second to clear
+    breaker=CircuitBreaker(failure_threshold=5, reset_timeout=float(os.getenv("FINPAL_CIRCUIT_RESET_S", "30"))),
+) if RESILIENCE_ENABLED else None
+# Streamed LLM steps (astream_chat) are not retried, but the first token must arrive within this
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("FINPAL_LLM_FIRST_TOKEN_S", "30"))
+# A cached answer to a less similar question (or one past its TTL) still beats no context
+DEGRADED_CACHE_THRESHOLD = float(os.getenv("FINPAL_DEGRADED_CACHE_THRESHOLD", "0.8"))
+NO_CONTEXT_ANSWER = (
+    "Answer: The FinPal knowledge base is temporarily unavailable, so no documents could be retrieved. "
+    "Answer from general financial knowledge and tell the user the answer is not based on the knowledge base."
 )
+
+def _build_vectorstore():
+    if os.getenv("FINPAL_VECTOR_BACKEND", "opensearch").lower() == "local":
+        return _build_local_vectorstore()
+    #Connect to OpenSearch
+    return OpenSearchVectorSearch(
+        index_name=INDEX_NAME,
+        opensearch_url=None, # Both clients are passed in
+        opensearch_client=resources.get("client"),
+        async_opensearch_client=resources.get("async_client"),
+        search_client=resources.get("search_client"),
+        async_search_client=resources.get("async_search_client"),
+        embedding_function=resources.get("embedding_function"),
+        # Repeated retrievals are served in-process until the index generation changes (0 disables it);
+        # writes by ingest.py or other replicas are noticed within the 5s generation check interval
+        result_cache_size=int(os.getenv("FINPAL_RESULT_CACHE_SIZE", "1024")),
+        result_cache_ttl=float(os.getenv("FINPAL_RESULT_CACHE_TTL_S", "300")),
+        search_policy=SEARCH_POLICY,
+    )
+
+def _mistral_client_kwargs(policy: Optional[ResiliencePolicy]) -> Dict[str, Any]:
+    """Transport settings for a ChatMistralAI client whose calls run under `policy`.
+
+    The client defaults (5 retries, 120s timeout) would turn every policy attempt into up to
+    6 requests the retry budget never sees, and keep a request running past the policy deadline.
+    """
+    if policy is None or policy.deadline is None:
+        return {}
+    # The client's timeout is whole seconds
+    return {"max_retries": 0, "timeout": max(1, int(policy.deadline))}
+
+def _build_rag_llm():
+    # You can use a different, more powerful model for final answers
+    return ChatMistralAI(model="mistral-large-latest", temperature=0.2, **_mistral_client_kwargs(RAG_POLICY))
+
+def _build_reranker():
+    # Optional cross-encoder stage between retrieval and the RAG LLM; FINPAL_RERANKER=true enables it
+    if os.getenv("FINPAL_RERANKER", "false").lower() not in ("1", "true", "yes"):
+        return None
+    from utils.reranker import DEFAULT_CROSS_ENCODER, CrossEncoderReranker
+    return CrossEncoderReranker(os.getenv("FINPAL_RERANKER_MODEL", DEFAULT_CROSS_ENCODER))
+
+def _build_retriever():
+    k = int(os.getenv("FINPAL_RETRIEVER_K", "3"))
+    vectorstore = resources.get("vectorstore")
+    store_kwargs = {}
+    if (isinstance(vectorstore, OpenSearchVectorSearch)
+            and os.getenv("FINPAL_RETRIEVER_HYBRID", "false").lower() in ("1", "true", "yes")):
+        # BM25 + k-NN in one _msearch, fused client-side with RRF (or server-side with FINPAL_SEARCH_PIPELINE)
+        store_kwargs["search_type"] = "hybrid_search"
+        if os.getenv("FINPAL_SEARCH_PIPELINE"):
+            store_kwargs["search_pipeline"] = os.getenv("FINPAL_SEARCH_PIPELINE")
+    reranker = resources.get("reranker")
+    if reranker is not None:
+        from utils.reranker import RerankingRetriever
+        # Over-fetch, score every candidate in one cross-encoder pass, keep at most k that clear the threshold
+        return RerankingRetriever(
+            vectorstore=vectorstore,
+            reranker=reranker,
+            k=k,
+            min_score=float(os.getenv("FINPAL_RERANKER_MIN_SCORE", "0.1")),
+            min_fetch_k=int(os.getenv("FINPAL_RERANKER_MIN_FETCH_K", "8")),
+            max_fetch_k=int(os.getenv("FINPAL_RERANKER_MAX_FETCH_K", "40")),
+            search_kwargs=store_kwargs,
+        )
+    # MMR (diverse top-k out of fetch_k candidates) is the default; FINPAL_RETRIEVER_SEARCH_TYPE=similarity
+    # switches back to plain top-k
+    search_type = os.getenv("FINPAL_RETRIEVER_SEARCH_TYPE", "mmr").lower()
+    search_kwargs = {"k": k, **store_kwargs}
+    if search_type == "mmr":
+        search_kwargs["fetch_k"] = int(os.getenv("FINPAL_RETRIEVER_FETCH_K", "20"))
+        search_kwargs["lambda_mult"] = float(os.getenv("FINPAL_RETRIEVER_LAMBDA_MULT", "0.5"))
+    return vectorstore.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+
+def _build_rag_chain():
+    from langchain.chains import RetrievalQA
+    # Create the RetrievalQA chain
+    return RetrievalQA.from_chain_type(
+        llm=resources.get("rag_llm"),
+        retriever=resources.get("retriever"),
+        return_source_documents=True
+    )
+
+def _build_answer_cache():
+    # Semantic cache in front of document_qa; set FINPAL_ANSWER_CACHE=false to disable it.
+    # Entries are tagged with the index generation (see _knowledge_base_version), so a re-index invalidates them
+    if os.getenv("FINPAL_ANSWER_CACHE", "true").lower() in ("0", "false", "no"):
+        return None
+    return SemanticCache(
+        resources.get("embedding_function"),
+        path=os.getenv("FINPAL_ANSWER_CACHE_PATH", "answer_cache.sqlite3"),
+        similarity_threshold=float(os.getenv("FINPAL_ANSWER_CACHE_THRESHOLD", "0.92")),
+        ttl_seconds=float(os.getenv("FINPAL_ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        # Expired answers are kept this long as a fallback while the knowledge base is down (see _degraded_document_qa)
+        stale_ttl_seconds=float(os.getenv("FINPAL_ANSWER_CACHE_STALE_TTL_SECONDS", str(30 * 24 * 3600))),
+        max_entries=int(os.getenv("FINPAL_ANSWER_CACHE_MAX_ENTRIES", "5000")),
+    )
+
+def _build_llm():
+    return ChatMistralAI(
+        model="mistral-small-latest", temperature=0, **_mistral_client_kwargs(LLM_POLICY)
+    ).bind_tools(tools)
+
+resources.register("embedding_function", _build_embedding_function)
+resources.register("opensearch_clients", _build_opensearch_clients)
+resources.register("client", _build_opensearch_client, depends_on=["opensearch_clients"])
+resources.register("async_client", _build_async_opensearch_client, depends_on=["opensearch_clients"])
+resources.register("search_client", _build_search_client, depends_on=["opensearch_clients", "client"])
+resources.register("async_search_client", _build_async_search_client, depends_on=["opensearch_clients", "async_client"])
+resources.register("vectorstore", _build_vectorstore,
+                   depends_on=["client", "async_client", "search_client", "async_search_client", "embedding_function"])
+resources.register("rag_llm", _build_rag_llm)
+resources.register("reranker", _build_reranker)
+resources.register("retriever", _build_retriever, depends_on=["vectorstore", "reranker"])
+resources.register("rag_chain", _build_rag_chain, depends_on=["rag_llm", "retriever"])
+resources.register("answer_cache", _build_answer_cache, depends_on=["embedding_function"])
+resources.register("llm", _build_llm)
+
+def __getattr__(name: str) -> Any:
+    """Keep `from finPalChatNew import llm` (and friends) working; builds the resource on first access."""
+    if name in resources.status():
+        return resources.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 # ---- End of RAG Setup ----
 
 # --- 1. Define your Custom Tools ---
+# Simplified exchange rates shared by currency_converter and currency_conversion_table
+EXCHANGE_RATES = {
+    "USD_INR": 83.5, # Example rate
+    "INR_USD": 1 / 83.5,
+    "EUR_USD": 1.08,
+    "USD_EUR": 1 / 1.08,
+    "GBP_USD": 1.27, # Example
+    "USD_GBP": 1 / 1.27, # Example
+    # Add more rates as needed
+}
+# Upper bound on the rows a scenario tool returns, so one call cannot flood the LLM context
+MAX_SCENARIO_ROWS = int(os.getenv("FINPAL_MAX_SCENARIO_ROWS", "200"))
+
 @tool
 def sip_calculator(monthly_investment: float, annual_interest_rate: float, years: int) -> float:
     """
@@ -94,12 +325,7 @@ def sip_calculator(monthly_investment: float, annual_interest_rate: float, years
         float: The estimated future value of the investment.
     """
     # print(f"\n--- DEBUG: Executing sip_calculator with: monthly_investment={monthly_investment}, annual_interest_rate={annual_interest_rate}, years={years} ---") # Commented out for cleaner test runs
-    monthly_rate = annual_interest_rate / 12
-    months = years * 12
-    if monthly_rate == 0:
-        return monthly_investment * months
-    future_value = monthly_investment * (((1 + monthly_rate)**months - 1) / monthly_rate) * (1 + monthly_rate)
-    return future_value
+    return float(sip_future_value(monthly_investment, annual_interest_rate, years))
 
 @tool
 def currency_converter(amount: float, from_currency: str, to_currency: str) -> float:
@@ -116,42 +342,160 @@ def currency_converter(amount: float, from_currency: str, to_currency: str) -> f
         float: The converted amount.
     """
     # print(f"\n--- DEBUG: Executing currency_converter with: amount={amount}, from_currency='{from_currency}', to_currency='{to_currency}' ---") # Commented out for cleaner test runs
-    exchange_rates = {
-        "USD_INR": 83.5, # Example rate
-        "INR_USD": 1 / 83.5,
-        "EUR_USD": 1.08,
-        "USD_EUR": 1 / 1.08,
-        "GBP_USD": 1.27, # Example
-        "USD_GBP": 1 / 1.27, # Example
-        # Add more rates as needed
-    }
-    
     rate_key = f"{from_currency.upper()}_{to_currency.upper()}"
-    rate = exchange_rates.get(rate_key)
+    rate = EXCHANGE_RATES.get(rate_key)
     
     if rate is None:
         raise ValueError(f"Exchange rate not available for {from_currency} to {to_currency}")
     
     converted_amount = amount * rate
     return converted_amount
-# --- Define the RAG Chain as a Tool ---
+
+# --- Batch (what-if) calculators ---
+# Each of these evaluates every combination of its list arguments in one vectorized call
+# (see financial_math.py), so "compare 5k/10k/15k at 8/10/12% over 10/15/20 years" is a
+# single tool call returning a table instead of 27 sequential sip_calculator round trips.
+def _check_scenario_count(*lists: List[Any]) -> None:
+    count = 1
+    for values in lists:
+        if not values:
+            raise ValueError("Every scenario list needs at least one value")
+        count *= len(values)
+    if count > MAX_SCENARIO_ROWS:
+        raise ValueError(
+            f"{count} scenarios requested; at most {MAX_SCENARIO_ROWS} are allowed per call. "
+            "Narrow down the lists of values."
+        )
+
 @tool
-def document_qa(query: str) -> str:
+def sip_scenarios(
+    monthly_investments: List[float],
+    annual_interest_rates: List[float],
+    years: List[int],
+    annual_step_up: float = 0.0,
+    inflation_rate: float = 0.0,
+) -> str:
     """
-    Answers questions about general financial concepts by retrieving information
-    from a dedicated knowledge base.
+    Compares SIP (monthly investment) outcomes for every combination of amounts, rates and tenures.
+    Use this instead of calling sip_calculator repeatedly when the user wants to compare options.
 
     Args:
-        query (str): The question or topic to search for in the documents.
+        monthly_investments (List[float]): Monthly amounts to compare (e.g., [5000, 10000]).
+        annual_interest_rates (List[float]): Expected annual returns as decimals (e.g., [0.08, 0.12]).
+        years (List[int]): Investment tenures in years (e.g., [10, 15, 20]).
+        annual_step_up (float): Optional yearly increase of the monthly amount as a decimal (e.g., 0.10).
+        inflation_rate (float): Optional annual inflation as a decimal; adds a column in today's money.
 
     Returns:
-        str: A synthesized answer based on the retrieved documents.
+        str: A markdown table with one row per scenario.
     """
-    print(f"\n--- DEBUG: Executing document_qa with query: '{query}' ---")
-    
-    # Use the rag_chain created in the RAG Setup section
-    result = rag_chain.invoke({"query": query})
-    
+    _check_scenario_count(monthly_investments, annual_interest_rates, years)
+    grid = scenario_grid(
+        monthly_investment=monthly_investments,
+        annual_interest_rate=annual_interest_rates,
+        years=years,
+    )
+    if annual_step_up:
+        future_values = step_up_sip_future_value(**grid, annual_step_up=annual_step_up)
+        invested = step_up_sip_future_value(grid["monthly_investment"], 0.0, grid["years"], annual_step_up)
+    else:
+        future_values = sip_future_value(**grid)
+        invested = grid["monthly_investment"] * grid["years"] * 12
+    columns = {
+        "Monthly investment": grid["monthly_investment"],
+        "Annual rate (%)": grid["annual_interest_rate"] * 100,
+        "Years": grid["years"].astype(int),
+        "Total invested": invested,
+        "Future value": future_values,
+    }
+    if inflation_rate:
+        columns["Value in today's money"] = inflation_adjusted_value(future_values, inflation_rate, grid["years"])
+    return format_table(columns)
+
+@tool
+def lumpsum_scenarios(
+    principals: List[float],
+    annual_interest_rates: List[float],
+    years: List[int],
+    compounding_per_year: int = 1,
+    inflation_rate: float = 0.0,
+) -> str:
+    """
+    Compares the future value of one-time (lump sum) investments for every combination of inputs.
+
+    Args:
+        principals (List[float]): Amounts invested today (e.g., [100000, 500000]).
+        annual_interest_rates (List[float]): Annual returns as decimals (e.g., [0.07, 0.1]).
+        years (List[int]): Holding periods in years (e.g., [5, 10]).
+        compounding_per_year (int): Compounding periods per year (1 = yearly, 4 = quarterly, 12 = monthly).
+        inflation_rate (float): Optional annual inflation as a decimal; adds a column in today's money.
+
+    Returns:
+        str: A markdown table with one row per scenario.
+    """
+    _check_scenario_count(principals, annual_interest_rates, years)
+    grid = scenario_grid(principal=principals, annual_interest_rate=annual_interest_rates, years=years)
+    future_values = lumpsum_future_value(**grid, compounding_per_year=compounding_per_year)
+    columns = {
+        "Principal": grid["principal"],
+        "Annual rate (%)": grid["annual_interest_rate"] * 100,
+        "Years": grid["years"].astype(int),
+        "Future value": future_values,
+    }
+    if inflation_rate:
+        columns["Value in today's money"] = inflation_adjusted_value(future_values, inflation_rate, grid["years"])
+    return format_table(columns)
+
+@tool
+def required_sip_scenarios(
+    target_amounts: List[float],
+    annual_interest_rates: List[float],
+    years: List[int],
+) -> str:
+    """
+    Calculates the monthly SIP needed to reach each target amount, for every combination of inputs.
+
+    Args:
+        target_amounts (List[float]): Goal amounts (e.g., [1000000, 5000000]).
+        annual_interest_rates (List[float]): Expected annual returns as decimals (e.g., [0.1, 0.12]).
+        years (List[int]): Time to reach the goal in years (e.g., [10, 15]).
+
+    Returns:
+        str: A markdown table with the required monthly investment per scenario.
+    """
+    _check_scenario_count(target_amounts, annual_interest_rates, years)
+    grid = scenario_grid(target_amount=target_amounts, annual_interest_rate=annual_interest_rates, years=years)
+    return format_table({
+        "Target amount": grid["target_amount"],
+        "Annual rate (%)": grid["annual_interest_rate"] * 100,
+        "Years": grid["years"].astype(int),
+        "Required monthly SIP": required_monthly_sip(**grid),
+    })
+
+@tool
+def currency_conversion_table(amounts: List[float], from_currency: str, to_currencies: List[str]) -> str:
+    """
+    Converts several amounts from one currency into one or more other currencies in a single call.
+
+    Args:
+        amounts (List[float]): The amounts to convert (e.g., [100, 2500]).
+        from_currency (str): The currency to convert from (e.g., "USD").
+        to_currencies (List[str]): The currencies to convert to (e.g., ["INR", "EUR"]).
+
+    Returns:
+        str: A markdown table with one column per target currency.
+    """
+    _check_scenario_count(amounts, to_currencies)
+    columns: Dict[str, Any] = {from_currency.upper(): np.asarray(amounts, dtype=np.float64)}
+    for to_currency in to_currencies:
+        rate = EXCHANGE_RATES.get(f"{from_currency.upper()}_{to_currency.upper()}")
+        if rate is None:
+            raise ValueError(f"Exchange rate not available for {from_currency} to {to_currency}")
+        columns[to_currency.upper()] = columns[from_currency.upper()] * rate
+    return format_table(columns)
+
+# --- Define the RAG Chain as a Tool ---
+def _format_rag_result(result: Dict[str, Any]) -> str:
     # The result contains the answer and source documents
     answer = result.get("result")
     source_docs = result.get("source_documents", [])
@@ -164,12 +508,120 @@ def document_qa(query: str) -> str:
     
     return f"Answer: {answer}" # \n{source_info}" # Comment out sources for simpler output if needed
 
-tools = [sip_calculator, currency_converter, document_qa] # List of all tools, use document_qa if RAG is enabled
+def _degraded_document_qa(error: Exception, answer_cache: Optional[SemanticCache],
+                          query_embedding: Optional[List[float]]) -> str:
+    """document_qa's answer while retrieval or generation is failing: the closest cached answer, else no context."""
+    logger.warning("document_qa degraded (%s: %s)", type(error).__name__, error)
+    span = tracer.current_span()
+    span.set_attribute("document_qa.degraded", type(error).__name__)
+    if answer_cache is not None and query_embedding is not None:
+        cached = answer_cache.lookup_by_vector(query_embedding, min_similarity=DEGRADED_CACHE_THRESHOLD, allow_stale=True)
+        span.set_attribute("answer_cache.fallback_hit", cached is not None)
+        if cached is not None:
+            return cached[0]
+    return NO_CONTEXT_ANSWER
+
+def _knowledge_base_version() -> Optional[str]:
+    """Generation of the index document_qa retrieves from. Answer cache entries are tagged with it,
+    so after a re-index (ingest.py bumps the generation) answers built from old chunks become misses.
+    None when it cannot be read; the answer cache is then bypassed."""
+    return resources.get("vectorstore").index_generation()
+
+def _should_degrade(error: Exception) -> bool:
+    # Bugs (and bad requests) still surface as tool errors; only outages are masked
+    return isinstance(error, (CircuitOpenError, DeadlineExceeded)) or is_transient(error)
+
+@tool
+def document_qa(query: str) -> str:
+    """
+    Answers questions about general financial concepts by retrieving information
+    from a dedicated knowledge base.
+
+    Args:
+        query (str): The question or topic to search for in the documents.
+
+    Returns:
+        str: A synthesized answer based on the retrieved documents.
+    """
+    print(f"\n--- DEBUG: Executing document_qa with query: '{query}' ---")
+
+    # Near-duplicate conceptual questions are answered from the semantic cache,
+    # without touching OpenSearch or the large model
+    answer_cache = resources.get("answer_cache")
+    query_embedding = None
+    version = None
+    if answer_cache is not None:
+        query_embedding = resources.get("embedding_function").embed_query(query)
+        version = _knowledge_base_version()
+        cached = None if version is None else answer_cache.lookup_by_vector(query_embedding, version=version)
+        tracer.current_span().set_attribute("answer_cache.hit", cached is not None)
+        if cached is not None:
+            return cached[0]
+    
+    # Use the rag_chain created in the RAG Setup section
+    try:
+        with tracer.span("rag.chain") as span:
+            rag_chain = resources.get("rag_chain")
+            if RAG_POLICY is None:
+                result = rag_chain.invoke({"query": query})
+            else:
+                result = RAG_POLICY.call(rag_chain.invoke, {"query": query})
+            span.set_attribute("rag.source_documents", len(result.get("source_documents", [])))
+    except Exception as e:
+        if not _should_degrade(e):
+            raise
+        return _degraded_document_qa(e, answer_cache, query_embedding)
+    answer = _format_rag_result(result)
+    if answer_cache is not None and version is not None and result.get("result"):
+        answer_cache.add(query, answer, query_embedding, version=version)
+    return answer
+
+async def _adocument_qa(query: str) -> str:
+    """Async document_qa: retrieval goes through the AsyncOpenSearch client and generation through ainvoke."""
+    logger.debug("Executing document_qa (async) with query: %r", query)
+    # Building the chain may load the embedding model, so do not do that on the event loop;
+    # the answer cache is SQLite-backed, so its build, lookups and writes also run on a worker thread
+    rag_chain = await asyncio.to_thread(resources.get, "rag_chain")
+
+    answer_cache = await asyncio.to_thread(resources.get, "answer_cache")
+    query_embedding = None
+    version = None
+    if answer_cache is not None:
+        query_embedding = await resources.get("embedding_function").aembed_query(query)
+        # Built along with rag_chain above; see _knowledge_base_version
+        version = await resources.get("vectorstore").aindex_generation()
+        cached = None if version is None else await asyncio.to_thread(
+            answer_cache.lookup_by_vector, query_embedding, version=version
+        )
+        tracer.current_span().set_attribute("answer_cache.hit", cached is not None)
+        if cached is not None:
+            return cached[0]
+
+    try:
+        with tracer.span("rag.chain") as span:
+            if RAG_POLICY is None:
+                result = await rag_chain.ainvoke({"query": query})
+            else:
+                result = await RAG_POLICY.acall(rag_chain.ainvoke, {"query": query})
+            span.set_attribute("rag.source_documents", len(result.get("source_documents", [])))
+    except Exception as e:
+        if not _should_degrade(e):
+            raise
+        return await asyncio.to_thread(run_in_context(_degraded_document_qa, e, answer_cache, query_embedding))
+    answer = _format_rag_result(result)
+    if answer_cache is not None and version is not None and result.get("result"):
+        await asyncio.to_thread(answer_cache.add, query, answer, query_embedding, version=version)
+    return answer
+
+# Used by `document_qa.ainvoke` (FinPalAgent.achat); the sync `invoke` path is unchanged
+document_qa.coroutine = _adocument_qa
+
+tools = [sip_calculator, currency_converter, sip_scenarios, lumpsum_scenarios, required_sip_scenarios, currency_conversion_table, document_qa] # List of all tools, use document_qa if RAG is enabled
 tool_map = {tool.name: tool for tool in tools} # Create a map for easy lookup
 # print(f"Tools defined: {[t.name for t in tools]}") # Commented out for cleaner general use
 
 # --- 2. Initialize the Mistral LLM via API ---
-llm = ChatMistralAI(model="mistral-small-latest", temperature=0).bind_tools(tools)
+# The tool-bound LLM is the "llm" resource registered above (see _build_llm); it is built lazily.
 # print("LLM initialized with tools bound directly.") # Commented out for cleaner general use
 
 # Define the system message for the agent (global constant for easy import)
@@ -186,6 +638,7 @@ llm = ChatMistralAI(model="mistral-small-latest", temperature=0).bind_tools(tool
 SYSTEM_MESSAGE_CONTENT = (
     "You are a helpful financial assistant named FinPal Advisor. Your main task is to assist users with financial calculations and general financial questions. "
     "Use the 'sip_calculator' or 'currency_converter' tools for any calculations. "
+    "When the user wants to compare several amounts, rates, tenures or currencies, make one call to 'sip_scenarios', 'lumpsum_scenarios', 'required_sip_scenarios' or 'currency_conversion_table' with lists of values instead of many single calculations. "
     "**For general financial questions, such as 'what is inflation?' or 'explain bonds', use the 'document_qa' tool.** "
     "If a query requires multiple steps (e.g., currency conversion then investment calculation), process them sequentially using the correct tools. "
     "If you need more information to perform a calculation, ask clarifying questions. "
@@ -193,56 +646,273 @@ SYSTEM_MESSAGE_CONTENT = (
     "Always provide a clear, concise, and helpful final answer to the user's original question."
 )
 
+# Chat history budget for interactive sessions (prompt tokens re-sent on every agent step)
+HISTORY_MAX_TOKENS = int(os.getenv("FINPAL_HISTORY_MAX_TOKENS", "6000"))
+HISTORY_SUMMARIZE = os.getenv("FINPAL_HISTORY_SUMMARIZE", "false").lower() in ("1", "true", "yes")
+
+def build_history_manager() -> ChatHistoryWindow:
+    """History window for a new chat session, configured from FINPAL_HISTORY_* environment variables."""
+    summarizer = ChatMistralAI(model="mistral-small-latest", temperature=0) if HISTORY_SUMMARIZE else None
+    return ChatHistoryWindow(max_tokens=HISTORY_MAX_TOKENS, summarizer=summarizer)
+
+# Shared, bounded pool for running independent tool calls of one LLM response concurrently.
+# A tool that overruns tool_timeout is abandoned, not interrupted, and holds its worker until it returns;
+# size the pool for the slow calls that can pile up within the dependency deadlines.
+TOOL_MAX_WORKERS = int(os.getenv("FINPAL_TOOL_WORKERS", "8"))
+_default_tool_executor: Optional[ThreadPoolExecutor] = None
+_default_tool_executor_lock = threading.Lock()
+
+def _get_default_tool_executor() -> ThreadPoolExecutor:
+    global _default_tool_executor
+    with _default_tool_executor_lock:
+        if _default_tool_executor is None:
+            _default_tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="finpal-tool")
+        return _default_tool_executor
+
 # --- 3. Custom FinPal Agent Class ---
 class FinPalAgent:
-    def __init__(self, llm: ChatMistralAI, tools: List[Any], system_message_content: str):
+    def __init__(self, llm: ChatMistralAI, tools: List[Any], system_message_content: str,
+                 tool_timeout: Optional[float] = None, tool_executor: Optional[Executor] = None,
+                 history_manager: Optional[ChatHistoryWindow] = None,
+                 llm_policy: Optional[ResiliencePolicy] = None):
         self.llm = llm
+        # Deadline, retries and circuit breaker around the LLM calls (streamed ones too); defaults to LLM_POLICY
+        self.llm_policy = llm_policy if llm_policy is not None else LLM_POLICY
         self.tool_map = {tool.name: tool for tool in tools}
         self.system_message_content = system_message_content
+        # Per tool call timeout in seconds (None = wait for the tool however long it takes)
+        self.tool_timeout = tool_timeout
+        # Independent tool calls from one LLM response run concurrently on this executor
+        self.tool_executor = tool_executor
         # Initialize conversation history with the system message (for interactive chat)
         self.chat_history: List[BaseMessage] = [SystemMessage(content=self.system_message_content)]
+        # Keeps chat_history within a token budget at the start of every turn (None = unbounded history)
+        self.history_manager = history_manager
+        # Message history of the most recent run_for_testing/arun_for_testing call
+        self.last_test_history: List[BaseMessage] = []
         # print("FinPalAgent initialized. Ready for chat.") # Commented out for cleaner general use
 
+    def _invoke_llm(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.llm_policy is None:
+            return self.llm.invoke(messages)
+        return self.llm_policy.call(self.llm.invoke, messages)
+
+    async def _ainvoke_llm(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.llm_policy is None:
+            return await self.llm.ainvoke(messages)
+        return await self.llm_policy.acall(self.llm.ainvoke, messages)
+
+    def _astream_llm(self, messages: List[BaseMessage]) -> AsyncIterator[AIMessageChunk]:
+        if self.llm_policy is None:
+            return self.llm.astream(messages)
+        # Circuit check, time-to-first-token deadline and outcome recording; no retries once tokens flow
+        return self.llm_policy.astream(self.llm.astream, messages, first_item_timeout=LLM_FIRST_TOKEN_TIMEOUT)
+
+    def _invoke_tool(self, tool_call_dict: Dict[str, Any]) -> Any:
+        with tracer.span("tool.call", **{"tool.name": tool_call_dict['name']}) as span:
+            output = self.tool_map[tool_call_dict['name']].invoke(tool_call_dict['args'])
+            if span.records_payloads:
+                span.set_attributes({"tool.input_bytes": payload_size(tool_call_dict['args']),
+                                     "tool.output_bytes": payload_size(str(output))})
+            return output
+
+    async def _ainvoke_tool(self, tool_call_dict: Dict[str, Any]) -> Any:
+        with tracer.span("tool.call", **{"tool.name": tool_call_dict['name']}) as span:
+            output = await self.tool_map[tool_call_dict['name']].ainvoke(tool_call_dict['args'])
+            if span.records_payloads:
+                span.set_attributes({"tool.input_bytes": payload_size(tool_call_dict['args']),
+                                     "tool.output_bytes": payload_size(str(output))})
+            return output
+
+    @staticmethod
+    def _describe_llm_call(span: Any, messages: List[BaseMessage], llm_response: AIMessage) -> None:
+        """Adds message counts, payload sizes and token usage of one LLM call to its span."""
+        usage = getattr(llm_response, "usage_metadata", None) or {}
+        span.set_attributes({
+            "llm.input_messages": len(messages),
+            "llm.tool_calls": len(llm_response.tool_calls),
+            "llm.input_tokens": usage.get("input_tokens", 0),
+            "llm.output_tokens": usage.get("output_tokens", 0),
+        })
+        if span.records_payloads:
+            span.set_attributes({
+                "llm.input_bytes": sum(payload_size(m.content) for m in messages),
+                "llm.output_bytes": payload_size(llm_response.content),
+            })
+
+    def _execute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Any, Optional[BaseException]]]:
+        """
+        Runs the tool calls of one LLM response and returns (tool_call, output, error) in the original order.
+        When there is more than one call (or a timeout is set) they are dispatched concurrently, so the step
+        takes as long as the slowest tool instead of the sum of all of them. Once a call fails or times out,
+        calls that have not started yet are cancelled, because the step is going to stop at that error anyway.
+        A call that is already running cannot be cancelled: after a timeout it is abandoned, but it keeps its
+        pool thread (and keeps talking to OpenSearch/Mistral) until it returns on its own. The dependency
+        deadlines (RAG_POLICY, SEARCH_POLICY, LLM_POLICY) bound how long that can take.
+        """
+        known_calls = [tc for tc in tool_calls if tc['name'] in self.tool_map]
+        if len(known_calls) <= 1 and self.tool_timeout is None:
+            outcomes = []
+            for tool_call_dict in tool_calls:
+                if tool_call_dict['name'] not in self.tool_map:
+                    outcomes.append((tool_call_dict, None, None))
+                    continue
+                try:
+                    outcomes.append((tool_call_dict, self._invoke_tool(tool_call_dict), None))
+                except Exception as e:
+                    outcomes.append((tool_call_dict, None, e))
+            return outcomes
+
+        executor = self.tool_executor or _get_default_tool_executor()
+        futures = [
+            # run_in_context keeps the step's span as the parent of tool spans opened on the worker thread
+            executor.submit(run_in_context(self._invoke_tool, tc)) if tc['name'] in self.tool_map else None
+            for tc in tool_calls
+        ]
+        deadline = None if self.tool_timeout is None else time.monotonic() + self.tool_timeout
+        outcomes = []
+        failed = False
+        for tool_call_dict, future in zip(tool_calls, futures):
+            if future is None:
+                outcomes.append((tool_call_dict, None, None))
+                failed = True
+            elif failed:
+                future.cancel()
+                outcomes.append((tool_call_dict, None, CancelledError()))
+            else:
+                try:
+                    remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                    outcomes.append((tool_call_dict, future.result(timeout=remaining), None))
+                except FutureTimeoutError:
+                    if not future.cancel():
+                        # Still running; counted so a pool starved by slow tools shows up in traces
+                        tracer.current_span().set_attribute("tool.abandoned", tool_call_dict['name'])
+                    outcomes.append((tool_call_dict, None, TimeoutError(f"timed out after {self.tool_timeout}s")))
+                    failed = True
+                except Exception as e:
+                    outcomes.append((tool_call_dict, None, e))
+                    failed = True
+        return outcomes
+
+    def _append_tool_outcomes(self, current_messages: List[BaseMessage],
+                              outcomes: List[Tuple[Dict[str, Any], Any, Optional[BaseException]]],
+                              verbose: bool) -> Optional[str]:
+        """
+        Appends a ToolMessage per tool call, in the order the LLM requested them.
+        Returns the final response if a tool failed or was unknown (which ends the turn), otherwise None.
+        """
+        for tool_call_dict, tool_output, error in outcomes:
+            tool_name = tool_call_dict['name']
+            tool_args = tool_call_dict['args']
+            tool_call_id = tool_call_dict['id']
+
+            if tool_name not in self.tool_map:
+                error_msg = f"LLM requested unknown tool: {tool_name}"
+                if verbose:
+                    print(f"ERROR: {error_msg}")
+                current_messages.append(AIMessage(content=f"ERROR: {error_msg}"))
+                return error_msg # Treat unknown tool as final
+            if error is not None:
+                error_msg = f"Error executing tool '{tool_name}' with args {tool_args}: {error}"
+                if verbose:
+                    print(f"ERROR: {error_msg}")
+                current_messages.append(ToolMessage(content=f"ERROR: {error_msg}", tool_call_id=tool_call_id))
+                return f"An error occurred while using a tool: {error}" # Treat tool error as final
+            if verbose:
+                print(f"Tool '{tool_name}' executed. Output: {tool_output}")
+            current_messages.append(ToolMessage(content=str(tool_output), tool_call_id=tool_call_id))
+        return None
+
+    async def _aexecute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Any, Optional[BaseException]]]:
+        """
+        Async counterpart of _execute_tool_calls: awaits `tool.ainvoke` for every call concurrently on the event loop,
+        with the same ordering, timeout and cancel-the-rest-on-first-failure behaviour.
+        """
+        async def _invoke(tool_call_dict: Dict[str, Any]) -> Any:
+            coroutine = self._ainvoke_tool(tool_call_dict)
+            if self.tool_timeout is None:
+                return await coroutine
+            try:
+                return await asyncio.wait_for(coroutine, timeout=self.tool_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"timed out after {self.tool_timeout}s")
+
+        tasks = [
+            asyncio.ensure_future(_invoke(tc)) if tc['name'] in self.tool_map else None
+            for tc in tool_calls
+        ]
+        outcomes = []
+        failed = False
+        for tool_call_dict, task in zip(tool_calls, tasks):
+            if task is None:
+                outcomes.append((tool_call_dict, None, None))
+                failed = True
+            elif failed:
+                if task.done() and not task.cancelled():
+                    task.exception() # Already finished; retrieve it so asyncio does not log it as unhandled
+                task.cancel()
+                outcomes.append((tool_call_dict, None, CancelledError()))
+            else:
+                try:
+                    outcomes.append((tool_call_dict, await task, None))
+                except Exception as e:
+                    outcomes.append((tool_call_dict, None, e))
+                    failed = True
+        return outcomes
+
+    @traced("agent.step")
     def _run_single_step(self, current_messages: List[BaseMessage], verbose: bool) -> Tuple[str, bool]: # Removed max_steps from signature here
         """
         Executes a single turn of the agent's thought process.
         Returns (response_content, is_final_answer).
         """
-        llm_response = self.llm.invoke(current_messages)
+        with tracer.span("llm.call") as span:
+            llm_response = self._invoke_llm(current_messages)
+            if span.is_recording:
+                self._describe_llm_call(span, current_messages, llm_response)
+
+        if verbose:
+            print(f"\n--- LLM's Raw Response: ---")
+            print(llm_response)
+
+        outcomes = self._execute_tool_calls(llm_response.tool_calls) if llm_response.tool_calls else []
+        return self._finish_step(current_messages, llm_response, outcomes, verbose)
+
+    @traced("agent.step")
+    async def _arun_single_step(self, current_messages: List[BaseMessage], verbose: bool) -> Tuple[str, bool]:
+        """
+        Async version of _run_single_step: the LLM call and the tool calls are awaited, so no thread is held
+        while waiting on Mistral or OpenSearch.
+        Returns (response_content, is_final_answer).
+        """
+        with tracer.span("llm.call") as span:
+            llm_response = await self._ainvoke_llm(current_messages)
+            if span.is_recording:
+                self._describe_llm_call(span, current_messages, llm_response)
 
         if verbose:
             print(f"\n--- LLM's Raw Response: ---")
             print(llm_response)
 
+        outcomes = await self._aexecute_tool_calls(llm_response.tool_calls) if llm_response.tool_calls else []
+        return self._finish_step(current_messages, llm_response, outcomes, verbose)
+
+    def _finish_step(self, current_messages: List[BaseMessage], llm_response: AIMessage,
+                     outcomes: List[Tuple[Dict[str, Any], Any, Optional[BaseException]]],
+                     verbose: bool) -> Tuple[str, bool]:
+        """
+        Records the LLM response (and the tool results, if it asked for tools) in the history
+        and decides whether this step produced the final answer.
+        """
         if llm_response.tool_calls:
             if verbose:
                 print("\n--- LLM requested tool call(s)! Executing tool(s)... ---")
             
             current_messages.append(llm_response) 
 
-            for tool_call_dict in llm_response.tool_calls:
-                tool_name = tool_call_dict['name']
-                tool_args = tool_call_dict['args']
-                tool_call_id = tool_call_dict['id']
-                
-                if tool_name in self.tool_map:
-                    try:
-                        tool_output = self.tool_map[tool_name].invoke(tool_args)
-                        if verbose:
-                            print(f"Tool '{tool_name}' executed. Output: {tool_output}")
-                        current_messages.append(ToolMessage(content=str(tool_output), tool_call_id=tool_call_id))
-                    except Exception as e:
-                        error_msg = f"Error executing tool '{tool_name}' with args {tool_args}: {e}"
-                        if verbose:
-                            print(f"ERROR: {error_msg}")
-                        current_messages.append(ToolMessage(content=f"ERROR: {error_msg}", tool_call_id=tool_call_id))
-                        return f"An error occurred while using a tool: {e}", True # Treat tool error as final
-                else:
-                    error_msg = f"LLM requested unknown tool: {tool_name}"
-                    if verbose:
-                        print(f"ERROR: {error_msg}")
-                    current_messages.append(AIMessage(content=f"ERROR: {error_msg}"))
-                    return error_msg, True # Treat unknown tool as final
+            error_response = self._append_tool_outcomes(current_messages, outcomes, verbose)
+            if error_response is not None:
+                return error_response, True
 
             if llm_response.content:
                 if verbose:
@@ -262,15 +932,51 @@ class FinPalAgent:
                 print("\n--- LLM response was empty or unhandled. Breaking loop. ---")
             return "The LLM did not provide a clear response.", True
 
+    @staticmethod
+    def _print_history(title: str, history: List[BaseMessage]) -> None:
+        print(f"{title} ({len(history)} messages):")
+        for msg in history[-min(len(history), 8):]:
+            print(f"  {type(msg).__name__}: {msg.content[:100]}..." + 
+                  (f" (Tool Calls: {msg.tool_calls})" if hasattr(msg, 'tool_calls') and msg.tool_calls else ""))
+
+    def _start_turn(self, user_query: str, verbose: bool) -> None:
+        if verbose:
+            print(f"\n--- User: {user_query} ---")
+
+        self.chat_history.append(HumanMessage(content=user_query))
+        span = tracer.current_span()
+        span.set_attribute("turn.history_messages", len(self.chat_history))
+        if span.records_payloads:
+            span.set_attribute("turn.query_bytes", payload_size(user_query))
+
+    def _end_turn(self, response_content: str, final_answer_received: bool, max_steps_per_turn: int, verbose: bool) -> str:
+        if not final_answer_received:
+            response_content = f"Agent reached maximum internal steps ({max_steps_per_turn}) for this turn without a final answer. Please rephrase or try again."
+            if not isinstance(self.chat_history[-1], AIMessage):
+                 self.chat_history.append(AIMessage(content=response_content))
+        elif final_answer_received and not isinstance(self.chat_history[-1], AIMessage):
+            self.chat_history.append(AIMessage(content=response_content))
+
+        span = tracer.current_span()
+        span.set_attribute("turn.final_answer", final_answer_received)
+        if span.records_payloads:
+            span.set_attribute("turn.response_bytes", payload_size(response_content))
+
+        if verbose:
+            print(f"\n--- FinPal Agent Final Response for this turn: ---")
+            print(response_content)
+        
+        return response_content
+
+    @traced("agent.turn", **{"agent.method": "chat"})
     def chat(self, user_query: str, max_steps_per_turn: int = 5, verbose: bool = False) -> str: # Default verbose to False for general chat
         """
         Processes a single user query in a multi-turn chat.
         Maintains continuous chat_history.
         """
-        if verbose:
-            print(f"\n--- User: {user_query} ---")
-
-        self.chat_history.append(HumanMessage(content=user_query))
+        self._start_turn(user_query, verbose)
+        if self.history_manager is not None:
+            self.chat_history = self.history_manager.trim(self.chat_history)
         
         response_content = "An internal error occurred."
         final_answer_received = False
@@ -278,10 +984,7 @@ class FinPalAgent:
         for step in range(max_steps_per_turn):
             if verbose:
                 print(f"\n--- Agent Internal Step {step + 1} ---")
-                print(f"Current full chat history ({len(self.chat_history)} messages):")
-                for msg in self.chat_history[-min(len(self.chat_history), 8):]:
-                    print(f"  {type(msg).__name__}: {msg.content[:100]}..." + 
-                          (f" (Tool Calls: {msg.tool_calls})" if hasattr(msg, 'tool_calls') and msg.tool_calls else ""))
+                self._print_history("Current full chat history", self.chat_history)
 
             try:
                 response_content, final_answer_received = self._run_single_step(
@@ -298,19 +1001,129 @@ class FinPalAgent:
                 final_answer_received = True
                 break
 
-        if not final_answer_received:
-            response_content = f"Agent reached maximum internal steps ({max_steps_per_turn}) for this turn without a final answer. Please rephrase or try again."
-            if not isinstance(self.chat_history[-1], AIMessage):
-                 self.chat_history.append(AIMessage(content=response_content))
-        elif final_answer_received and not isinstance(self.chat_history[-1], AIMessage):
-            self.chat_history.append(AIMessage(content=response_content))
+        return self._end_turn(response_content, final_answer_received, max_steps_per_turn, verbose)
+
+    @traced("agent.turn", **{"agent.method": "achat"})
+    async def achat(self, user_query: str, max_steps_per_turn: int = 5, verbose: bool = False) -> str:
+        """
+        Async version of chat for event-loop hosts such as Chainlit.
+        Uses `ainvoke` for the LLM and the tools, so an in-flight conversation does not hold a worker thread.
+        """
+        self._start_turn(user_query, verbose)
+        if self.history_manager is not None:
+            self.chat_history = await self.history_manager.atrim(self.chat_history)
+
+        response_content = "An internal error occurred."
+        final_answer_received = False
+
+        for step in range(max_steps_per_turn):
+            if verbose:
+                print(f"\n--- Agent Internal Step {step + 1} ---")
+                self._print_history("Current full chat history", self.chat_history)
+
+            try:
+                response_content, final_answer_received = await self._arun_single_step(
+                    self.chat_history, verbose
+                )
+
+                if final_answer_received:
+                    break
+
+            except Exception as e:
+                if verbose:
+                    print(f"\nAn unexpected error occurred in FinPalAgent.achat: {e}")
+                response_content = f"An unexpected internal error occurred: {e}"
+                final_answer_received = True
+                break
+
+        return self._end_turn(response_content, final_answer_received, max_steps_per_turn, verbose)
+
+    @traced("agent.turn", **{"agent.method": "astream_chat"})
+    async def astream_chat(self, user_query: str, max_steps_per_turn: int = 5, verbose: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming version of achat. Yields events as the turn progresses, so a UI can show output
+        before the whole multi-step turn has finished:
+
+            {"type": "token", "content": str}                                   text from the LLM, as it arrives
+            {"type": "tool_start", "id": str, "name": str, "args": dict}        before a tool call runs
+            {"type": "tool_end", "id": str, "name": str, "output": str, "error": str | None}
+            {"type": "final", "content": str}                                   the turn's final answer (always last)
+
+        Tokens come from every LLM step; in practice only the final step produces text, since steps that
+        request tools return no content. chat_history is updated exactly as in chat/achat.
+        """
+        self._start_turn(user_query, verbose)
+        if self.history_manager is not None:
+            self.chat_history = await self.history_manager.atrim(self.chat_history)
+
+        response_content = "An internal error occurred."
+        final_answer_received = False
+
+        for step in range(max_steps_per_turn):
+            if verbose:
+                print(f"\n--- Agent Internal Step {step + 1} ---")
+                self._print_history("Current full chat history", self.chat_history)
+
+            try:
+                response_chunk: Optional[AIMessageChunk] = None
+                with tracer.span("llm.call", **{"llm.streaming": True}) as span:
+                    async for chunk in self._astream_llm(self.chat_history):
+                        response_chunk = chunk if response_chunk is None else response_chunk + chunk
+                        if isinstance(chunk.content, str) and chunk.content:
+                            yield {"type": "token", "content": chunk.content}
+                    if response_chunk is None:
+                        response_chunk = AIMessageChunk(content="")
+                    llm_response = message_chunk_to_message(response_chunk)
+                    if span.is_recording:
+                        self._describe_llm_call(span, self.chat_history, llm_response)
+
+                if verbose:
+                    print(f"\n--- LLM's Raw Response: ---")
+                    print(llm_response)
+
+                outcomes = []
+                if llm_response.tool_calls:
+                    for tool_call_dict in llm_response.tool_calls:
+                        yield {"type": "tool_start", "id": tool_call_dict['id'],
+                               "name": tool_call_dict['name'], "args": tool_call_dict['args']}
+                    outcomes = await self._aexecute_tool_calls(llm_response.tool_calls)
+                    for tool_call_dict, tool_output, error in outcomes:
+                        yield {"type": "tool_end", "id": tool_call_dict['id'], "name": tool_call_dict['name'],
+                               "output": None if tool_output is None else str(tool_output),
+                               "error": None if error is None else str(error)}
+
+                response_content, final_answer_received = self._finish_step(
+                    self.chat_history, llm_response, outcomes, verbose
+                )
+
+                if final_answer_received:
+                    break
 
+            except Exception as e:
+                if verbose:
+                    print(f"\nAn unexpected error occurred in FinPalAgent.astream_chat: {e}")
+                response_content = f"An unexpected internal error occurred: {e}"
+                final_answer_received = True
+                break
+
+        yield {"type": "final", "content": self._end_turn(response_content, final_answer_received, max_steps_per_turn, verbose)}
+
+    def _new_test_history(self, user_query: str, verbose: bool, method: str) -> List[BaseMessage]:
         if verbose:
-            print(f"\n--- FinPal Agent Final Response for this turn: ---")
-            print(response_content)
-        
-        return response_content
+            print(f"\n--- Starting FinPalAgent.{method} for Query: {user_query} ---")
 
+        # Create a fresh, temporary conversation history for this query
+        temp_query_history: List[BaseMessage] = [SystemMessage(content=self.system_message_content)]
+        temp_query_history.append(HumanMessage(content=user_query))
+        return temp_query_history
+
+    @staticmethod
+    def _max_steps_test_response(user_query: str, max_steps: int, temp_query_history: List[BaseMessage]) -> str:
+        return (f"Agent reached maximum steps ({max_steps}) without a final answer "
+                f"for test query: '{user_query[:50]}...'. "
+                f"Last message in history: {temp_query_history[-1].content[:100]}...")
+
+    @traced("agent.turn", **{"agent.method": "run_for_testing"})
     def run_for_testing(self, user_query: str, max_steps: int = 5, verbose: bool = False) -> str:
         """
         Runs the agent for a single query, resetting its internal history for each call.
@@ -324,12 +1137,8 @@ class FinPalAgent:
         Returns:
             str: The final response from the agent.
         """
-        if verbose:
-            print(f"\n--- Starting FinPalAgent.run_for_testing for Query: {user_query} ---")
-
-        # Create a fresh, temporary conversation history for this query
-        temp_query_history: List[BaseMessage] = [SystemMessage(content=self.system_message_content)]
-        temp_query_history.append(HumanMessage(content=user_query))
+        temp_query_history = self._new_test_history(user_query, verbose, "run_for_testing")
+        self.last_test_history = temp_query_history # Kept for evaluation tooling (steps, tool calls)
         
         final_response_content = "The agent could not generate a clear response for this test query."
         final_answer_received = False
@@ -337,10 +1146,7 @@ class FinPalAgent:
         for step in range(max_steps):
             if verbose:
                 print(f"\n--- Test Run Internal Step {step + 1} ---")
-                print(f"Current temp query history ({len(temp_query_history)} messages):")
-                for msg in temp_query_history[-min(len(temp_query_history), 8):]:
-                    print(f"  {type(msg).__name__}: {msg.content[:100]}..." + 
-                          (f" (Tool Calls: {msg.tool_calls})" if hasattr(msg, 'tool_calls') and msg.tool_calls else ""))
+                self._print_history("Current temp query history", temp_query_history)
 
             try:
                 response_content, final_answer_received = self._run_single_step(
@@ -359,15 +1165,60 @@ class FinPalAgent:
                 break
 
         if not final_answer_received:
-            final_response_content = (f"Agent reached maximum steps ({max_steps}) without a final answer "
-                                      f"for test query: '{user_query[:50]}...'. "
-                                      f"Last message in history: {temp_query_history[-1].content[:100]}...")
+            final_response_content = self._max_steps_test_response(user_query, max_steps, temp_query_history)
         
         if verbose:
             print(f"\n--- FinPalAgent.run_for_testing finished for query: {user_query} ---")
         
         return final_response_content
 
+    @traced("agent.turn", **{"agent.method": "arun_for_testing"})
+    async def arun_for_testing(self, user_query: str, max_steps: int = 5, verbose: bool = False) -> str:
+        """
+        Async version of run_for_testing; lets an evaluation run many independent queries on one event loop.
+
+        Args:
+            user_query (str): The user's input query.
+            max_steps (int): Maximum internal agent steps for THIS user query.
+            verbose (bool): If True, prints detailed debugging information during execution.
+
+        Returns:
+            str: The final response from the agent.
+        """
+        temp_query_history = self._new_test_history(user_query, verbose, "arun_for_testing")
+        self.last_test_history = temp_query_history # Kept for evaluation tooling (steps, tool calls)
+
+        final_response_content = "The agent could not generate a clear response for this test query."
+        final_answer_received = False
+
+        for step in range(max_steps):
+            if verbose:
+                print(f"\n--- Test Run Internal Step {step + 1} ---")
+                self._print_history("Current temp query history", temp_query_history)
+
+            try:
+                response_content, final_answer_received = await self._arun_single_step(
+                    temp_query_history, verbose
+                )
+
+                if final_answer_received:
+                    final_response_content = response_content
+                    break
+
+            except Exception as e:
+                if verbose:
+                    print(f"\nAn unexpected error occurred in FinPalAgent.arun_for_testing: {e}")
+                final_response_content = f"An unexpected internal error occurred during testing: {e}"
+                final_answer_received = True
+                break
+
+        if not final_answer_received:
+            final_response_content = self._max_steps_test_response(user_query, max_steps, temp_query_history)
+
+        if verbose:
+            print(f"\n--- FinPalAgent.arun_for_testing finished for query: {user_query} ---")
+
+        return final_response_content
 
 if __name__ == "__main__":
     # This block ensures that when finPal_agent.py is run as the main script,
@@ -376,7 +1227,7 @@ if __name__ == "__main__":
     print("Type 'quit' or 'exit' to end the chat.")
 
     # Create an agent instance specific to this execution
-    interactive_agent = FinPalAgent(llm=llm, tools=tools, system_message_content=SYSTEM_MESSAGE_CONTENT)
+    interactive_agent = FinPalAgent(llm=resources.get("llm"), tools=tools, system_message_content=SYSTEM_MESSAGE_CONTENT)
 
     while True:
         user_input = input("\nMe: ")
@@ -0,0 +1,135 @@
+# financial_math.py
+# Closed-form, NumPy-vectorized financial formulas used by the FinPal calculator tools.
+# Every function accepts scalars or arrays and broadcasts them against each other,
+# so one call can evaluate a whole table of what-if scenarios.
+from itertools import product
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+MONTHS_PER_YEAR = 12
+
+
+def _as_arrays(*values):
+    return [np.asarray(v, dtype=np.float64) for v in values]
+
+
+def sip_future_value(monthly_investment, annual_interest_rate, years):
+    """
+    Future value of a monthly SIP, invested at the start of each month (annuity due).
+
+    Args:
+        monthly_investment: Amount invested every month.
+        annual_interest_rate: Expected annual return as a decimal (0.12 for 12%).
+        years: Investment tenure in years.
+
+    Returns:
+        np.ndarray: Future value for every broadcast combination of the inputs.
+    """
+    p, r, y = _as_arrays(monthly_investment, annual_interest_rate, years)
+    monthly_rate = r / MONTHS_PER_YEAR
+    months = y * MONTHS_PER_YEAR
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = ((1 + monthly_rate) ** months - 1) / monthly_rate * (1 + monthly_rate)
+    return p * np.where(monthly_rate == 0, months, growth)
+
+
+def lumpsum_future_value(principal, annual_interest_rate, years, compounding_per_year=1):
+    """
+    Future value of a one-time investment with periodic compounding.
+
+    Args:
+        principal: Amount invested today.
+        annual_interest_rate: Annual return as a decimal.
+        years: Holding period in years.
+        compounding_per_year: Compounding periods per year (1 = yearly, 12 = monthly).
+
+    Returns:
+        np.ndarray: Future value for every broadcast combination of the inputs.
+    """
+    p, r, y, n = _as_arrays(principal, annual_interest_rate, years, compounding_per_year)
+    return p * (1 + r / n) ** (n * y)
+
+
+def required_monthly_sip(target_amount, annual_interest_rate, years):
+    """
+    Monthly SIP needed to reach a target corpus (inverse of sip_future_value).
+
+    Args:
+        target_amount: Corpus to reach at the end of the tenure.
+        annual_interest_rate: Expected annual return as a decimal.
+        years: Investment tenure in years.
+
+    Returns:
+        np.ndarray: Required monthly investment for every broadcast combination.
+    """
+    target, = _as_arrays(target_amount)
+    return target / sip_future_value(1.0, annual_interest_rate, years)
+
+
+def step_up_sip_future_value(monthly_investment, annual_interest_rate, years, annual_step_up):
+    """
+    Future value of a SIP whose monthly amount grows by `annual_step_up` every year.
+
+    In year k (k = 0 .. years-1) the monthly amount is P * (1 + s)^k. Each year's twelve
+    instalments are worth P * (1 + s)^k * A at the end of that year, where A is the
+    one-year annuity-due factor, and then compound for the remaining years. The sum is a
+    geometric series in q = (1 + s) / (1 + i)^12, so no loop over years is needed.
+
+    Args:
+        monthly_investment: Monthly amount in the first year.
+        annual_interest_rate: Expected annual return as a decimal.
+        years: Tenure in whole years.
+        annual_step_up: Yearly increase of the monthly amount as a decimal (0.10 for 10%).
+
+    Returns:
+        np.ndarray: Future value for every broadcast combination of the inputs.
+    """
+    p, r, y, s = _as_arrays(monthly_investment, annual_interest_rate, years, annual_step_up)
+    y = np.floor(y)
+    one_year_factor = sip_future_value(1.0, r, 1)
+    yearly_growth = (1 + r / MONTHS_PER_YEAR) ** MONTHS_PER_YEAR
+    q = (1 + s) / yearly_growth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        series = np.where(np.isclose(q, 1.0), y, (q ** y - 1) / (q - 1))
+    return p * one_year_factor * yearly_growth ** (y - 1) * series
+
+
+def inflation_adjusted_value(amount, inflation_rate, years):
+    """
+    Value of a future amount in today's money.
+
+    Args:
+        amount: Nominal amount at the end of the period.
+        inflation_rate: Expected annual inflation as a decimal.
+        years: Number of years until the amount is received.
+
+    Returns:
+        np.ndarray: Present-day purchasing power for every broadcast combination.
+    """
+    a, i, y = _as_arrays(amount, inflation_rate, years)
+    return a / (1 + i) ** y
+
+
+def scenario_grid(**parameters: Sequence) -> Dict[str, np.ndarray]:
+    """
+    Cartesian product of parameter lists, as flat arrays ready to pass to the functions above.
+
+    Example:
+        grid = scenario_grid(monthly_investment=[5000, 10000], annual_interest_rate=[0.08, 0.12], years=[10])
+        values = sip_future_value(**grid)   # 4 scenarios in one call
+    """
+    names = list(parameters)
+    rows = list(product(*(np.atleast_1d(parameters[name]).tolist() for name in names)))
+    return {name: np.array([row[i] for row in rows], dtype=np.float64) for i, name in enumerate(names)}
+
+
+def format_table(columns: Dict[str, Sequence], decimals: int = 2) -> str:
+    """Render equally long columns as a compact markdown table (the form the LLM reads best)."""
+    names = list(columns)
+    lines = ["| " + " | ".join(names) + " |", "|" + "---|" * len(names)]
+    rows: List[str] = []
+    for values in zip(*(columns[name] for name in names)):
+        cells = [f"{v:,.{decimals}f}" if isinstance(v, (float, np.floating)) else str(v) for v in values]
+        rows.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines + rows)
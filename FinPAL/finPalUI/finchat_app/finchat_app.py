@@ -1,3 +1,4 @@
+import asyncio
 import chainlit as cl
 import os
 from dotenv import load_dotenv
@@ -11,7 +12,12 @@ finpal_agent_dir = r"finchat_app"
 if finpal_agent_dir not in sys.path:
     sys.path.insert(0, finpal_agent_dir)
 
-from finPalChatNew import FinPalAgent, llm, tools, SYSTEM_MESSAGE_CONTENT
+from finPalChatNew import FinPalAgent, tools, SYSTEM_MESSAGE_CONTENT, resources, build_history_manager
+from utils.metrics import get_metrics
+
+# Start building the embedding model, OpenSearch client and RAG chain in the background
+# so the first document_qa call does not pay for them (no-op if main.py already did this).
+resources.warm_up()
 
 @cl.on_chat_start
 async def start():
@@ -28,12 +34,14 @@ async def start():
     # Create a new instance of the custom agent for each session
     # This ensures each user has their own chat history and state.
     agent_instance = FinPalAgent(
-        llm=llm, # Use the already initialized LLM from finPalChatNew
+        llm=await asyncio.to_thread(resources.get, "llm"), # Lazily built (or already warmed up) tool-bound LLM from finPalChatNew
         tools=tools, # Use the tools from finPalChatNew
-        system_message_content=SYSTEM_MESSAGE_CONTENT
+        system_message_content=SYSTEM_MESSAGE_CONTENT,
+        history_manager=build_history_manager() # Bounded, token-aware history window per session
     )
     # Store the agent instance in the user session for persistence across messages
     cl.user_session.set("agent", agent_instance)
+    get_metrics().active_sessions.inc()
     
 
     await cl.Message(
@@ -43,6 +51,11 @@ async def start():
     ).send()
 
 
+@cl.on_chat_end
+async def end():
+    """Called when a chat session is closed; keeps the active session gauge accurate."""
+    get_metrics().active_sessions.dec()
+
 @cl.on_message
 async def main(message: cl.Message):
     """
@@ -57,19 +70,41 @@ async def main(message: cl.Message):
         return
 
     try:
-        # Use a Chainlit step to show the agent's work in the UI
-        async with cl.Step(name="FinPal Agent Processing", type="agent") as step:
-            # call the `chat` method of FinPalAgent instance
-            # cl.make_async is used to run synchronous functions in an async context,
-            # which is necessary for Chainlit's event loop.
-            response_content = await cl.make_async(agent_instance.chat)(
-                user_query=message.content,
-                verbose=True # Set to True to see detailed steps in Chainlit's debug view
-            )
-            step.output = response_content # Set the final output of the step
+        # Use a Chainlit step to show the agent's work in the UI.
+        # It is sent up front (not used as a context manager) so that the answer message
+        # below stays a top-level message while its tokens are streamed.
+        step = cl.Step(name="FinPal Agent Processing", type="agent")
+        await step.send()
+        tool_steps = {}
+        answer = cl.Message(content="", author="FinPal")
+
+        # Stream the turn: tool calls become child steps as they run, and the final
+        # answer's tokens are shown as soon as Mistral produces them.
+        async for event in agent_instance.astream_chat(
+            user_query=message.content,
+            verbose=True # Set to True to see detailed steps in Chainlit's debug view
+        ):
+            if event["type"] == "tool_start":
+                tool_step = cl.Step(name=event["name"], type="tool", parent_id=step.id)
+                tool_step.input = event["args"]
+                await tool_step.send()
+                tool_steps[event["id"]] = tool_step
+            elif event["type"] == "tool_end":
+                tool_step = tool_steps.pop(event["id"], None)
+                if tool_step is not None:
+                    tool_step.output = event["output"] if event["error"] is None else f"ERROR: {event['error']}"
+                    await tool_step.update()
+            elif event["type"] == "token":
+                await answer.stream_token(event["content"])
+            elif event["type"] == "final":
+                response_content = event["content"]
+
+        step.output = response_content # Set the final output of the step
+        await step.update()
 
-        # Send the final response back to the Chainlit UI
-        await cl.Message(content=response_content, author="FinPal").send()
+        # Send the final response back to the Chainlit UI (finalizes the streamed message)
+        answer.content = response_content
+        await answer.send()
 
     except Exception as e:
         await cl.Message(content=f"FinPal Advisor encountered an error: {e}\nPlease try again or rephrase your query.").send()
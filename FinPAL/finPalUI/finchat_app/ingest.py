@@ -0,0 +1,412 @@
+# ingest.py
+# Streaming, incremental bulk ingestion of a document folder into the FinPal knowledge base index.
+#
+#   python ingest.py ./knowledge_base --workers 4 --batch-size 64
+#
+# Pipeline (everything is bounded, so memory stays flat regardless of corpus size):
+#   read files -> split into chunks -> batches of --batch-size chunks
+#     -> embedded on a process pool (one model per worker process, --workers processes)
+#     -> bulk indexed with async_streaming_bulk while the next batches are still being embedded
+# At most --max-pending embedded-or-embedding batches exist at any time; when indexing is the
+# bottleneck the reader simply waits.
+#
+# Re-runs are incremental. Chunk ids are content hashes, and a local manifest records, per file,
+# the file hash and the chunk ids indexed from it:
+#   unchanged file        -> skipped without being split or embedded
+#   changed file          -> only chunks with new ids are embedded and indexed
+#   chunks/files removed  -> their ids are bulk-deleted with OpenSearchVectorSearch.delete
+#
+# A new index can store compact vectors (--vector-data-type fp16|byte) and product-quantized codes
+# for the MMR re-rank (--pq-subspaces); the codebooks are trained on the first --pq-train-size
+# chunks, which are held back until training is done. An existing index keeps its own encoding.
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".markdown", ".pdf")
+MANIFEST_VERSION = 1
+
+Chunk = Tuple[str, Dict[str, Any], str]  # (text, metadata, document id)
+
+
+# --- 1. Manifest of what has been indexed ---
+class Manifest:
+    """Local record of the indexed corpus: source path -> {"sha256": file hash, "ids": chunk ids}.
+
+    A manifest only describes the index and embedding model it was written for; if either
+    differs it is ignored and everything is (re)indexed.
+    """
+
+    def __init__(self, path: str, index_name: str, embedding_model: str):
+        self.path = path
+        self.index_name = index_name
+        self.embedding_model = embedding_model
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> "Manifest":
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if (data.get("version") != MANIFEST_VERSION or data.get("index") != self.index_name
+                or data.get("embedding_model") != self.embedding_model):
+            print(f"Manifest {self.path} was written for another index or embedding model; ignoring it.")
+            return self
+        self.files = data.get("files", {})
+        return self
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "index": self.index_name,
+            "embedding_model": self.embedding_model,
+            "files": self.files,
+        }
+        # Write-then-rename so an interrupted run never leaves a truncated manifest behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+# --- 2. Reading and chunking ---
+def read_document(path: str, data: bytes) -> Optional[str]:
+    """Text of a .txt/.md file, or of a .pdf's text layer (needs `pip install pypdf`)."""
+    if path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            print(f"Skipping {path}: reading PDFs needs pypdf (`pip install pypdf`).")
+            return None
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+    return data.decode("utf-8", errors="replace")
+
+
+def iter_files(root: str) -> Iterator[str]:
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+
+class IngestPlan:
+    """Walks the corpus against the manifest; yields only the chunks that need embedding and
+    keeps track of what every file should look like in the manifest afterwards."""
+
+    def __init__(self, root: str, manifest: Manifest, chunk_size: int, chunk_overlap: int):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        self.root = root
+        self.manifest = manifest
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.seen: Set[str] = set()
+        self.updated: Dict[str, Dict[str, Any]] = {}  # source -> new manifest entry
+        self.stale_ids: List[str] = []
+        self.unchanged_files = 0
+        self.reused_chunks = 0
+        self.removed_files = 0
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """Chunks that are not in the index yet, one file in memory at a time."""
+        # The id add_texts would give the same chunk; it ignores the chunk position
+        from utils.opensearch_vector_search import _content_hash_id
+
+        for path in iter_files(self.root):
+            source = os.path.relpath(path, self.root)
+            self.seen.add(source)
+            with open(path, "rb") as f:
+                data = f.read()
+            file_hash = hashlib.sha256(data).hexdigest()
+            previous = self.manifest.files.get(source)
+            if previous is not None and previous.get("sha256") == file_hash:
+                self.unchanged_files += 1
+                continue
+
+            text = read_document(path, data)
+            if text is None:
+                continue  # Unreadable here (e.g. no pypdf); leave whatever was indexed untouched
+            indexed = set(previous["ids"]) if previous else set()
+            ids: List[str] = []
+            for i, chunk in enumerate(self.splitter.split_text(text) if text.strip() else []):
+                metadata = {"source": source, "chunk": i}
+                _id = _content_hash_id(chunk, metadata)
+                if _id in ids:
+                    continue  # Repeated text within the file; one document is enough
+                ids.append(_id)
+                if _id in indexed:
+                    # Kept as indexed, including its `chunk` position, which may now be out of date
+                    self.reused_chunks += 1
+                    continue
+                yield chunk, metadata, _id
+            self.stale_ids.extend(indexed.difference(ids))
+            self.updated[source] = {"sha256": file_hash, "ids": ids}
+
+    def finalize(self, failed_ids: Set[str]) -> List[str]:
+        """Fold the results into the manifest; returns the ids to delete from the index."""
+        stale_ids = list(self.stale_ids)
+        for source in [source for source in self.manifest.files if source not in self.seen]:
+            stale_ids.extend(self.manifest.files.pop(source)["ids"])
+            self.removed_files += 1
+        for source, entry in self.updated.items():
+            if failed_ids.intersection(entry["ids"]):
+                # Drop the file hash so the next run revisits the file and retries the failed chunks
+                entry = {"sha256": None, "ids": [_id for _id in entry["ids"] if _id not in failed_ids]}
+            self.manifest.files[source] = entry
+        return stale_ids
+
+
+def iter_batches(chunks: Iterator[Chunk], batch_size: int) -> Iterator[List[Chunk]]:
+    batch: List[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- 3. Embedding worker processes ---
+_worker_model = None
+
+
+def _init_worker(threads_per_worker: int) -> None:
+    """Runs once in every worker process: limit its BLAS/torch threads and load the model."""
+    global _worker_model
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads_per_worker)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    from finPalChatNew import build_base_embedding_model
+    _worker_model = build_base_embedding_model()
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    # float32 array: a quarter of the pickling cost of a list of Python floats
+    return np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+
+
+# --- 4. Indexing ---
+def _to_actions(index_name: str, batch: List[Chunk], vectors: np.ndarray, encoding: Dict[str, Any],
+                quantizer: Any) -> Iterator[Dict[str, Any]]:
+    from utils.opensearch_vector_search import OpenSearchVectorSearch
+
+    encoded, extra_fields = OpenSearchVectorSearch._encode_documents(vectors, encoding, quantizer)
+    for i, ((text, metadata, _id), vector) in enumerate(zip(batch, encoded)):
+        yield {
+            "_op_type": "index",
+            "_index": index_name,
+            "_id": _id,
+            "vector_field": vector,
+            "text": text,
+            "metadata": metadata,
+            **(extra_fields[i] if extra_fields else {}),
+        }
+
+
+class IngestStats:
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.batches = 0
+        self.chunks_embedded = 0
+        self.indexed = 0
+        self.failed = 0
+        self.deleted = 0
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        return (f"{self.chunks_embedded} chunks embedded, {self.indexed} indexed, {self.failed} failed, "
+                f"{self.deleted} deleted in {elapsed:.1f}s ({self.indexed / elapsed if elapsed else 0:.1f} chunks/s)")
+
+
+async def ingest(args: argparse.Namespace) -> IngestStats:
+    from opensearchpy.helpers import async_streaming_bulk
+    from finPalChatNew import EMBEDDING_MODEL_NAME, INDEX_NAME, resources
+    from utils.opensearch_vector_search import OpenSearchVectorSearch, _default_text_mapping
+    from utils.vector_codecs import ProductQuantizer
+
+    index_name = args.index or INDEX_NAME
+    manifest = Manifest(args.manifest or f"ingest_manifest_{index_name}.json", index_name, EMBEDDING_MODEL_NAME)
+    if not args.rebuild:
+        manifest.load()
+    plan = IngestPlan(args.path, manifest, args.chunk_size, args.chunk_overlap)
+
+    # The app's write/admin clients: transport defaults, not the deadline-capped search clients
+    client = resources.get("async_client")
+    # Index creation and deletes go through the vector store so they share its index cache and bulk_load()
+    vectorstore = OpenSearchVectorSearch(
+        opensearch_url=None, index_name=index_name, embedding_function=None,
+        opensearch_client=resources.get("client"), async_opensearch_client=client,
+        vector_data_type=args.vector_data_type,
+    )
+    engine = args.engine or ("nmslib" if args.vector_data_type == "float" else "faiss")
+    # PQ codebooks are only trained for a new index; an existing one keeps what it was created with
+    train_pq = bool(args.pq_subspaces) and not await client.indices.exists(index=index_name)
+    loop = asyncio.get_running_loop()
+    stats = IngestStats()
+    failed_ids: Set[str] = set()
+    embedded: "asyncio.Queue[Optional[Tuple[List[Chunk], np.ndarray]]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(args.max_pending)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // args.workers)
+
+    # During a bulk load refreshes and replicas are off; abulk_load() restores them and refreshes once
+    load = vectorstore.abulk_load(index_name) if args.bulk_load else contextlib.nullcontext()
+    async with load:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(threads_per_worker,)) as pool:
+
+            async def embed(batch: List[Chunk]) -> None:
+                try:
+                    vectors = await loop.run_in_executor(pool, _embed_batch, [text for text, _, _ in batch])
+                    await embedded.put((batch, vectors))
+                except Exception as e:
+                    print(f"Embedding a batch from {batch[0][1]['source']} failed: {e}")
+                    stats.failed += len(batch)
+                    failed_ids.update(_id for _, _, _id in batch)
+                    slots.release()
+
+            async def produce() -> None:
+                tasks = set()
+                batches = iter_batches(plan.iter_chunks(), args.batch_size)
+                while True:
+                    await slots.acquire() # Released once the batch has been handed to the bulk indexer
+                    # Reading/splitting a file is blocking work; keep it off the event loop
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        slots.release()
+                        break
+                    task = asyncio.ensure_future(embed(batch))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+                await embedded.put(None)
+
+            async def prepare_index(sample: np.ndarray) -> Tuple[Dict[str, Any], Any]:
+                """Create the index (if needed) from the first embedded chunks; returns its encoding."""
+                if train_pq:
+                    if len(sample) >= 256:
+                        print(f"--- Training PQ codebooks ({args.pq_subspaces} subspaces) on {len(sample)} chunks ---")
+                        vectorstore.product_quantizer = await asyncio.to_thread(
+                            ProductQuantizer.fit, sample, m=args.pq_subspaces)
+                    else:
+                        print(f"Only {len(sample)} chunks to train PQ codebooks on (256 needed); skipping PQ.")
+                encoding = await vectorstore._awrite_encoding(index_name, sample)
+                mapping = _default_text_mapping(sample.shape[1], engine, vector_encoding=encoding)
+                await vectorstore._aensure_index(index_name, mapping)
+                return encoding, await vectorstore._aquantizer(index_name)
+
+            async def actions() -> AsyncIterator[Dict[str, Any]]:
+                encoding = quantizer = None
+                held: List[Tuple[List[Chunk], np.ndarray]] = []  # Batches waiting for the index to exist
+                training_size = args.pq_train_size if train_pq else 1
+                while True:
+                    item = await embedded.get()
+                    if item is not None:
+                        # The slot is freed as soon as the batch leaves the queue; held batches are
+                        # bounded by --pq-train-size instead
+                        slots.release()
+                        held.append(item)
+                    if encoding is None:
+                        if item is not None and sum(len(batch) for batch, _ in held) < training_size:
+                            continue
+                        if not held:
+                            return
+                        encoding, quantizer = await prepare_index(np.concatenate([v for _, v in held]))
+                    for batch, vectors in held:
+                        stats.batches += 1
+                        stats.chunks_embedded += len(batch)
+                        for action in _to_actions(index_name, batch, vectors, encoding, quantizer):
+                            yield action
+                        if stats.batches % 10 == 0:
+                            print(f"--- {stats.report()} ---")
+                    held = []
+                    if item is None:
+                        return
+
+            producer = asyncio.ensure_future(produce())
+            async for ok, result in async_streaming_bulk(
+                client, actions(), chunk_size=args.bulk_size, max_chunk_bytes=args.max_chunk_bytes,
+                raise_on_error=False, max_retries=args.max_retries, yield_ok=True,
+            ):
+                if ok:
+                    stats.indexed += 1
+                else:
+                    stats.failed += 1
+                    failed_ids.add(result.get("index", {}).get("_id"))
+                    if stats.failed <= 10:
+                        print(f"Failed to index a chunk: {result}")
+            await producer
+
+        stale_ids = plan.finalize(failed_ids)
+        if stale_ids:
+            # Deletes use the sync client; the index is refreshed once at the end instead of per call
+            for start in range(0, len(stale_ids), args.bulk_size):
+                await asyncio.to_thread(vectorstore.delete, stale_ids[start:start + args.bulk_size],
+                                        refresh_indices=False)
+            stats.deleted = len(stale_ids)
+
+    if not args.bulk_load and (stats.indexed or stats.deleted):
+        await client.indices.refresh(index=index_name)
+        # Tell running apps their cached search results are stale (abulk_load() does this itself)
+        await vectorstore.abump_index_generation(index_name)
+    manifest.save()
+    print(f"--- {plan.unchanged_files} unchanged files skipped, {plan.reused_chunks} unchanged chunks "
+          f"of changed files reused, {plan.removed_files} removed files ---")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest a folder of txt/markdown/PDF files into the FinPal index.")
+    parser.add_argument("path", help="Folder with the documents (searched recursively).")
+    parser.add_argument("--index", default=None, help="Target index (default: the app's index, financialinfo).")
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest of indexed files (default: ingest_manifest_<index>.json).")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the manifest and embed/index every chunk again.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Embedding worker processes.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding call.")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Batches embedding or waiting for indexing at once (default: 2 per worker).")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk.")
+    parser.add_argument("--chunk-overlap", type=int, default=150, help="Characters shared by adjacent chunks.")
+    parser.add_argument("--bulk-size", type=int, default=500, help="Documents per _bulk request.")
+    parser.add_argument("--max-chunk-bytes", type=int, default=10 * 1024 * 1024, help="Bytes per _bulk request.")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries of a _bulk chunk rejected with 429.")
+    parser.add_argument("--no-bulk-load", dest="bulk_load", action="store_false",
+                        help="Keep refreshes and replicas on during the load (e.g. for small updates of a live index).")
+    parser.add_argument("--vector-data-type", choices=("float", "fp16", "byte"), default="float",
+                        help="knn_vector encoding of a new index (fp16 needs faiss, byte lucene or faiss).")
+    parser.add_argument("--engine", choices=("nmslib", "faiss", "lucene"), default=None,
+                        help="k-NN engine of a new index (default: nmslib for float vectors, faiss otherwise).")
+    parser.add_argument("--pq-subspaces", type=int, default=0,
+                        help="Store product-quantized codes with this many subspaces (one byte each) for MMR; "
+                             "must divide the embedding dimension. 0 disables.")
+    parser.add_argument("--pq-train-size", type=int, default=5000,
+                        help="Chunks the PQ codebooks are trained on.")
+    args = parser.parse_args(argv)
+    if args.max_pending is None:
+        args.max_pending = 2 * args.workers
+    if not os.path.isdir(args.path):
+        sys.exit(f"{args.path} is not a directory")
+
+    stats = asyncio.run(ingest(args))
+    print(f"\n--- Ingestion complete: {stats.report()} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,52 @@
+import os
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from chainlit.utils import mount_chainlit
+import uvicorn
 #from financial_planner import generate_financial_plan
 #from finPalChatNew import FinPalAgent, llm, tools, SYSTEM_MESSAGE_CONTENT,tool_map
+from finPalChatNew import resources
+from utils.metrics import PrometheusMiddleware, get_metrics
 app = FastAPI()
 
+# Prometheus metrics (request rate/latency, agent turns and steps, tool/LLM/OpenSearch latency), on by default
+METRICS_ENABLED = os.getenv("FINPAL_METRICS", "true").lower() in ("1", "true", "yes")
+if METRICS_ENABLED:
+    metrics = get_metrics()
+    app.add_middleware(PrometheusMiddleware, metrics=metrics)
+
+# Kick off the expensive RAG/LLM setup in background threads; the app starts serving immediately.
+resources.warm_up()
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every FinPal resource is built, 503 while warming up or if one failed."""
+    status = resources.status()
+    is_ready = resources.is_ready()
+    if not is_ready:
+        # Rebuild resources whose build failed, once their retry backoff has passed
+        resources.warm_up()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "resources": status},
+    )
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    if not METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "metrics are disabled (FINPAL_METRICS)"})
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 
 # @app.get("/app")
 # async def get_financial_plan(message: str):
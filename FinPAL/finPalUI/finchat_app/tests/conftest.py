@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the app's modules the way the app does (`from utils.x import ...`)
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,234 @@
+"""In-process fake OpenSearch HTTP server for tests.
+
+Answers the endpoints the app's clients use: index create/exists/delete,
+`_mapping`, `_bulk`, `_search`/`_msearch` (k-NN queries are answered with
+exact cosine scores), `_mget`, document get/update and `_refresh`. Every request is
+recorded with its raw body and headers, so tests can check what went over the
+wire (gzip compression, SigV4 signatures), and `failures` makes chosen paths
+answer with an error status.
+
+Example:
+    .. code-block:: python
+
+        with FakeOpenSearch() as server:
+            client = OpenSearchClientFactory(server.url).sync_client()
+            client.index(index="docs", id="1", body={"text": "hello"})
+            assert server.requests[-1].path == "/docs/_doc/1"
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+class RecordedRequest:
+    def __init__(self, method: str, path: str, headers: Dict[str, str], raw_body: bytes, body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.raw_body = raw_body  # As sent (possibly gzip-compressed)
+        self.body = body  # Decompressed
+
+    def header(self, name: str) -> Optional[str]:
+        return next((v for k, v in self.headers.items() if k.lower() == name.lower()), None)
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class FakeOpenSearch:
+    def __init__(self) -> None:
+        self.indices: Dict[str, Dict[str, Any]] = {}  # name -> {"mappings": ..., "docs": {id: source}}
+        self.requests: List[RecordedRequest] = []
+        # Path prefix -> HTTP status to answer with instead, e.g. {"/docs-generation": 403}
+        self.failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> FakeOpenSearch:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- request handling ---
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _handle(self) -> None:
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = gzip.decompress(raw) if self.headers.get("Content-Encoding") == "gzip" else raw
+                request = RecordedRequest(self.command, self.path, dict(self.headers.items()), raw, body)
+                with server._lock:
+                    server.requests.append(request)
+                    status, payload = server._dispatch(request)
+                data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+        return Handler
+
+    @staticmethod
+    def _not_found(kind: str, name: str) -> Tuple[int, Dict]:
+        return 404, {"error": {"type": kind, "reason": f"no such {name}"}, "status": 404}
+
+    def _dispatch(self, request: RecordedRequest) -> Tuple[int, Any]:
+        url = urlparse(request.path)
+        parts = [p for p in url.path.split("/") if p]
+        method = request.method
+        for prefix, status in self.failures.items():
+            if url.path.startswith(prefix):
+                return status, {"error": {"type": "injected_failure", "reason": url.path}, "status": status}
+        if not parts:
+            return 200, {"version": {"number": "2.11.0", "distribution": "opensearch"}}
+        if parts[-1] == "_bulk":
+            return 200, self._bulk(request.body, parts[0] if len(parts) > 1 else None)
+        if parts[-1] == "_msearch":
+            return 200, self._msearch(request.body, parts[0] if len(parts) > 1 else None)
+        index = parts[0]
+        if len(parts) == 1:
+            if method == "HEAD":
+                return (200 if index in self.indices else 404), None
+            if method == "PUT":
+                body = request.json() if request.body else {}
+                self.indices[index] = {"mappings": body.get("mappings", {}), "docs": {}}
+                return 200, {"acknowledged": True, "index": index}
+            if method == "DELETE":
+                if self.indices.pop(index, None) is None:
+                    return self._not_found("index_not_found_exception", index)
+                return 200, {"acknowledged": True}
+        if index not in self.indices and not (parts[1:2] == ["_update"] and method == "POST"):
+            return self._not_found("index_not_found_exception", index)
+        if parts[1] == "_mapping":
+            if method == "PUT":
+                mappings = self.indices[index]["mappings"]
+                update = request.json()
+                mappings["_meta"] = update.get("_meta", mappings.get("_meta", {}))
+                mappings.setdefault("properties", {}).update(update.get("properties", {}))
+                return 200, {"acknowledged": True}
+            return 200, {index: {"mappings": self.indices[index]["mappings"]}}
+        if parts[1] == "_search":
+            return 200, self._search(index, request.json() if request.body else {})
+        if parts[1] == "_mget":
+            return 200, self._mget(index, request.json(), parse_qs(url.query))
+        if parts[1] == "_refresh":
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if parts[1] == "_doc" and len(parts) == 3:
+            docs = self.indices[index]["docs"]
+            if method == "GET":
+                if parts[2] not in docs:
+                    return 404, {"_index": index, "_id": parts[2], "found": False}
+                return 200, {"_index": index, "_id": parts[2], "found": True, "_source": docs[parts[2]]}
+            docs[parts[2]] = request.json()
+            return 201, {"_index": index, "_id": parts[2], "result": "created"}
+        if parts[1] == "_update" and len(parts) == 3:
+            return self._update(index, parts[2], request.json(), parse_qs(url.query))
+        return 400, {"error": {"type": "illegal_argument_exception", "reason": request.path}}
+
+    def _bulk(self, body: bytes, default_index: Optional[str]) -> Dict:
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        items = []
+        i = 0
+        while i < len(lines):
+            (action, meta), = lines[i].items()
+            index = meta.get("_index", default_index)
+            docs = self.indices.setdefault(index, {"mappings": {}, "docs": {}})["docs"]
+            if action == "delete":
+                found = docs.pop(meta["_id"], None) is not None
+                items.append({action: {"_index": index, "_id": meta["_id"], "status": 200 if found else 404}})
+                i += 1
+                continue
+            _id = meta.get("_id") or f"auto-{len(docs)}"
+            docs[_id] = lines[i + 1]
+            items.append({action: {"_index": index, "_id": _id, "status": 201}})
+            i += 2
+        return {"took": 1, "errors": False, "items": items}
+
+    def _search(self, index: str, body: Dict) -> Dict:
+        docs = self.indices[index]["docs"]
+        size = body.get("size", 10)
+        query = body.get("query", {})
+        knn = query.get("knn")
+        if knn:
+            (field, spec), = knn.items()
+            vector = np.asarray(spec["vector"], dtype=np.float32)
+            scored = []
+            for _id, source in docs.items():
+                candidate = np.asarray(source.get(field, []), dtype=np.float32)
+                if candidate.shape != vector.shape:
+                    continue
+                denominator = float(np.linalg.norm(candidate) * np.linalg.norm(vector)) or 1.0
+                scored.append((float(candidate @ vector) / denominator, _id))
+            scored.sort(key=lambda item: -item[0])
+            ranked = scored[: min(size, spec.get("k", size))]
+        else:
+            ranked = [(1.0, _id) for _id in list(docs)[:size]]
+        hits = [{"_index": index, "_id": _id, "_score": score, "_source": docs[_id]} for score, _id in ranked]
+        return {"took": 1, "timed_out": False, "hits": {"total": {"value": len(hits)}, "hits": hits}}
+
+    def _mget(self, index: str, body: Dict, query: Dict[str, List[str]]) -> Dict:
+        docs = self.indices[index]["docs"]
+        includes = [f for value in query.get("_source_includes", []) for f in value.split(",")]
+        results = []
+        for _id in body.get("ids", []):
+            if _id not in docs:
+                results.append({"_index": index, "_id": _id, "found": False})
+                continue
+            source = docs[_id]
+            if includes:
+                source = {field: source[field] for field in includes if field in source}
+            results.append({"_index": index, "_id": _id, "found": True, "_source": source})
+        return {"docs": results}
+
+    def _msearch(self, body: bytes, default_index: Optional[str]) -> Dict:
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        responses = []
+        for header, query in zip(lines[::2], lines[1::2]):
+            index = header.get("index", default_index)
+            if index not in self.indices:
+                responses.append(self._not_found("index_not_found_exception", index)[1])
+            else:
+                responses.append(self._search(index, query))
+        return {"took": 1, "responses": responses}
+
+    def _update(self, index: str, _id: str, body: Dict, query: Dict[str, List[str]]) -> Tuple[int, Dict]:
+        docs = self.indices.setdefault(index, {"mappings": {}, "docs": {}})["docs"]
+        if _id not in docs:
+            if "upsert" not in body:
+                return 404, {"error": {"type": "document_missing_exception"}, "status": 404}
+            docs[_id] = dict(body["upsert"])
+            return 201, {"_index": index, "_id": _id, "result": "created"}
+        script = body.get("script", {}).get("source", "")
+        if script == "ctx._source.value += 1":
+            docs[_id]["value"] += 1
+        elif "doc" in body:
+            docs[_id].update(body["doc"])
+        else:
+            return 400, {"error": {"type": "illegal_argument_exception", "reason": script}}
+        return 200, {"_index": index, "_id": _id, "result": "updated"}
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+
+from financial_math import (
+    required_monthly_sip,
+    scenario_grid,
+    sip_future_value,
+    step_up_sip_future_value,
+)
+
+os.environ.setdefault("MISTRAL_API_KEY", "test-key")  # finPalChatNew refuses to import without one
+from finPalChatNew import sip_calculator  # noqa: E402
+
+
+def scalar_sip(monthly_investment, annual_interest_rate, years):
+    """sip_calculator's formula before it moved to financial_math."""
+    monthly_rate = annual_interest_rate / 12
+    months = years * 12
+    if monthly_rate == 0:
+        return monthly_investment * months
+    return monthly_investment * (((1 + monthly_rate) ** months - 1) / monthly_rate) * (1 + monthly_rate)
+
+
+def step_up_loop(monthly_investment, annual_interest_rate, years, annual_step_up):
+    """Month by month: invest at the start of the month, then grow for that month."""
+    monthly_rate = annual_interest_rate / 12
+    value = 0.0
+    for year in range(years):
+        amount = monthly_investment * (1 + annual_step_up) ** year
+        for _ in range(12):
+            value = (value + amount) * (1 + monthly_rate)
+    return value
+
+
+CASES = [
+    (5000, 0.12, 10),
+    (10000, 0.08, 15),
+    (2500.5, 0.0, 7),
+    (1000, 0.18, 1),
+    (7500, 0.065, 30),
+]
+
+
+@pytest.mark.parametrize("monthly_investment, annual_interest_rate, years", CASES)
+def test_sip_calculator_matches_the_scalar_formula(monthly_investment, annual_interest_rate, years):
+    expected = scalar_sip(monthly_investment, annual_interest_rate, years)
+    result = sip_calculator.invoke(
+        {"monthly_investment": monthly_investment, "annual_interest_rate": annual_interest_rate, "years": years}
+    )
+    assert isinstance(result, float)
+    assert result == pytest.approx(expected, rel=1e-12)
+
+
+def test_sip_future_value_broadcasts_over_a_scenario_grid():
+    grid = scenario_grid(monthly_investment=[5000, 10000], annual_interest_rate=[0.0, 0.08, 0.12], years=[10, 20])
+    values = sip_future_value(**grid)
+    assert values.shape == (12,)
+    expected = [scalar_sip(p, r, y) for p, r, y in zip(*grid.values())]
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("annual_step_up", [0.0, 0.05, 0.10, 0.25])
+@pytest.mark.parametrize("monthly_investment, annual_interest_rate, years", CASES)
+def test_step_up_sip_matches_a_monthly_loop(monthly_investment, annual_interest_rate, years, annual_step_up):
+    expected = step_up_loop(monthly_investment, annual_interest_rate, years, annual_step_up)
+    result = step_up_sip_future_value(monthly_investment, annual_interest_rate, years, annual_step_up)
+    assert float(result) == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("annual_interest_rate, years", [(0.12, 10), (0.08, 25), (0.0, 5)])
+def test_step_up_sip_when_the_step_up_equals_the_yearly_growth(annual_interest_rate, years):
+    # q = (1 + s) / (1 + i)^12 == 1: the geometric series degenerates to `years` terms
+    step_up = (1 + annual_interest_rate / 12) ** 12 - 1
+    expected = step_up_loop(3000, annual_interest_rate, years, step_up)
+    assert float(step_up_sip_future_value(3000, annual_interest_rate, years, step_up)) == pytest.approx(
+        expected, rel=1e-9
+    )
+
+
+def test_step_up_sip_without_step_up_is_a_plain_sip():
+    rates = np.array([0.0, 0.06, 0.12])
+    np.testing.assert_allclose(
+        step_up_sip_future_value(5000, rates, 12, 0.0), sip_future_value(5000, rates, 12), rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("annual_interest_rate", [0.0, 0.07, 0.12, 0.2])
+@pytest.mark.parametrize("years", [1, 5, 20])
+def test_required_monthly_sip_inverts_sip_future_value(annual_interest_rate, years):
+    target = 2_500_000.0
+    monthly = required_monthly_sip(target, annual_interest_rate, years)
+    assert float(sip_future_value(monthly, annual_interest_rate, years)) == pytest.approx(target, rel=1e-12)
+    corpus = sip_future_value(4200, annual_interest_rate, years)
+    assert float(required_monthly_sip(corpus, annual_interest_rate, years)) == pytest.approx(4200, rel=1e-12)
+
+
+def test_required_monthly_sip_broadcasts():
+    targets = np.array([1e6, 5e6])[:, None]
+    years = np.array([5, 10, 20])[None, :]
+    monthly = required_monthly_sip(targets, 0.1, years)
+    assert monthly.shape == (2, 3)
+    np.testing.assert_allclose(sip_future_value(monthly, 0.1, years), np.broadcast_to(targets, (2, 3)), rtol=1e-12)
@@ -0,0 +1,26 @@
+from ingest import IngestPlan, Manifest
+from utils.opensearch_vector_search import _bulk_requests, _content_hash_id
+
+
+def test_content_hash_id_ignores_chunk_position():
+    assert _content_hash_id("text", {"source": "a.md", "chunk": 0}) == _content_hash_id(
+        "text", {"source": "a.md", "chunk": 7}
+    )
+    assert _content_hash_id("text", {"source": "a.md"}) != _content_hash_id("text", {"source": "b.md"})
+    assert _content_hash_id("text", {"source": "a.md"}) != _content_hash_id("other", {"source": "a.md"})
+
+
+def test_ingest_and_add_texts_agree_on_ids(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "bonds.md").write_text("Bonds are loans to governments or companies.")
+    manifest = Manifest(str(tmp_path / "manifest.json"), "financialinfo", "model")
+    plan = IngestPlan(str(corpus), manifest, chunk_size=1000, chunk_overlap=0)
+    chunks = list(plan.iter_chunks())
+    assert len(chunks) == 1
+    text, metadata, ingest_id = chunks[0]
+
+    _, add_texts_ids = _bulk_requests(
+        "financialinfo", [[0.0, 1.0]], [text], [metadata], None, "vector_field", "text", False
+    )
+    assert add_texts_ids == [ingest_id]
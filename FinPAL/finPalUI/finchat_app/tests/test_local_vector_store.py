@@ -0,0 +1,184 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from utils.local_vector_store import META_FILE, LocalVectorStore, write_snapshot
+
+DIM = 16
+
+
+class TableEmbeddings:
+    """Embeds known texts to fixed vectors."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return list(self.vectors[text])
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(300, DIM)).astype(np.float32)
+    texts = [f"doc {i}" for i in range(len(vectors))]
+    metadatas = [{"source": "a.pdf" if i % 3 == 0 else "b.pdf", "chunk": i} for i in range(len(vectors))]
+    embeddings = TableEmbeddings(dict(zip(texts, vectors)))
+    embeddings.vectors["query"] = rng.normal(size=DIM).astype(np.float32)
+    return texts, vectors, metadatas, embeddings
+
+
+def make_store(corpus, space_type="l2"):
+    texts, vectors, metadatas, embeddings = corpus
+    return LocalVectorStore(
+        embeddings, vectors, texts, metadatas, [f"id-{i}" for i in range(len(texts))], space_type=space_type
+    )
+
+
+def brute_force(vectors, query, space_type, k):
+    if space_type == "l2":
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        scores = 1 / (1 + distances)
+    elif space_type == "cosinesimil":
+        cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        scores = 1 / (1 + (1 - cosine))
+    else:
+        products = vectors @ query
+        scores = np.where(-products >= 0, 1 / (1 + -products), 1 + products)
+    top = np.argsort(-scores, kind="stable")[:k]
+    return top, scores[top]
+
+
+@pytest.mark.parametrize("space_type", ["l2", "cosinesimil", "innerproduct"])
+def test_exact_search_matches_brute_force(corpus, space_type):
+    store = make_store(corpus, space_type)
+    store.block_size = 64  # Several blocks
+    query = corpus[3].vectors["query"]
+    docs = store.similarity_search_with_score_by_vector(query, k=5, score_threshold=None)
+    rows, scores = brute_force(corpus[1], query, space_type, 5)
+    assert [doc.id for doc, _ in docs] == [f"id-{row}" for row in rows]
+    assert [score for _, score in docs] == pytest.approx(scores, rel=1e-5)
+
+
+@pytest.mark.parametrize("space_type", ["l2", "cosinesimil", "innerproduct"])
+def test_hnsw_search_agrees_with_exact_search(corpus, space_type, tmp_path):
+    path = str(tmp_path / "index")
+    make_store(corpus, space_type).save(path, build_hnsw=True)
+    embeddings = corpus[3]
+    hnsw = LocalVectorStore.load(path, embeddings, ef_search=300)
+    exact = LocalVectorStore.load(path, embeddings, use_hnsw=False)
+    assert hnsw.hnsw_index is not None and exact.hnsw_index is None
+    exact_docs = exact.similarity_search_with_score("query", k=5, score_threshold=None)
+    hnsw_docs = hnsw.similarity_search_with_score("query", k=5, score_threshold=None)
+    assert [doc.id for doc, _ in hnsw_docs] == [doc.id for doc, _ in exact_docs]
+    assert [s for _, s in hnsw_docs] == pytest.approx([s for _, s in exact_docs], rel=1e-4)
+
+
+@pytest.mark.parametrize("use_hnsw", [False, True])
+def test_filter_restricts_results(corpus, tmp_path, use_hnsw):
+    path = str(tmp_path / "index")
+    make_store(corpus).save(path, build_hnsw=True)
+    store = LocalVectorStore.load(path, corpus[3], use_hnsw=use_hnsw, ef_search=300)
+    docs = store.similarity_search("query", k=10, score_threshold=None, filter={"source": "a.pdf"})
+    assert len(docs) == 10
+    assert all(doc.metadata["source"] == "a.pdf" for doc in docs)
+    # Same ranking as an exact search over the matching documents only
+    rows = [i for i in range(len(corpus[0])) if i % 3 == 0]
+    top, _ = brute_force(corpus[1][rows], corpus[3].vectors["query"], "l2", 10)
+    assert [doc.id for doc in docs] == [f"id-{rows[i]}" for i in top]
+    assert store.similarity_search("query", k=3, filter={"source": "missing.pdf"}) == []
+
+
+def test_score_threshold_drops_weak_matches(corpus):
+    store = make_store(corpus)
+    docs = store.similarity_search_with_score("query", k=20, score_threshold=None)
+    threshold = docs[4][1]
+    assert len(store.similarity_search("query", k=20, score_threshold=threshold)) == 5
+
+
+def test_mmr_selects_like_langchain(corpus):
+    store = make_store(corpus)
+    query = corpus[3].vectors["query"]
+    docs = store.max_marginal_relevance_search("query", k=4, fetch_k=30, lambda_mult=0.3)
+    rows, _ = store._search(store._data, query, 30)
+    expected = maximal_marginal_relevance(query, corpus[1][rows], k=4, lambda_mult=0.3)
+    assert [doc.id for doc in docs] == [f"id-{rows[i]}" for i in expected]
+
+
+def test_snapshot_round_trip(corpus, tmp_path):
+    path = str(tmp_path / "index")
+    texts, vectors, metadatas, embeddings = corpus
+    store = LocalVectorStore(
+        embeddings, vectors.astype(np.float16), texts, metadatas, [f"id-{i}" for i in range(len(texts))]
+    )
+    store.save(path, source_generation="7")
+    loaded = LocalVectorStore.load(path, corpus[3])
+    assert len(loaded) == len(store)
+    vectors, texts, metadatas, ids = loaded._data[:4]
+    assert vectors.dtype == np.float16 and isinstance(vectors, np.memmap)
+    np.testing.assert_allclose(vectors, corpus[1], atol=1e-2)
+    assert (texts, metadatas, ids) == (corpus[0], corpus[2], [f"id-{i}" for i in range(len(texts))])
+    assert loaded.snapshot_meta["space_type"] == "l2"
+    assert loaded.index_generation() == "7"
+    assert [d.id for d in loaded.similarity_search("query", k=5)] == [d.id for d in store.similarity_search("query", k=5)]
+
+
+def test_count_mismatch_is_resized(tmp_path):
+    path = str(tmp_path / "index")
+    records = [(f"id-{i}", f"doc {i}", {}, np.full(4, i, dtype=np.float32)) for i in range(5)]
+    write_snapshot(path, iter(records), count=3, dimension=4)
+    store = LocalVectorStore.load(path, TableEmbeddings({}))
+    assert len(store) == 5 and store._data[0].shape == (5, 4)
+    write_snapshot(path, iter(records[:2]), count=4, dimension=4)
+    assert LocalVectorStore.load(path, TableEmbeddings({}))._data[0].shape == (2, 4)
+
+
+def test_new_snapshot_is_swapped_in_atomically(corpus, tmp_path):
+    path = str(tmp_path / "index")
+    store = make_store(corpus)
+    store.save(path)
+    first_version = os.readlink(path)
+    reader = LocalVectorStore.load(path, corpus[3])
+    assert reader.reload() is False
+
+    store.delete(["id-0"])
+    store.save(path)
+    store.save(path)
+    # path is a symlink to the newest version; the previous one is kept for readers, older ones removed
+    assert os.path.islink(path)
+    versions = sorted(name for name in os.listdir(tmp_path) if name.startswith("index.v-"))
+    assert len(versions) == 2 and first_version not in versions
+    assert os.path.exists(os.path.join(path, META_FILE))
+    assert reader.reload() is True
+    assert len(reader) == len(corpus[0]) - 1
+
+
+def test_snapshot_directory_from_before_versioning_is_replaced(corpus, tmp_path):
+    path = tmp_path / "index"
+    path.mkdir()
+    (path / META_FILE).write_text("{}")
+    make_store(corpus).save(str(path))
+    assert os.path.islink(path)
+    assert len(LocalVectorStore.load(str(path), corpus[3])) == len(corpus[0])
+
+
+def test_failed_snapshot_leaves_the_current_one(corpus, tmp_path):
+    path = str(tmp_path / "index")
+    make_store(corpus).save(path)
+
+    def broken_records():
+        yield "id-x", "doc x", {}, np.zeros(DIM, dtype=np.float32)
+        raise RuntimeError("scroll expired")
+
+    with pytest.raises(RuntimeError):
+        write_snapshot(path, broken_records(), count=10, dimension=DIM)
+    assert len(LocalVectorStore.load(path, corpus[3])) == len(corpus[0])
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("index.v-")]) == 1
@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import hashlib
+import json
+
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from fake_opensearch import FakeOpenSearch
+from utils.opensearch_client import OpenSearchClientFactory
+
+CREDENTIALS = Credentials("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+REGION = "ap-south-1"
+
+DOCS = [
+    {"text": "Bonds are loans", "vector_field": [1.0, 0.0]},
+    {"text": "Stocks are shares", "vector_field": [0.0, 1.0]},
+]
+KNN_QUERY = {"size": 1, "query": {"knn": {"vector_field": {"vector": [0.9, 0.1], "k": 1}}}}
+
+
+def bulk_body(index):
+    actions = []
+    for i, doc in enumerate(DOCS):
+        actions.append({"index": {"_index": index, "_id": str(i)}})
+        actions.append(doc)
+    return actions
+
+
+def assert_signed(request, credentials=CREDENTIALS, region=REGION, service="es"):
+    """Recompute the request's SigV4 signature from what the server received."""
+    authorization = request.header("Authorization")
+    assert authorization and authorization.startswith("AWS4-HMAC-SHA256 ")
+    fields = dict(
+        part.strip().split("=", 1) for part in authorization[len("AWS4-HMAC-SHA256 "):].split(",")
+    )
+    # The payload hash covers the bytes on the wire, i.e. the compressed body
+    assert request.header("X-Amz-Content-SHA256") == hashlib.sha256(request.raw_body).hexdigest()
+    headers = {name: request.header(name) for name in fields["SignedHeaders"].split(";")}
+    aws_request = AWSRequest(
+        method=request.method,
+        url=f"http://{request.header('Host')}{request.path}",
+        data=request.raw_body,
+        headers=headers,
+    )
+    aws_request.context["timestamp"] = request.header("X-Amz-Date")
+    signer = SigV4Auth(credentials, service, region)
+    string_to_sign = signer.string_to_sign(aws_request, signer.canonical_request(aws_request))
+    assert fields["Signature"] == signer.signature(string_to_sign, aws_request)
+
+
+@pytest.fixture
+def server():
+    with FakeOpenSearch() as fake:
+        yield fake
+
+
+def test_local_host_gets_unsigned_compressed_client(server):
+    factory = OpenSearchClientFactory(server.url)
+    assert factory.is_local and not factory.sign_requests
+    client = factory.sync_client()
+    client.indices.create(index="docs", body={"mappings": {"_meta": {"generation": "0"}}})
+    client.bulk(body=bulk_body("docs"))
+    response = client.search(index="docs", body=KNN_QUERY)
+    assert [hit["_source"]["text"] for hit in response["hits"]["hits"]] == ["Bonds are loans"]
+    assert client.indices.get_mapping(index="docs")["docs"]["mappings"]["_meta"] == {"generation": "0"}
+
+    search = server.requests[-2]
+    assert search.header("Authorization") is None
+    assert search.header("Content-Encoding") == "gzip"
+    assert gzip.decompress(search.raw_body) == search.body
+    assert json.loads(search.body) == KNN_QUERY
+
+
+def test_sync_client_signs_the_compressed_body(server):
+    factory = OpenSearchClientFactory(
+        server.url, region=REGION, credentials=CREDENTIALS, sign_requests=True
+    )
+    client = factory.sync_client()
+    client.bulk(body=bulk_body("docs"))
+    response = client.search(index="docs", body=KNN_QUERY, params={"request_cache": "true"})
+    assert response["hits"]["hits"][0]["_id"] == "0"
+
+    bulk, search = server.requests
+    for request in (bulk, search):
+        assert request.header("Content-Encoding") == "gzip"
+        assert request.raw_body != request.body
+        assert_signed(request)
+    # A body altered after signing does not verify
+    search.raw_body = gzip.compress(json.dumps({"query": {"match_all": {}}}).encode())
+    with pytest.raises(AssertionError):
+        assert_signed(search)
+
+
+def test_async_client_signs_the_compressed_body(server):
+    factory = OpenSearchClientFactory(
+        server.url, region=REGION, credentials=CREDENTIALS, sign_requests=True, pool_size=4
+    )
+
+    async def run():
+        client = factory.async_client()
+        try:
+            await client.bulk(body=bulk_body("docs"))
+            responses = await asyncio.gather(
+                *(client.search(index="docs", body=KNN_QUERY) for _ in range(8))
+            )
+        finally:
+            await client.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert all(response["hits"]["hits"][0]["_id"] == "0" for response in responses)
+    assert len(server.requests) == 9
+    for request in server.requests:
+        assert request.header("Content-Encoding") == "gzip"
+        assert_signed(request)
+
+
+def test_compression_can_be_disabled(server):
+    client = OpenSearchClientFactory(server.url, http_compress=False).sync_client()
+    client.bulk(body=bulk_body("docs"))
+    assert server.requests[-1].header("Content-Encoding") is None
+    assert server.requests[-1].raw_body == server.requests[-1].body
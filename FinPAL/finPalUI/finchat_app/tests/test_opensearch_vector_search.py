@@ -0,0 +1,250 @@
+import asyncio
+import time
+
+import pytest
+from opensearchpy.exceptions import TransportError
+
+from fake_opensearch import FakeOpenSearch
+from utils.opensearch_client import OpenSearchClientFactory
+from utils.opensearch_vector_search import OpenSearchVectorSearch
+from utils.resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy
+
+TEXTS = ["bonds are loans", "stocks are shares", "bond funds hold bonds"]
+
+
+class KeywordEmbeddings:
+    """2-d embeddings: bond-ish texts point one way, everything else the other."""
+
+    def embed_query(self, text):
+        return [1.0, 0.1] if "bond" in text else [0.1, 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+
+class RecordingClient:
+    """Passes everything through to `client`, noting which API was used."""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self._client, name)
+
+
+@pytest.fixture
+def server():
+    with FakeOpenSearch() as fake:
+        yield fake
+
+
+def make_store(server, **kwargs):
+    factory = OpenSearchClientFactory(server.url)
+    kwargs.setdefault("opensearch_client", factory.sync_client())
+    kwargs.setdefault("async_opensearch_client", factory.async_client())
+    return OpenSearchVectorSearch(None, "docs", KeywordEmbeddings(), **kwargs)
+
+
+def test_searches_use_the_search_clients_and_writes_the_default_ones(server):
+    factory = OpenSearchClientFactory(server.url)
+    admin = RecordingClient(factory.sync_client())
+    search = RecordingClient(factory.under_deadline(1.0).sync_client())
+    store = make_store(server, opensearch_client=admin, search_client=search)
+    store.add_texts(TEXTS)
+
+    assert store.similarity_search("bond", k=1)[0].page_content == "bonds are loans"
+    assert len(store.max_marginal_relevance_search("stock", k=2, fetch_k=3)) == 2
+    assert len(store.batch_similarity_search(["bond", "stock"], k=1)) == 2
+
+    assert {"search", "mget", "msearch", "get"} <= set(search.calls)
+    assert not {"bulk", "update", "indices"} & set(search.calls)
+    assert not {"search", "mget", "msearch"} & set(admin.calls)
+
+
+def test_async_searches_use_the_async_search_client(server):
+    factory = OpenSearchClientFactory(server.url)
+    store = make_store(server)
+    store.add_texts(TEXTS)
+
+    async def run():
+        search = RecordingClient(factory.under_deadline(1.0).async_client())
+        store._async_search_client = search
+        try:
+            docs = await store.asimilarity_search("bond", k=1)
+            await store.amax_marginal_relevance_search("stock", k=2, fetch_k=3)
+        finally:
+            await search._client.close()
+            await store.async_client.close()
+        return docs, search.calls
+
+    docs, calls = asyncio.run(run())
+    assert docs[0].page_content == "bonds are loans"
+    assert {"search", "mget", "get"} <= set(calls)
+
+
+def test_search_clients_default_to_the_main_clients(server):
+    store = make_store(server)
+    assert store.search_client is store.client
+    assert store.async_search_client is store.async_client
+
+
+def searches(server):
+    return [r for r in server.requests if r.path.endswith("/_search")]
+
+
+def generation_reads(server):
+    return [r for r in server.requests if r.method == "GET" and "-generation/" in r.path]
+
+
+def test_repeated_search_is_served_from_the_result_cache(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+    for _ in range(3):
+        assert store.similarity_search("bond", k=1)[0].page_content == "bonds are loans"
+    assert len(searches(server)) == 1
+    assert len(generation_reads(server)) == 1
+
+
+def test_unreadable_generation_bypasses_the_cache_until_the_next_check(server):
+    store = make_store(server, generation_check_interval=0.1)
+    store.add_texts(TEXTS)
+    server.failures["/docs-generation"] = 403
+    for _ in range(3):
+        assert store.similarity_search("bond", k=1)[0].page_content == "bonds are loans"
+    # Every search goes to the cluster, but the failed read is not retried per search
+    assert len(searches(server)) == 3
+    assert len(generation_reads(server)) == 1
+
+    del server.failures["/docs-generation"]
+    time.sleep(0.11)
+    store.similarity_search("bond", k=1)
+    store.similarity_search("bond", k=1)
+    assert len(generation_reads(server)) == 2
+    assert len(searches(server)) == 4
+
+
+def test_generation_read_runs_under_the_search_policy(server):
+    policy = ResiliencePolicy("opensearch", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    search_client = OpenSearchClientFactory(server.url).under_deadline(1.0).sync_client()
+    store = make_store(server, search_policy=policy, search_client=search_client)
+    store.add_texts(TEXTS)
+    server.failures["/docs-generation"] = 503
+    # The failed read opens the circuit, so the search itself fails fast
+    with pytest.raises(CircuitOpenError):
+        store.similarity_search("bond", k=1)
+    assert len(generation_reads(server)) == 1
+    assert searches(server) == []
+
+
+def test_async_unreadable_generation_bypasses_the_cache(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+    server.failures["/docs-generation"] = 403
+
+    async def run():
+        try:
+            return [await store.asimilarity_search("bond", k=1) for _ in range(2)]
+        finally:
+            await store.async_client.close()
+
+    results = asyncio.run(run())
+    assert all(docs[0].page_content == "bonds are loans" for docs in results)
+    assert len(searches(server)) == 2
+    assert len(generation_reads(server)) == 1
+
+
+def msearches(server):
+    return [r for r in server.requests if r.path.endswith("/_msearch")]
+
+
+def test_queries_with_the_same_embedding_share_a_cache_entry(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+    store.similarity_search("bond", k=1)
+    store.similarity_search("explain bonds", k=1)
+    assert len(searches(server)) == 1
+    assert store.result_cache_hits == 1
+
+
+def test_hybrid_search_keys_on_the_query_text(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+    store.similarity_search("bond", k=1, search_type="hybrid_search")
+    store.similarity_search("bond", k=1, search_type="hybrid_search")
+    store.similarity_search("explain bonds", k=1, search_type="hybrid_search")
+    assert len(msearches(server)) == 2
+
+
+def test_mmr_vector_fetch_runs_under_the_search_policy(server):
+    policy = ResiliencePolicy("opensearch", deadline=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    search_client = OpenSearchClientFactory(server.url).under_deadline(1.0).sync_client()
+    store = make_store(server, search_policy=policy, search_client=search_client)
+    store.add_texts(TEXTS)
+    server.failures["/docs/_mget"] = 503
+    with pytest.raises(TransportError):
+        store.max_marginal_relevance_search("bond", k=2, fetch_k=3)
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        store.max_marginal_relevance_search("stock", k=2, fetch_k=3)
+
+
+def test_batch_search_sends_only_the_cache_misses(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+    store.similarity_search("bond", k=1)
+    results = store.batch_similarity_search(["bonds", "stocks"], k=1)
+    assert [docs[0].page_content for docs in results] == ["bonds are loans", "stocks are shares"]
+    (msearch,) = msearches(server)
+    # Header and body of the one query that was not cached yet
+    assert len(msearch.body.splitlines()) == 2
+
+    assert store.batch_similarity_search(["stocks", "bond"], k=1) == results[::-1]
+    assert len(msearches(server)) == 1
+
+
+def test_batch_search_runs_under_the_search_policy(server):
+    policy = ResiliencePolicy("opensearch", deadline=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    search_client = OpenSearchClientFactory(server.url).under_deadline(1.0).sync_client()
+    store = make_store(server, search_policy=policy, search_client=search_client)
+    store.add_texts(TEXTS)
+    server.failures["/_msearch"] = 503
+    with pytest.raises(TransportError):
+        store.batch_similarity_search(["bond", "stock"], k=1)
+    assert policy.breaker.state == "open"
+
+
+def test_async_batch_search_uses_the_result_cache(server):
+    store = make_store(server)
+    store.add_texts(TEXTS)
+
+    async def run():
+        try:
+            first = await store.abatch_similarity_search(["bond", "stock"], k=1)
+            second = await store.abatch_similarity_search(["bond", "stock"], k=1)
+        finally:
+            await store.async_client.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(msearches(server)) == 1
+
+
+def test_index_generation_changes_with_every_write(server):
+    store = make_store(server)
+    assert store.index_generation() == "0"
+    store.add_texts(TEXTS[:1])
+    first = store.index_generation()
+    store.add_texts(TEXTS[1:])
+    assert store.index_generation() not in ("0", first)
+    server.failures["/docs-generation"] = 403
+    store.generation_check_interval = 0
+    assert store.index_generation() is None
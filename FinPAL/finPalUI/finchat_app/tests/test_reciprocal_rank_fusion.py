@@ -0,0 +1,29 @@
+import pytest
+
+from utils.opensearch_vector_search import _reciprocal_rank_fusion
+
+
+def hits(*ids):
+    return [{"_id": _id, "_score": 100.0 - i, "_source": {"text": _id}} for i, _id in enumerate(ids)]
+
+
+def test_documents_in_both_lists_rank_first():
+    bm25 = hits("a", "b", "c")
+    knn = hits("c", "d", "a")
+    fused = _reciprocal_rank_fusion([bm25, knn], k=4, rank_constant=60)
+    assert [hit["_id"] for hit in fused] == ["a", "c", "b", "d"]
+    assert fused[0]["_score"] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[2]["_score"] == pytest.approx(1 / 62)
+
+
+def test_ties_keep_first_seen_order_and_k_truncates():
+    fused = _reciprocal_rank_fusion([hits("a", "b"), hits("b", "a")], k=1)
+    assert [hit["_id"] for hit in fused] == ["a"]
+
+
+def test_original_scores_are_replaced_and_sources_kept():
+    bm25 = hits("a")
+    fused = _reciprocal_rank_fusion([bm25, []], k=3, rank_constant=1)
+    assert fused == [{"_id": "a", "_score": 0.5, "_source": {"text": "a"}}]
+    assert bm25[0]["_score"] == 100.0
+
@@ -0,0 +1,437 @@
+import asyncio
+import itertools
+import time
+
+import httpx
+import pytest
+
+from utils.opensearch_client import OpenSearchClientFactory
+from utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    LatencyTracker,
+    ResiliencePolicy,
+    RetryBudget,
+    is_transient,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+# --- is_transient ---
+@pytest.mark.parametrize(
+    "error",
+    [
+        TimeoutError(),
+        ConnectionResetError(),
+        asyncio.TimeoutError(),
+        DeadlineExceeded(),
+        httpx.ReadTimeout("read timed out"),
+        httpx.ConnectTimeout("connect timed out"),
+        httpx.ConnectError("connection refused"),
+        httpx.RemoteProtocolError("server disconnected"),
+        StatusError(429),
+        StatusError(503),
+    ],
+)
+def test_transient_errors(error):
+    assert is_transient(error)
+
+
+def test_httpx_status_errors_are_classified_by_status():
+    request = httpx.Request("POST", "https://api.mistral.ai/v1/chat/completions")
+
+    def status_error(code):
+        response = httpx.Response(code, request=request)
+        return httpx.HTTPStatusError("error", request=request, response=response)
+
+    assert is_transient(status_error(429))
+    assert is_transient(status_error(502))
+    assert not is_transient(status_error(400))
+
+
+@pytest.mark.parametrize("error", [ValueError("bad"), StatusError(400), StatusError(404), KeyError("x")])
+def test_non_transient_errors(error):
+    assert not is_transient(error)
+
+
+def test_opensearch_connection_errors_are_transient():
+    from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+    from opensearchpy.exceptions import ConnectionTimeout, NotFoundError
+
+    assert is_transient(OpenSearchConnectionError("N/A", "refused", None))
+    assert is_transient(ConnectionTimeout("TIMEOUT", "timed out", None))
+    assert not is_transient(NotFoundError(404, "index_not_found_exception", {}))
+
+
+# --- CircuitBreaker ---
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    ticket = breaker.acquire()
+    assert ticket > 0
+    # Only one probe at a time
+    assert breaker.acquire() is None
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.acquire() == 0
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.acquire() is None
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    ticket = breaker.acquire()
+    breaker.release_probe(ticket)
+    assert breaker.state == "half_open"
+    assert breaker.acquire() > ticket
+
+
+def test_stale_release_does_not_free_a_newer_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    first = breaker.acquire()
+    time.sleep(0.06)  # The first probe is given up on
+    second = breaker.acquire()
+    assert second > first
+    breaker.release_probe(first)
+    assert breaker.acquire() is None
+
+
+def test_lost_probe_expires_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.acquire()  # Never reports back
+    assert breaker.acquire() is None
+    time.sleep(0.06)
+    assert breaker.acquire()
+
+
+def test_cancelled_async_probe_does_not_lock_the_circuit_open():
+    policy = ResiliencePolicy("mistral", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    open_breaker(policy.breaker)
+    time.sleep(0.06)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return "answer"
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.acall(hang), timeout=0.01)
+        return await policy.acall(ok)
+
+    assert asyncio.run(run()) == "answer"
+    assert policy.breaker.state == "closed"
+
+
+def test_interrupted_sync_probe_is_released():
+    policy = ResiliencePolicy("opensearch", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    open_breaker(policy.breaker)
+    time.sleep(0.06)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(interrupted)
+    assert policy.call(lambda: "hits") == "hits"
+
+
+def test_nested_open_circuit_is_neutral_for_the_outer_breaker():
+    inner = ResiliencePolicy("opensearch", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    outer = ResiliencePolicy(
+        "rag_chain", max_retries=3, backoff=0.001, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    )
+    open_breaker(inner.breaker)
+    outer.breaker.record_failure()
+    calls = []
+
+    def retrieve():
+        calls.append(1)
+        return inner.call(lambda: "hits")
+
+    with pytest.raises(CircuitOpenError):
+        outer.call(retrieve)
+    # Not retried, and the outer failure count was not reset by a "success"
+    assert len(calls) == 1
+    outer.breaker.record_failure()
+    assert outer.breaker.state == "open"
+
+    # A half-open probe that fails fast on the nested circuit is handed back
+    time.sleep(0.06)
+    with pytest.raises(CircuitOpenError):
+        outer.call(retrieve)
+    assert outer.breaker.acquire()
+
+
+# --- RetryBudget and LatencyTracker ---
+def test_retry_budget_spends_tokens_and_refills():
+    budget = RetryBudget(ratio=0.5, min_per_s=0.0, max_tokens=2)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert budget.try_spend()
+
+
+def test_latency_percentile_needs_min_samples():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for value in range(9):
+        tracker.record(value / 100)
+    assert tracker.percentile(0.95) is None
+    for value in range(9, 100):
+        tracker.record(value / 100)
+    assert tracker.percentile(0.95) == pytest.approx(0.94)
+
+
+# --- ResiliencePolicy ---
+def test_transient_failures_are_retried_and_open_the_circuit():
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        raise StatusError(429)
+
+    policy = ResiliencePolicy(
+        "mistral", max_retries=2, backoff=0.001, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    )
+    with pytest.raises(StatusError):
+        policy.call(throttled)
+    assert len(calls) == 3
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.call(throttled)
+    assert len(calls) == 3
+
+
+def test_httpx_timeouts_are_retried():
+    attempts = itertools.count()
+
+    def flaky():
+        if next(attempts) == 0:
+            raise httpx.ReadTimeout("read timed out")
+        return "ok"
+
+    policy = ResiliencePolicy("mistral", max_retries=1, backoff=0.001)
+    assert policy.call(flaky) == "ok"
+
+
+def test_client_errors_are_not_retried_and_keep_the_circuit_closed():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise StatusError(400)
+
+    policy = ResiliencePolicy("mistral", max_retries=3, backoff=0.001, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(StatusError):
+        policy.call(bad_request)
+    assert len(calls) == 1 and policy.breaker.state == "closed"
+
+
+def test_empty_budget_stops_retries():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise TimeoutError
+
+    policy = ResiliencePolicy(
+        "mistral", max_retries=5, backoff=0.001, budget=RetryBudget(min_per_s=0.0, max_tokens=1)
+    )
+    with pytest.raises(TimeoutError):
+        policy.call(failing)
+    assert len(calls) == 2
+
+
+def test_deadline_is_enforced():
+    policy = ResiliencePolicy("rag_chain", deadline=0.05)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        policy.call(time.sleep, 1)
+    assert time.monotonic() - started < 0.5
+
+    async def run():
+        with pytest.raises(DeadlineExceeded):
+            await policy.acall(asyncio.sleep, 1)
+
+    asyncio.run(run())
+
+
+def warm(policy, seconds=0.005):
+    for _ in range(policy.latency.min_samples):
+        policy.latency.record(seconds)
+
+
+def test_slow_call_is_hedged():
+    policy = ResiliencePolicy("opensearch", deadline=2, hedge=True, min_hedge_delay=0.01)
+    warm(policy)
+    attempts = itertools.count()
+
+    def search():
+        attempt = next(attempts)
+        time.sleep(0.5 if attempt == 0 else 0.001)
+        return attempt
+
+    started = time.monotonic()
+    assert policy.call(search) == 1
+    assert time.monotonic() - started < 0.3
+
+
+def test_async_hedge_cancels_the_loser():
+    policy = ResiliencePolicy("opensearch", deadline=2, hedge=True, min_hedge_delay=0.01)
+    warm(policy)
+    attempts = itertools.count()
+    cancelled = []
+
+    async def search():
+        attempt = next(attempts)
+        try:
+            await asyncio.sleep(0.5 if attempt == 0 else 0.001)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    async def run():
+        result = await policy.acall(search)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert cancelled == [0]
+
+
+def test_no_hedging_before_latency_window_is_warm():
+    policy = ResiliencePolicy("opensearch", deadline=2, hedge=True, min_hedge_delay=0.001)
+    calls = []
+    policy.call(lambda: calls.append(1) or time.sleep(0.02))
+    assert len(calls) == 1
+
+
+# --- Streaming ---
+def collect(policy, stream, **kwargs):
+    async def run():
+        return [item async for item in policy.astream(stream, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_stream_success_is_recorded():
+    policy = ResiliencePolicy("mistral", deadline=1, breaker=CircuitBreaker(failure_threshold=2))
+    policy.breaker.record_failure()
+
+    async def tokens():
+        for token in ("Bonds ", "are ", "loans"):
+            await asyncio.sleep(0.001)
+            yield token
+
+    assert collect(policy, tokens) == ["Bonds ", "are ", "loans"]
+    policy.breaker.record_failure()
+    assert policy.breaker.state == "closed"
+
+
+def test_stream_without_a_first_token_in_time_fails():
+    policy = ResiliencePolicy("mistral", deadline=5, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+    async def silent():
+        await asyncio.sleep(1)
+        yield "late"
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        collect(policy, silent, first_item_timeout=0.05)
+    assert time.monotonic() - started < 0.5
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        collect(policy, silent)
+
+
+def test_slow_stream_after_the_first_token_is_not_timed():
+    policy = ResiliencePolicy("mistral", deadline=0.05)
+
+    async def tokens():
+        yield "a"
+        await asyncio.sleep(0.1)
+        yield "b"
+
+    assert collect(policy, tokens) == ["a", "b"]
+
+
+def test_stream_failure_midway_counts_against_the_circuit():
+    policy = ResiliencePolicy("mistral", deadline=1, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+    async def broken():
+        yield "a"
+        raise httpx.RemoteProtocolError("server disconnected")
+
+    with pytest.raises(httpx.RemoteProtocolError):
+        collect(policy, broken)
+    assert policy.breaker.state == "open"
+
+
+def test_abandoned_probe_stream_is_released():
+    policy = ResiliencePolicy("mistral", deadline=1, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    open_breaker(policy.breaker)
+    time.sleep(0.06)
+
+    async def tokens():
+        yield "a"
+        yield "b"
+
+    async def run():
+        stream = policy.astream(tokens)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert policy.breaker.acquire()
+
+
+# --- OpenSearch transport settings under a policy ---
+def test_clients_under_a_deadline_do_not_retry_at_the_transport():
+    factory = OpenSearchClientFactory("https://search.example.com", timeout=10, max_retries=2)
+    bounded = factory.under_deadline(3.0)
+    assert (bounded.max_retries, bounded.retry_on_timeout, bounded.timeout) == (0, False, 3.0)
+    assert (factory.max_retries, factory.retry_on_timeout, factory.timeout) == (2, True, 10)
+    assert factory.under_deadline(30.0).timeout == 10
+    transport = bounded._client_kwargs()
+    assert transport["max_retries"] == 0 and transport["retry_on_timeout"] is False
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from utils.resource_registry import FAILED, PENDING, READY, LazyResourceRegistry
+
+
+def test_builds_once_and_resolves_dependencies():
+    calls = []
+    registry = LazyResourceRegistry()
+    registry.register("a", lambda: calls.append("a") or 1)
+    registry.register("b", lambda: calls.append("b") or registry.get("a") + 1, depends_on=["a"])
+    assert registry.state("b") == PENDING
+    assert registry.get("b") == 2
+    assert registry.get("b") == 2
+    assert calls == ["b", "a"]
+    assert registry.is_ready()
+
+
+def test_concurrent_callers_share_one_build():
+    started = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "value"
+
+    registry = LazyResourceRegistry()
+    registry.register("slow", slow)
+    futures = registry.warm_up()
+    started.wait(1)
+    assert registry.get("slow") == "value"
+    assert futures[0].result(1) == "value"
+    assert calls == [1]
+
+
+def test_failed_build_is_retried_after_backoff():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("OpenSearch unreachable")
+        return "client"
+
+    registry = LazyResourceRegistry(retry_backoff=0.05)
+    registry.register("client", flaky)
+    with pytest.raises(ConnectionError):
+        registry.get("client")
+    status = registry.status()["client"]
+    assert status["state"] == FAILED and status["failures"] == 1
+    assert not registry.is_ready()
+
+    # Within the backoff the stored error is re-raised without another build
+    with pytest.raises(ConnectionError):
+        registry.get("client")
+    assert len(attempts) == 1
+
+    time.sleep(0.06)
+    assert registry.get("client") == "client"
+    assert registry.state("client") == READY
+    assert len(attempts) == 2
+
+
+def test_backoff_doubles_and_is_capped():
+    registry = LazyResourceRegistry(retry_backoff=1.0, max_retry_backoff=3.0)
+    registry.register("broken", lambda: 1 / 0)
+    for failures in (1, 2, 3):
+        resource = registry._resources["broken"]
+        resource.retry_at = 0.0
+        before = time.monotonic()
+        with pytest.raises(ZeroDivisionError):
+            registry.get("broken")
+        expected = min(2 ** (failures - 1), 3.0)
+        assert resource.failures == failures
+        assert resource.retry_at - before == pytest.approx(expected, abs=0.1)
+
+
+def test_warm_up_rebuilds_failed_resource():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return 42
+
+    registry = LazyResourceRegistry(retry_backoff=0.01)
+    registry.register("llm", flaky)
+    registry.warm_up()
+    assert registry.wait_ready(1) is False
+    time.sleep(0.02)
+    registry.warm_up()
+    assert registry.wait_ready(1) is True
+    assert registry.get("llm") == 42
+
+
+def test_set_installs_ready_value():
+    registry = LazyResourceRegistry()
+    registry.register("vectorstore", lambda: pytest.fail("should not build"))
+    registry.set("vectorstore", "fake")
+    assert registry.get("vectorstore") == "fake"
+    assert registry.state("vectorstore") == READY
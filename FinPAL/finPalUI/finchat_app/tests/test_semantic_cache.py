@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+import pytest
+
+from utils.semantic_cache import SemanticCache
+
+VECTORS = {
+    "what is inflation": [1.0, 0.0, 0.0],
+    "what is inflation?": [0.99, 0.05, 0.0],
+    "explain bonds": [0.0, 1.0, 0.0],
+    "explain etfs": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return VECTORS[text]
+
+    async def aembed_query(self, text):
+        return VECTORS[text]
+
+
+def last_access_on_disk(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT query, last_access FROM answers").fetchall())
+
+
+def test_near_duplicate_hits_and_unrelated_misses():
+    cache = SemanticCache(FakeEmbeddings())
+    cache.add("what is inflation", "Answer: prices rise")
+    assert cache.lookup("what is inflation?") == "Answer: prices rise"
+    assert cache.lookup("explain bonds") is None
+
+
+def test_min_similarity_overrides_threshold():
+    cache = SemanticCache(FakeEmbeddings(), similarity_threshold=0.999)
+    cache.add("what is inflation", "Answer: prices rise")
+    assert cache.lookup_by_vector(VECTORS["what is inflation?"]) is None
+    answer, similarity = cache.lookup_by_vector(VECTORS["what is inflation?"], min_similarity=0.9)
+    assert answer == "Answer: prices rise" and similarity > 0.99
+
+
+def test_expired_entries_serve_only_stale_lookups_until_stale_ttl(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SemanticCache(FakeEmbeddings(), path=path, ttl_seconds=0.05, stale_ttl_seconds=60)
+    cache.add("what is inflation", "Answer: prices rise")
+    time.sleep(0.06)
+    vector = VECTORS["what is inflation"]
+    assert cache.lookup_by_vector(vector) is None
+    assert cache.lookup_by_vector(vector, allow_stale=True)[0] == "Answer: prices rise"
+    # Adding (which evicts) and reloading keep the stale row
+    cache.add("explain bonds", "Answer: loans")
+    reloaded = SemanticCache(FakeEmbeddings(), path=path, ttl_seconds=0.05, stale_ttl_seconds=60)
+    assert reloaded.lookup_by_vector(vector, allow_stale=True)[0] == "Answer: prices rise"
+
+
+def test_entries_past_stale_ttl_are_purged(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SemanticCache(FakeEmbeddings(), path=path, ttl_seconds=0.02, stale_ttl_seconds=0.04)
+    cache.add("what is inflation", "Answer: prices rise")
+    time.sleep(0.05)
+    cache.add("explain bonds", "Answer: loans")
+    assert len(cache) == 1
+    assert cache.lookup_by_vector(VECTORS["what is inflation"], allow_stale=True) is None
+
+
+def test_hits_do_not_commit_until_flushed(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SemanticCache(FakeEmbeddings(), path=path)
+    cache.add("what is inflation", "Answer: prices rise")
+    written = last_access_on_disk(path)["what is inflation"]
+    time.sleep(0.01)
+    assert cache.lookup("what is inflation") == "Answer: prices rise"
+    assert last_access_on_disk(path)["what is inflation"] == written
+    cache.flush()
+    assert last_access_on_disk(path)["what is inflation"] > written
+
+
+def test_stale_entries_are_evicted_before_live_ones():
+    cache = SemanticCache(FakeEmbeddings(), ttl_seconds=0.05, stale_ttl_seconds=60, max_entries=2)
+    cache.add("what is inflation", "stale")
+    time.sleep(0.06)
+    cache.add("explain bonds", "live")
+    # The stale entry was read more recently, but still goes first
+    assert cache.lookup_by_vector(VECTORS["what is inflation"], allow_stale=True)[0] == "stale"
+    cache.add("explain etfs", "newest")
+    assert cache.lookup("explain bonds") == "live"
+    assert cache.lookup("explain etfs") == "newest"
+    assert cache.lookup_by_vector(VECTORS["what is inflation"], allow_stale=True) is None
+
+
+def test_stale_ttl_never_shorter_than_ttl():
+    cache = SemanticCache(FakeEmbeddings(), ttl_seconds=100, stale_ttl_seconds=10)
+    assert cache.stale_ttl_seconds == pytest.approx(100)
+
+
+def test_entries_of_another_version_are_misses(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SemanticCache(FakeEmbeddings(), path=path)
+    cache.add("what is inflation", "Answer: prices rise", version="3")
+    vector = VECTORS["what is inflation"]
+    assert cache.lookup_by_vector(vector, version="3")[0] == "Answer: prices rise"
+    assert cache.lookup_by_vector(vector, version="4") is None
+    # Still a fallback while the knowledge base is down
+    assert cache.lookup_by_vector(vector, version="4", allow_stale=True)[0] == "Answer: prices rise"
+
+    cache.add("what is inflation", "Answer: prices go up", version="4")
+    reloaded = SemanticCache(FakeEmbeddings(), path=path)
+    assert reloaded.lookup_by_vector(vector, version="4")[0] == "Answer: prices go up"
+    assert reloaded.lookup_by_vector(vector, version="3")[0] == "Answer: prices rise"
+
+
+def test_caches_written_before_versioning_are_migrated(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE answers (id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, "
+            "answer TEXT NOT NULL, embedding BLOB NOT NULL, created_at REAL NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+    cache = SemanticCache(FakeEmbeddings(), path=path)
+    cache.add("explain bonds", "Answer: loans", version="1")
+    assert cache.lookup_by_vector(VECTORS["explain bonds"], version="1")[0] == "Answer: loans"
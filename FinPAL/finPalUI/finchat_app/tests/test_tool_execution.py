@@ -0,0 +1,159 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+os.environ.setdefault("MISTRAL_API_KEY", "test-key")  # finPalChatNew refuses to import without one
+from finPalChatNew import FinPalAgent  # noqa: E402
+
+finished = []
+
+
+def make_tool(name, seconds, error=None):
+    def run(x: int) -> str:
+        time.sleep(seconds)
+        if error:
+            raise ValueError(error)
+        finished.append(name)
+        return f"{name}:{x}"
+
+    async def arun(x: int) -> str:
+        await asyncio.sleep(seconds)
+        if error:
+            raise ValueError(error)
+        finished.append(name)
+        return f"{name}:{x}"
+
+    return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=f"{name} tool")
+
+
+TOOLS = [make_tool("slow", 0.2), make_tool("fast", 0.01), make_tool("hang", 2.0), make_tool("boom", 0.0, "exploded")]
+
+
+def call(name, i):
+    return {"name": name, "args": {"x": i}, "id": f"call-{i}", "type": "tool_call"}
+
+
+class ScriptedLLM:
+    """Returns the scripted responses in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def invoke(self, messages):
+        return self.responses.pop(0)
+
+    async def ainvoke(self, messages):
+        return self.responses.pop(0)
+
+
+def make_agent(llm=None, **kwargs):
+    return FinPalAgent(llm or ScriptedLLM(), TOOLS, "system", llm_policy=None, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def clear_finished():
+    finished.clear()
+    yield
+
+
+def tool_messages(history):
+    return [m for m in history if isinstance(m, ToolMessage)]
+
+
+@pytest.mark.parametrize("method", ["chat", "achat"])
+def test_tool_messages_keep_the_requested_order(method):
+    calls = [call("slow", 0), call("fast", 1), call("slow", 2), call("fast", 3)]
+    llm = ScriptedLLM(AIMessage(content="", tool_calls=calls), AIMessage(content="done"))
+    agent = make_agent(llm, tool_executor=ThreadPoolExecutor(max_workers=4))
+    started = time.monotonic()
+    if method == "chat":
+        answer = agent.chat("compare")
+    else:
+        answer = asyncio.run(agent.achat("compare"))
+    elapsed = time.monotonic() - started
+    assert answer == "done"
+    # The fast calls finished first, but the history follows the request order
+    assert finished[:2] == ["fast", "fast"]
+    messages = tool_messages(agent.chat_history)
+    assert [m.tool_call_id for m in messages] == ["call-0", "call-1", "call-2", "call-3"]
+    assert [m.content for m in messages] == ["slow:0", "fast:1", "slow:2", "fast:3"]
+    # Ran concurrently: about one slow call, not two
+    assert elapsed < 0.35
+
+
+@pytest.mark.parametrize("method", ["chat", "achat"])
+def test_timed_out_call_yields_an_error_tool_message(method):
+    calls = [call("fast", 0), call("hang", 1)]
+    llm = ScriptedLLM(AIMessage(content="", tool_calls=calls))
+    agent = make_agent(llm, tool_timeout=0.1)
+    started = time.monotonic()
+    if method == "chat":
+        answer = agent.chat("wait")
+    else:
+        answer = asyncio.run(agent.achat("wait"))
+    assert time.monotonic() - started < 1.0
+    assert "timed out after 0.1s" in answer
+    fast, hang = tool_messages(agent.chat_history)
+    assert fast.content == "fast:0"
+    assert hang.tool_call_id == "call-1"
+    assert hang.content.startswith("ERROR: Error executing tool 'hang'") and "timed out" in hang.content
+
+
+def test_failure_cancels_pending_calls_without_waiting_for_them():
+    agent = make_agent(tool_executor=ThreadPoolExecutor(max_workers=1))
+    started = time.monotonic()
+    outcomes = agent._execute_tool_calls([call("boom", 0), call("hang", 1), call("hang", 2)])
+    assert time.monotonic() - started < 1.0
+    assert [tc["id"] for tc, _, _ in outcomes] == ["call-0", "call-1", "call-2"]
+    assert isinstance(outcomes[0][2], ValueError)
+    assert all(isinstance(error, CancelledError) for _, _, error in outcomes[1:])
+
+
+def test_timeout_cancels_calls_that_have_not_started():
+    # One worker, held by "hang": the queued calls are cancelled before they ever run
+    executor = ThreadPoolExecutor(max_workers=1)
+    agent = make_agent(tool_timeout=0.1, tool_executor=executor)
+    outcomes = agent._execute_tool_calls([call("hang", 0), call("slow", 1), call("fast", 2)])
+    assert isinstance(outcomes[0][2], TimeoutError)
+    assert all(isinstance(error, CancelledError) for _, _, error in outcomes[1:])
+    time.sleep(0.3)
+    assert finished == []
+    executor.shutdown(wait=False)
+
+
+def test_async_failure_cancels_pending_calls():
+    agent = make_agent()
+
+    async def run():
+        outcomes = await agent._aexecute_tool_calls([call("boom", 0), call("slow", 1), call("hang", 2)])
+        await asyncio.sleep(0.3)  # Long enough for "slow" to finish had it not been cancelled
+        return outcomes
+
+    outcomes = asyncio.run(run())
+    assert isinstance(outcomes[0][2], ValueError)
+    assert all(isinstance(error, CancelledError) for _, _, error in outcomes[1:])
+    assert finished == []
+
+
+def test_calls_before_a_failure_keep_their_results():
+    agent = make_agent(tool_executor=ThreadPoolExecutor(max_workers=4))
+    outcomes = agent._execute_tool_calls([call("fast", 0), call("boom", 1), call("slow", 2)])
+    assert outcomes[0][1:] == ("fast:0", None)
+    assert isinstance(outcomes[1][2], ValueError)
+    assert isinstance(outcomes[2][2], CancelledError)
+
+
+def test_single_call_runs_on_the_calling_thread():
+    threads = []
+    probe = StructuredTool.from_function(
+        func=lambda x: threads.append(threading.current_thread()) or "ok", name="probe", description="probe"
+    )
+    agent = FinPalAgent(ScriptedLLM(), [probe], "system", llm_policy=None)
+    assert agent._execute_tool_calls([call("probe", 0)])[0][1] == "ok"
+    assert threads == [threading.current_thread()]
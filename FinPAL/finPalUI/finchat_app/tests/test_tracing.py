@@ -0,0 +1,46 @@
+from utils.tracing import NOOP_SPAN, Tracer
+
+
+class CollectingSink:
+    def __init__(self, records_payloads=True):
+        self.records_payloads = records_payloads
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+
+def test_disabled_tracer_returns_noop_span():
+    tracer = Tracer()
+    assert tracer.span("llm.call") is NOOP_SPAN
+    assert not NOOP_SPAN.is_recording and not NOOP_SPAN.records_payloads
+
+
+def test_metrics_only_sink_skips_payload_sizes():
+    tracer = Tracer()
+    metrics_like = CollectingSink(records_payloads=False)
+    tracer.add_sink(metrics_like)
+    with tracer.span("opensearch.search") as span:
+        assert span.is_recording and not span.records_payloads
+    assert [s.name for s in metrics_like.spans] == ["opensearch.search"]
+
+    exporter = CollectingSink()
+    tracer.add_sink(exporter)
+    with tracer.span("opensearch.search") as span:
+        assert span.records_payloads
+    tracer.remove_sink(exporter)
+    assert not tracer.records_payloads
+
+
+def test_spans_nest_under_the_current_span():
+    tracer = Tracer()
+    sink = CollectingSink()
+    tracer.add_sink(sink)
+    with tracer.span("agent.turn") as turn:
+        with tracer.span("llm.call") as call:
+            assert tracer.current_span() is call
+    assert call.parent_span_id == turn.span_id and call.trace_id == turn.trace_id
+    assert [s.name for s in sink.spans] == ["llm.call", "agent.turn"]
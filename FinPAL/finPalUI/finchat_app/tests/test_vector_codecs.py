@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from utils.vector_codecs import (
+    ProductQuantizer,
+    decode_vectors,
+    encode_vectors,
+    fit_byte_scale,
+)
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(600, 32)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def test_float_round_trip_is_exact(vectors):
+    assert np.array_equal(decode_vectors(encode_vectors(vectors, None), None), vectors)
+
+
+def test_byte_round_trip(vectors):
+    encoding = {"data_type": "byte", "scale": fit_byte_scale(vectors)}
+    encoded = encode_vectors(vectors, encoding)
+    assert all(-128 <= value <= 127 and isinstance(value, int) for row in encoded for value in row)
+    decoded = decode_vectors(encoded, encoding)
+    # Rounding to int8 is off by at most half a step, except for clipped outliers
+    assert np.mean(np.abs(decoded - vectors) <= 0.5 / encoding["scale"] + 1e-6) > 0.99
+    cosine = np.sum(decoded * vectors, axis=1) / np.linalg.norm(decoded, axis=1)
+    assert cosine.min() > 0.99
+
+
+def test_fp16_rounds_to_short_literals(vectors):
+    encoded = encode_vectors(vectors[:2], {"data_type": "fp16"})
+    assert np.allclose(decode_vectors(encoded, {"data_type": "fp16"}), vectors[:2], atol=1e-5)
+
+
+def test_product_quantizer_round_trip(vectors):
+    pq = ProductQuantizer.fit(vectors, m=8, ksub=64, iterations=10)
+    codes = pq.encode(vectors)
+    assert codes.shape == (len(vectors), 8) and codes.dtype == np.uint8
+    decoded = pq.decode(codes)
+    assert decoded.shape == vectors.shape
+    # Far better than chance: every vector decodes close to itself
+    cosine = np.sum(decoded * vectors, axis=1) / np.linalg.norm(decoded, axis=1)
+    assert cosine.mean() > 0.8
+    # Re-encoding the reconstruction is a fixed point
+    assert np.array_equal(pq.encode(decoded), codes)
+
+
+def test_product_quantizer_serialization(vectors):
+    pq = ProductQuantizer.fit(vectors, m=4, ksub=16, iterations=5)
+    restored = ProductQuantizer.from_dict(pq.to_dict())
+    assert restored.fingerprint == pq.fingerprint
+    encoded = pq.encode_base64(vectors[:5])
+    assert np.allclose(restored.decode_base64(encoded), pq.decode(pq.encode(vectors[:5])))
+
+
+def test_product_quantizer_validates_shape(vectors):
+    with pytest.raises(ValueError):
+        ProductQuantizer.fit(vectors, m=5)
+    with pytest.raises(ValueError):
+        ProductQuantizer.fit(vectors[:10], m=8, ksub=64)
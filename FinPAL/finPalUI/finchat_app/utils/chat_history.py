@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional, Sequence
+
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    get_buffer_string,
+)
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+SUMMARIZE_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and FinPal, "
+    "a financial assistant. Update the summary with the new messages. Keep every "
+    "figure the user gave (amounts, rates, tenures, currencies) and every result "
+    "that was computed. Reply with the updated summary only, in at most {max_words} words."
+)
+
+
+class ChatHistoryWindow:
+    """Token-budgeted sliding window over an agent's chat history.
+
+    The first message (the system prompt) is always kept. The remaining
+    messages are trimmed from the oldest end until the whole history fits in
+    `max_tokens`, and the kept part always starts at a user message so tool
+    calls are never separated from their ToolMessages.
+
+    If a `summarizer` chat model is given, evicted messages are folded into a
+    rolling summary that is kept right after the system prompt, so older facts
+    survive eviction at a bounded cost.
+
+    Example:
+        .. code-block:: python
+
+            window = ChatHistoryWindow(max_tokens=6000)
+            agent = FinPalAgent(llm, tools, SYSTEM_MESSAGE_CONTENT, history_manager=window)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 6000,
+        token_counter: Optional[Callable[[Sequence[BaseMessage]], int]] = None,
+        summarizer: Optional[Any] = None,
+        max_summary_words: int = 150,
+    ):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or count_tokens_approximately
+        self.summarizer = summarizer
+        self.max_summary_words = max_summary_words
+        self.summary: Optional[str] = None
+
+    def _split(
+        self, history: List[BaseMessage]
+    ) -> tuple[List[BaseMessage], List[BaseMessage], List[BaseMessage]]:
+        """Return (pinned, evicted, kept) for the given history."""
+        pinned = [history[0]] if history and isinstance(history[0], SystemMessage) else []
+        rest = history[len(pinned):]
+        if rest and self._is_summary(rest[0]):
+            rest = rest[1:]
+
+        budget = self.max_tokens - self.token_counter(pinned + self._summary_messages())
+        kept = trim_messages(
+            rest,
+            max_tokens=max(budget, 0),
+            token_counter=self.token_counter,
+            strategy="last",
+            start_on="human",
+            allow_partial=False,
+        )
+        if not kept:
+            # Even the current user message does not fit; never drop the question itself
+            last_human = max(
+                (i for i, m in enumerate(rest) if isinstance(m, HumanMessage)),
+                default=len(rest),
+            )
+            kept = rest[last_human:]
+        evicted = rest[: len(rest) - len(kept)]
+        return pinned, evicted, kept
+
+    @staticmethod
+    def _is_summary(message: BaseMessage) -> bool:
+        return isinstance(message, SystemMessage) and str(message.content).startswith(
+            SUMMARY_PREFIX
+        )
+
+    def _summary_messages(self) -> List[BaseMessage]:
+        if not self.summary:
+            return []
+        return [SystemMessage(content=SUMMARY_PREFIX + self.summary)]
+
+    def _summary_prompt(self, evicted: List[BaseMessage]) -> List[BaseMessage]:
+        previous = self.summary or "(empty)"
+        return [
+            SystemMessage(
+                content=SUMMARIZE_INSTRUCTIONS.format(max_words=self.max_summary_words)
+            ),
+            HumanMessage(
+                content=f"Current summary:\n{previous}\n\nNew messages:\n"
+                f"{get_buffer_string(evicted)}"
+            ),
+        ]
+
+    def trim(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        """Return the bounded history, summarizing evicted messages if configured."""
+        pinned, evicted, kept = self._split(history)
+        if evicted and self.summarizer is not None:
+            self.summary = str(self.summarizer.invoke(self._summary_prompt(evicted)).content)
+        return pinned + self._summary_messages() + kept
+
+    async def atrim(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        """Async version of `trim`; the summarizer is called with `ainvoke`."""
+        pinned, evicted, kept = self._split(history)
+        if evicted and self.summarizer is not None:
+            response = await self.summarizer.ainvoke(self._summary_prompt(evicted))
+            self.summary = str(response.content)
+        return pinned + self._summary_messages() + kept
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from utils.tracing import payload_size, tracer
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for a text: surrounding/repeated whitespace collapsed, lower-cased."""
+    return " ".join(text.split()).lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """LRU cache in front of another `Embeddings` implementation.
+
+    Texts are keyed with `normalize_text`, so "What is inflation?" and
+    " what is  inflation? " share one forward pass. Query and document
+    embeddings are cached separately because some models embed them
+    differently.
+
+    Example:
+        .. code-block:: python
+
+            embeddings = CachedEmbeddings(HuggingFaceEmbeddings(...), maxsize=4096)
+    """
+
+    def __init__(self, underlying: Embeddings, maxsize: int = 4096):
+        self.underlying = underlying
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind: str, text: str) -> Optional[List[float]]:
+        key = (kind, normalize_text(text))
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return list(vector)
+
+    def _put(self, kind: str, text: str, vector: List[float]) -> None:
+        key = (kind, normalize_text(text))
+        with self._lock:
+            self._cache[key] = list(vector)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        with tracer.span("embedding.query") as span:
+            vector = self._get("query", text)
+            span.set_attribute("embedding.cache_hit", vector is not None)
+            if vector is None:
+                vector = self.underlying.embed_query(text)
+                self._put("query", text, vector)
+            if span.records_payloads:
+                span.set_attributes({"embedding.text_bytes": payload_size(text), "embedding.dimensions": len(vector)})
+            return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with tracer.span("embedding.query") as span:
+            vector = self._get("query", text)
+            span.set_attribute("embedding.cache_hit", vector is not None)
+            if vector is None:
+                vector = await self.underlying.aembed_query(text)
+                self._put("query", text, vector)
+            if span.records_payloads:
+                span.set_attributes({"embedding.text_bytes": payload_size(text), "embedding.dimensions": len(vector)})
+            return vector
+
+    def _split_documents(
+        self, texts: List[str]
+    ) -> Tuple[List[Optional[List[float]]], List[str]]:
+        vectors = [self._get("document", text) for text in texts]
+        missing: Dict[str, None] = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                missing[text] = None
+        return vectors, list(missing)
+
+    def _merge_documents(
+        self,
+        texts: List[str],
+        vectors: List[Optional[List[float]]],
+        missing: List[str],
+        embedded: List[List[float]],
+    ) -> List[List[float]]:
+        fresh = dict(zip(missing, embedded))
+        for text, vector in fresh.items():
+            self._put("document", text, vector)
+        return [
+            vector if vector is not None else list(fresh[text])
+            for text, vector in zip(texts, vectors)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with tracer.span("embedding.documents", **{"embedding.texts": len(texts)}) as span:
+            vectors, missing = self._split_documents(texts)
+            span.set_attribute("embedding.cache_misses", len(missing))
+            embedded = self.underlying.embed_documents(missing) if missing else []
+            return self._merge_documents(texts, vectors, missing, embedded)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with tracer.span("embedding.documents", **{"embedding.texts": len(texts)}) as span:
+            vectors, missing = self._split_documents(texts)
+            span.set_attribute("embedding.cache_misses", len(missing))
+            embedded = await self.underlying.aembed_documents(missing) if missing else []
+            return self._merge_documents(texts, vectors, missing, embedded)
+
+
+class BatchingEmbeddings(Embeddings):
+    """Micro-batches concurrent `embed_query` calls into one `embed_documents` call.
+
+    Calls arriving from different sessions within `max_wait_ms` of each other
+    (up to `max_batch_size`) share a single forward pass, which is much cheaper
+    per text than separate passes on CPU. Only use it with symmetric models
+    such as all-mpnet-base-v2, where a query and a document embed identically.
+
+    Example:
+        .. code-block:: python
+
+            embeddings = BatchingEmbeddings(HuggingFaceEmbeddings(...), max_wait_ms=5)
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.underlying = underlying
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.batches = 0
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="finpal-embed-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        self.batches += 1
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.underlying.embed_documents(texts)
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
@@ -0,0 +1,600 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from utils.tracing import tracer
+from utils.vector_codecs import decode_vectors
+
+IMPORT_HNSWLIB_ERROR = (
+    "Could not import hnswlib. Please install it with `pip install hnswlib`."
+)
+IMPORT_OPENSEARCH_PY_ERROR = (
+    "Could not import OpenSearch. Please install it with `pip install opensearch-py`."
+)
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+META_FILE = "meta.json"
+HNSW_FILE = "hnsw.bin"
+SNAPSHOT_FORMAT = 1
+
+# OpenSearch space type -> hnswlib space
+_HNSW_SPACES = {"l2": "l2", "cosinesimil": "cosine", "innerproduct": "ip"}
+
+
+def _distances_to_scores(distances: np.ndarray, space_type: str) -> np.ndarray:
+    """Convert distances to the scores the OpenSearch k-NN plugin (nmslib/faiss) reports.
+
+    l2 and cosinesimil: 1 / (1 + d); innerproduct: 1 / (1 + d) for d >= 0,
+    otherwise 1 - d, with d = -inner product.
+    """
+    if space_type == "innerproduct":
+        return np.where(distances >= 0, 1 / (1 + distances), 1 - distances)
+    return 1 / (1 + distances)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store over a memory-mapped embedding matrix.
+
+    A drop-in for `OpenSearchVectorSearch` on the retrieval path
+    (`similarity_search*`, `max_marginal_relevance_search*`, `as_retriever`)
+    when the knowledge base fits in memory: searches are exact NumPy scans, or
+    hnswlib lookups when the snapshot has an HNSW index, with scores on the
+    same scale as the OpenSearch k-NN plugin. Snapshots are directories written
+    by `snapshot_from_opensearch` (or `save`) holding a float32/float16
+    `vectors.npy`, the texts and metadata, and optionally `hnsw.bin`.
+
+    Example:
+        .. code-block:: python
+
+            snapshot_from_opensearch(client, "financialinfo", "local_index", dtype="float16")
+            vectorstore = LocalVectorStore.load("local_index", embedding_function)
+            docs = vectorstore.similarity_search("What is a SIP?", k=3)
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        vectors: np.ndarray,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        space_type: str = "l2",
+        hnsw_index: Any = None,
+        path: Optional[str] = None,
+        block_size: int = 65536,
+    ):
+        if space_type not in _HNSW_SPACES:
+            raise ValueError(
+                f"space_type must be one of {sorted(_HNSW_SPACES)}, got {space_type!r}"
+            )
+        if not (len(vectors) == len(texts) == len(metadatas) == len(ids)):
+            raise ValueError("vectors, texts, metadatas and ids must have the same length")
+        self.embedding_function = embedding_function
+        self.space_type = space_type
+        self.path = path
+        self.block_size = block_size
+        self._lock = threading.RLock()
+        self._set_data(vectors, texts, metadatas, ids, hnsw_index)
+
+    def _set_data(
+        self,
+        vectors: np.ndarray,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        hnsw_index: Any = None,
+    ) -> None:
+        norms = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), self.block_size):
+            block = np.asarray(vectors[start : start + self.block_size], dtype=np.float32)
+            norms[start : start + len(block)] = np.einsum("ij,ij->i", block, block)
+        # Swapped in one assignment so concurrent searches never see half an update
+        index = {_id: i for i, _id in enumerate(ids)}
+        self._data = (vectors, texts, metadatas, ids, norms, index, hnsw_index)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    @property
+    def hnsw_index(self) -> Any:
+        return self._data[6]
+
+    def __len__(self) -> int:
+        return len(self._data[1])
+
+    # --- Loading and saving ---
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding_function: Embeddings,
+        use_hnsw: bool = True,
+        ef_search: int = 128,
+        **kwargs: Any,
+    ) -> LocalVectorStore:
+        """Open a snapshot directory; the vectors stay memory-mapped."""
+        # Resolved once, so every file comes from the same snapshot even if a new one is swapped in meanwhile
+        snapshot_dir = os.path.realpath(path)
+        with open(os.path.join(snapshot_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format in {path}: {meta.get('format')}")
+        vectors = np.load(os.path.join(snapshot_dir, VECTORS_FILE), mmap_mode="r")
+        texts, metadatas, ids = [], [], []
+        with open(os.path.join(snapshot_dir, DOCUMENTS_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                texts.append(record["text"])
+                metadatas.append(record["metadata"])
+
+        hnsw_index = None
+        hnsw_path = os.path.join(snapshot_dir, HNSW_FILE)
+        if use_hnsw and os.path.exists(hnsw_path):
+            try:
+                import hnswlib
+            except ImportError:
+                raise ImportError(IMPORT_HNSWLIB_ERROR)
+            hnsw_index = hnswlib.Index(space=_HNSW_SPACES[meta["space_type"]], dim=meta["dimension"])
+            hnsw_index.load_index(hnsw_path, max_elements=len(ids))
+            hnsw_index.set_ef(ef_search)
+
+        store = cls(
+            embedding_function, vectors, texts, metadatas, ids,
+            space_type=meta["space_type"], hnsw_index=hnsw_index, path=path, **kwargs,
+        )
+        store.snapshot_meta = meta
+        return store
+
+    def save(self, path: str, build_hnsw: bool = False, **meta: Any) -> str:
+        """Write this store as a snapshot directory (see `write_snapshot`)."""
+        vectors, texts, metadatas, ids, _, _, _ = self._data
+        return write_snapshot(
+            path, ((i, t, m, v) for i, t, m, v in zip(ids, texts, metadatas, vectors)),
+            count=len(ids), dimension=vectors.shape[1], dtype=str(vectors.dtype),
+            space_type=self.space_type, build_hnsw=build_hnsw, **meta,
+        )
+
+    def reload(self) -> bool:
+        """Re-open `path` if a newer snapshot was written there; returns whether it changed."""
+        if self.path is None:
+            return False
+        with open(os.path.join(self.path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("created_at") == getattr(self, "snapshot_meta", {}).get("created_at"):
+            return False
+        fresh = type(self).load(self.path, self.embedding_function, use_hnsw=self.hnsw_index is not None)
+        with self._lock:
+            self._data = fresh._data
+            self.snapshot_meta = fresh.snapshot_meta
+        return True
+
+    def index_generation(self) -> Optional[str]:
+        """Version of the loaded snapshot: the generation of the OpenSearch index
+        it was taken from (see `OpenSearchVectorSearch.index_generation`), else
+        its creation time. None for a store that was not loaded from a snapshot."""
+        meta = getattr(self, "snapshot_meta", None)
+        if meta is None:
+            return None
+        return str(meta.get("source_generation", meta.get("created_at")))
+
+    async def aindex_generation(self) -> Optional[str]:
+        return self.index_generation()
+
+    def sync_from_opensearch(self, client: Any, index_name: str, **kwargs: Any) -> bool:
+        """Re-snapshot `index_name` into `path` and switch to it (see `snapshot_from_opensearch`)."""
+        if self.path is None:
+            raise ValueError("sync_from_opensearch needs a store opened from a snapshot path")
+        kwargs.setdefault("build_hnsw", self.hnsw_index is not None)
+        kwargs.setdefault("space_type", self.space_type)
+        kwargs.setdefault("dtype", str(self._data[0].dtype))
+        snapshot_from_opensearch(client, index_name, self.path, **kwargs)
+        return self.reload()
+
+    # --- Search ---
+    def _search(
+        self, state: tuple, embedding: List[float], k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers (into `state`, a `_data` tuple) and scores of the k best matches, best first."""
+        vectors, _, metadatas, _, norms, _, hnsw_index = state
+        if len(vectors) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        allowed = None
+        if filter:
+            allowed = np.fromiter(
+                (all(m.get(key) == value for key, value in filter.items()) for m in metadatas),
+                dtype=bool, count=len(metadatas),
+            )
+
+        if hnsw_index is not None and (allowed is None or allowed.any()):
+            hnsw_filter = None if allowed is None else (lambda label: bool(allowed[label]))
+            n = len(vectors) if allowed is None else int(allowed.sum())
+            labels, distances = hnsw_index.knn_query(query, k=min(k, n), filter=hnsw_filter)
+            labels, distances = labels[0].astype(np.int64), distances[0]
+            if self.space_type == "innerproduct":
+                distances = distances - 1  # hnswlib reports 1 - ip, OpenSearch -ip
+            # l2 (squared) and cosine (1 - cos) distances already match OpenSearch's
+            scores = _distances_to_scores(distances, self.space_type)
+            return labels, scores.astype(np.float32)
+
+        # Exact scan in blocks, so a float16 mmap is converted a block at a time
+        products = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), self.block_size):
+            block = np.asarray(vectors[start : start + self.block_size], dtype=np.float32)
+            products[start : start + len(block)] = block @ query
+        if self.space_type == "l2":
+            distances = np.maximum(norms - 2 * products + query @ query, 0)
+        elif self.space_type == "cosinesimil":
+            denominator = np.sqrt(norms) * np.linalg.norm(query)
+            distances = 1 - products / np.where(denominator == 0, 1, denominator)
+        else:
+            distances = -products
+        if allowed is not None:
+            distances = np.where(allowed, distances, np.inf)
+            k = min(k, int(allowed.sum()))
+        k = min(k, len(distances))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return top, _distances_to_scores(distances[top], self.space_type).astype(np.float32)
+
+    @staticmethod
+    def _to_documents(
+        state: tuple, rows: Iterable[int], scores: Iterable[float]
+    ) -> List[Tuple[Document, float]]:
+        _, texts, metadatas, ids, _, _, _ = state
+        return [
+            (Document(page_content=texts[row], metadata=metadatas[row], id=ids[row]), float(score))
+            for row, score in zip(rows, scores)
+        ]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most similar to query.
+
+        Args:
+            query: Text to look up documents similar to.
+            k: Number of Documents to return. Defaults to 4.
+            score_threshold: Only return documents scoring at least this much.
+            filter: Optional dict of metadata key/value pairs the documents must match.
+        """
+        docs_with_scores = self.similarity_search_with_score(query, k, score_threshold, **kwargs)
+        return [doc[0] for doc in docs_with_scores]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, score_threshold: Optional[float] = 0.0, **kwargs: Any
+    ) -> List[Document]:
+        docs_with_scores = self.similarity_search_with_score_by_vector(
+            embedding, k, score_threshold, **kwargs
+        )
+        return [doc[0] for doc in docs_with_scores]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, score_threshold: Optional[float] = 0.0, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, score_threshold, **kwargs)
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, score_threshold: Optional[float] = 0.0, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        state = self._data  # One consistent view even if reload() swaps the data meanwhile
+        backend = "hnsw" if state[6] is not None else "exact"
+        with tracer.span("vectorstore.local_search", **{"search.k": k, "search.backend": backend}):
+            rows, scores = self._search(state, embedding, k, kwargs.get("filter"))
+        if score_threshold:
+            keep = scores >= score_threshold
+            rows, scores = rows[keep], scores[keep]
+        return self._to_documents(state, rows, scores)
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        """Return docs selected using the maximal marginal relevance.
+
+        Maximal marginal relevance optimizes for similarity to query AND diversity
+        among selected documents.
+        """
+        embedding = self.embedding_function.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(
+            embedding, k, fetch_k, lambda_mult, **kwargs
+        )
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> List[Document]:
+        from utils.opensearch_vector_search import _maximal_marginal_relevance
+
+        state = self._data
+        with tracer.span("vectorstore.local_search", **{"search.k": fetch_k, "search.mmr": True}):
+            rows, scores = self._search(state, embedding, fetch_k, kwargs.get("filter"))
+        candidates = np.asarray(state[0][rows], dtype=np.float32)
+        selected = _maximal_marginal_relevance(embedding, candidates, lambda_mult=lambda_mult, k=k)
+        return [doc for doc, _ in self._to_documents(state, rows[selected], scores[selected])]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        # Scans are CPU bound and short; running inline beats a thread hop
+        embedding = await self.embedding_function.aembed_query(query)
+        return self.similarity_search_by_vector(embedding, k, **kwargs)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already on OpenSearch's 0..1 (higher is better) scale
+        return lambda score: score
+
+    # --- Writes (for building snapshots; the app treats the store as read-only) ---
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        from utils.opensearch_vector_search import _content_hash_id
+
+        texts, embeddings = zip(*text_embeddings)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [_content_hash_id(t, m) for t, m in zip(texts, metadatas)]
+        with self._lock:
+            vectors, old_texts, old_metadatas, old_ids, _, index, _ = self._data
+            new_rows = [i for i, _id in enumerate(ids) if _id not in index]
+            # Ids already present are replaced in place, like an OpenSearch `index` action
+            merged = np.array(vectors, dtype=vectors.dtype if len(vectors) else np.float32)
+            merged_texts, merged_metadatas = list(old_texts), list(old_metadatas)
+            for i, _id in enumerate(ids):
+                if _id in index:
+                    row = index[_id]
+                    merged[row] = embeddings[i]
+                    merged_texts[row], merged_metadatas[row] = texts[i], metadatas[i]
+            if new_rows:
+                added = np.asarray([embeddings[i] for i in new_rows], dtype=merged.dtype)
+                merged = np.concatenate([merged.reshape(-1, added.shape[1]), added])
+                merged_texts += [texts[i] for i in new_rows]
+                merged_metadatas += [metadatas[i] for i in new_rows]
+            # The HNSW graph is dropped (exact search) until the store is saved with build_hnsw
+            self._set_data(merged, merged_texts, merged_metadatas, list(old_ids) + [ids[i] for i in new_rows])
+        return list(ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids is None:
+            raise ValueError("ids must be provided.")
+        with self._lock:
+            vectors, texts, metadatas, old_ids, _, index, _ = self._data
+            drop = {index[_id] for _id in ids if _id in index}
+            if not drop:
+                return False
+            keep = np.array([i for i in range(len(old_ids)) if i not in drop], dtype=np.int64)
+            self._set_data(
+                np.asarray(vectors)[keep],
+                [texts[i] for i in keep], [metadatas[i] for i in keep], [old_ids[i] for i in keep],
+            )
+        return True
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        space_type: str = "l2",
+        dtype: str = "float32",
+        **kwargs: Any,
+    ) -> LocalVectorStore:
+        embeddings = embedding.embed_documents(list(texts))
+        store = cls(
+            embedding, np.empty((0, len(embeddings[0])), dtype=dtype), [], [], [],
+            space_type=space_type, **kwargs,
+        )
+        store.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids)
+        return store
+
+
+def write_snapshot(
+    path: str,
+    records: Iterable[Tuple[str, str, dict, Any]],
+    count: int,
+    dimension: int,
+    dtype: str = "float32",
+    space_type: str = "l2",
+    build_hnsw: bool = False,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 200,
+    **meta: Any,
+) -> str:
+    """Write `(id, text, metadata, vector)` records as a snapshot directory at `path`.
+
+    `path` is a symlink to a versioned directory next to it. The snapshot is
+    assembled in a new version directory and the symlink is replaced in one
+    atomic rename, so `path` always exists and readers (see
+    `LocalVectorStore.reload`) never open a half-written snapshot. The
+    previous version is kept until the next write, for readers still opening
+    it; older ones are removed. A plain directory at `path` (written before
+    snapshots were versioned) is moved aside once, not atomically.
+    Vectors are streamed into a memory-mapped .npy file; memory use does not
+    grow with `count`. If the number of records differs from `count` the
+    matrix is resized to what actually arrived.
+    """
+    staging = f"{path}.v-{int(time.time() * 1000)}-{os.getpid()}"
+    os.makedirs(staging)
+    try:
+        vectors = np.lib.format.open_memmap(
+            os.path.join(staging, VECTORS_FILE), mode="w+", dtype=dtype, shape=(count, dimension)
+        )
+        written = 0
+        overflow: List[Any] = []
+        with open(os.path.join(staging, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            for _id, text, metadata, vector in records:
+                if written < count:
+                    vectors[written] = vector
+                else:
+                    overflow.append(vector)
+                f.write(json.dumps({"id": _id, "text": text, "metadata": metadata}) + "\n")
+                written += 1
+        vectors.flush()
+        del vectors
+        if written != count:
+            # Documents added or deleted while the snapshot was taken; rewrite at the real size
+            vectors_path = os.path.join(staging, VECTORS_FILE)
+            matrix = np.array(np.load(vectors_path, mmap_mode="r")[: min(written, count)])
+            if overflow:
+                matrix = np.concatenate([matrix, np.asarray(overflow, dtype=dtype)])
+            np.save(vectors_path, matrix)
+
+        if build_hnsw and written:
+            try:
+                import hnswlib
+            except ImportError:
+                raise ImportError(IMPORT_HNSWLIB_ERROR)
+            matrix = np.load(os.path.join(staging, VECTORS_FILE), mmap_mode="r")
+            hnsw_index = hnswlib.Index(space=_HNSW_SPACES[space_type], dim=dimension)
+            hnsw_index.init_index(max_elements=written, ef_construction=hnsw_ef_construction, M=hnsw_m)
+            for start in range(0, written, 65536):
+                block = np.asarray(matrix[start : start + 65536], dtype=np.float32)
+                hnsw_index.add_items(block, np.arange(start, start + len(block)))
+            hnsw_index.save_index(os.path.join(staging, HNSW_FILE))
+
+        with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": SNAPSHOT_FORMAT,
+                "count": written,
+                "dimension": dimension,
+                "dtype": dtype,
+                "space_type": space_type,
+                "hnsw": bool(build_hnsw and written),
+                "created_at": time.time(),
+                **meta,
+            }, f)
+
+        _swap_in(path, staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return path
+
+
+def _swap_in(path: str, staging: str) -> None:
+    """Point the `path` symlink at the finished snapshot `staging` and drop old versions."""
+    parent = os.path.dirname(os.path.abspath(path))
+    previous = None
+    if os.path.islink(path):
+        previous = os.path.basename(os.readlink(path))
+    elif os.path.isdir(path):
+        previous = f"{os.path.basename(path)}.v-0-legacy-{os.getpid()}"
+        os.rename(path, os.path.join(parent, previous))
+    link = f"{staging}.link"
+    os.symlink(os.path.basename(staging), link)
+    try:
+        os.replace(link, path)
+    except BaseException:
+        os.remove(link)
+        raise
+    prefix = f"{os.path.basename(path)}.v-"
+    keep = {os.path.basename(staging), previous}
+    for name in os.listdir(parent):
+        version = os.path.join(parent, name)
+        # Unfinished snapshots of a concurrent writer have no meta.json yet
+        if (
+            name.startswith(prefix)
+            and name not in keep
+            and os.path.isdir(version)
+            and not os.path.islink(version)
+            and os.path.exists(os.path.join(version, META_FILE))
+        ):
+            shutil.rmtree(version, ignore_errors=True)
+
+
+def snapshot_from_opensearch(
+    client: Any,
+    index_name: str,
+    path: str,
+    vector_field: str = "vector_field",
+    text_field: str = "text",
+    metadata_field: str = "metadata",
+    dtype: str = "float32",
+    space_type: Optional[str] = None,
+    build_hnsw: bool = False,
+    scroll_size: int = 1000,
+) -> str:
+    """Copy every document of an OpenSearch index into a local snapshot at `path`.
+
+    The index is read with a scroll, so the whole corpus is never held in
+    memory. `space_type` defaults to the one in the index mapping; `dtype`
+    "float16" halves the snapshot size at a negligible cost in recall.
+    Byte-encoded indices are decoded back to embedding space with the scale
+    recorded in the mapping. The index generation the snapshot was taken at
+    is recorded as `source_generation`.
+    """
+    try:
+        from opensearchpy.exceptions import NotFoundError
+        from opensearchpy.helpers import scan
+    except ImportError:
+        raise ImportError(IMPORT_OPENSEARCH_PY_ERROR)
+    from utils.opensearch_vector_search import GENERATION_DOC_ID, OpenSearchVectorSearch
+
+    # Read before the scan: a write landing during it makes the snapshot look older, never newer
+    try:
+        source_generation = OpenSearchVectorSearch._generation_from_document(
+            client.get(index=OpenSearchVectorSearch._generation_index(index_name), id=GENERATION_DOC_ID)
+        )
+    except NotFoundError:
+        source_generation = "0"
+    mapping = client.indices.get_mapping(index=index_name)[index_name]["mappings"]
+    field = mapping["properties"][vector_field]
+    dimension = field["dimension"]
+    encoding = mapping.get("_meta", {}).get("vector_encoding")
+    if space_type is None:
+        space_type = field.get("method", {}).get("space_type", "l2")
+    count = client.count(index=index_name)["count"]
+    hits = scan(
+        client, index=index_name, size=scroll_size, query={"query": {"match_all": {}}},
+        _source=[vector_field, text_field, metadata_field], preserve_order=False,
+    )
+    records = (
+        (
+            hit["_id"],
+            hit["_source"].get(text_field, ""),
+            hit["_source"].get(metadata_field, {}),
+            decode_vectors([hit["_source"][vector_field]], encoding)[0],
+        )
+        for hit in hits
+    )
+    return write_snapshot(
+        path, records, count=count, dimension=dimension, dtype=dtype,
+        space_type=space_type, build_hnsw=build_hnsw, source_index=index_name,
+        source_generation=source_generation,
+    )
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.tracing import Span, tracer
+
+IMPORT_PROMETHEUS_CLIENT_ERROR = (
+    "Could not import prometheus_client. Please install it with `pip install prometheus-client`."
+)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+except ImportError:  # pragma: no cover - checked in FinPalMetrics.__init__
+    CollectorRegistry = None  # type: ignore
+
+# Latency buckets (seconds) sized for LLM round trips: 10 ms .. 60 s
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class FinPalMetrics:
+    """Prometheus metrics for the FinPal app.
+
+    The agent, tool, embedding and OpenSearch metrics are derived from the
+    spans emitted by utils.tracing (see `install`), so the instrumented code
+    has a single hook. HTTP metrics come from `PrometheusMiddleware` and the
+    session gauge is moved by the Chainlit session callbacks.
+
+    Example:
+        .. code-block:: python
+
+            metrics = FinPalMetrics()
+            metrics.install()                     # subscribe to spans
+            app.add_middleware(PrometheusMiddleware, metrics=metrics)
+            body, content_type = metrics.render()
+    """
+
+    def __init__(self, registry: Optional[Any] = None):
+        if CollectorRegistry is None:
+            raise ImportError(IMPORT_PROMETHEUS_CLIENT_ERROR)
+        self.registry = registry if registry is not None else CollectorRegistry()
+        r = self.registry
+
+        self.http_requests = Counter(
+            "finpal_http_requests_total", "HTTP requests", ["method", "route", "status"], registry=r
+        )
+        self.http_latency = Histogram(
+            "finpal_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+            buckets=LATENCY_BUCKETS, registry=r,
+        )
+        self.http_in_progress = Gauge(
+            "finpal_http_requests_in_progress", "HTTP requests being served", registry=r
+        )
+        self.active_sessions = Gauge(
+            "finpal_active_chat_sessions", "Open Chainlit chat sessions", registry=r
+        )
+
+        self.turns = Counter(
+            "finpal_agent_turns_total", "Agent turns", ["method", "status"], registry=r
+        )
+        self.turns_in_progress = Gauge(
+            "finpal_agent_turns_in_progress", "Agent turns currently running", registry=r
+        )
+        self.turn_latency = Histogram(
+            "finpal_agent_turn_duration_seconds", "Agent turn latency", ["method"],
+            buckets=LATENCY_BUCKETS, registry=r,
+        )
+        self.steps_per_turn = Histogram(
+            "finpal_agent_steps_per_turn", "LLM steps needed per turn", buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+            registry=r,
+        )
+        self.llm_latency = Histogram(
+            "finpal_llm_call_duration_seconds", "LLM call latency", ["streaming"],
+            buckets=LATENCY_BUCKETS, registry=r,
+        )
+        self.llm_tokens = Counter(
+            "finpal_llm_tokens_total", "LLM tokens", ["direction"], registry=r
+        )
+        self.tool_calls = Counter(
+            "finpal_tool_calls_total", "Tool calls", ["tool", "status"], registry=r
+        )
+        self.tool_latency = Histogram(
+            "finpal_tool_call_duration_seconds", "Tool call latency", ["tool"],
+            buckets=LATENCY_BUCKETS, registry=r,
+        )
+        self.answer_cache = Counter(
+            "finpal_answer_cache_lookups_total", "Semantic answer cache lookups", ["result"], registry=r
+        )
+        self.rag_latency = Histogram(
+            "finpal_rag_chain_duration_seconds", "RetrievalQA chain latency",
+            buckets=LATENCY_BUCKETS, registry=r,
+        )
+        self.embedding_latency = Histogram(
+            "finpal_embedding_duration_seconds", "Embedding latency", ["kind", "cache"],
+            buckets=FAST_BUCKETS, registry=r,
+        )
+        self.search_requests = Counter(
+            "finpal_opensearch_searches_total", "OpenSearch searches", ["search_type", "status"], registry=r
+        )
+        self.search_latency = Histogram(
+            "finpal_opensearch_search_duration_seconds", "OpenSearch search round trip", ["search_type"],
+            buckets=FAST_BUCKETS + (5, 10), registry=r,
+        )
+
+        self._steps: Dict[str, int] = {}
+        self._steps_lock = threading.Lock()
+
+    def install(self) -> None:
+        """Start deriving metrics from spans (enables span creation in utils.tracing)."""
+        tracer.add_sink(self)
+
+    def render(self) -> tuple:
+        """(body, content type) for a /metrics response."""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+    # --- SpanSink interface ---
+    # Only durations, counts and tokens are read, so spans need not serialize payloads for their sizes
+    records_payloads = False
+
+    def on_start(self, span: Span) -> None:
+        if span.name == "agent.turn":
+            self.turns_in_progress.inc()
+
+    def export(self, span: Span) -> None:
+        handler = self._handlers.get(span.name)
+        if handler is not None:
+            handler(self, span, "error" if span.error else "ok")
+
+    def shutdown(self) -> None:
+        pass
+
+    def _on_turn(self, span: Span, status: str) -> None:
+        method = span.attributes.get("agent.method", "unknown")
+        self.turns_in_progress.dec()
+        self.turns.labels(method, status).inc()
+        self.turn_latency.labels(method).observe(span.duration_s)
+        with self._steps_lock:
+            steps = self._steps.pop(span.span_id, 0)
+        self.steps_per_turn.observe(steps)
+
+    def _on_step(self, span: Span, status: str) -> None:
+        if span.parent_span_id is None:
+            return
+        with self._steps_lock:
+            self._steps[span.parent_span_id] = self._steps.get(span.parent_span_id, 0) + 1
+
+    def _on_llm_call(self, span: Span, status: str) -> None:
+        attributes = span.attributes
+        self.llm_latency.labels(str(bool(attributes.get("llm.streaming"))).lower()).observe(span.duration_s)
+        self.llm_tokens.labels("input").inc(attributes.get("llm.input_tokens", 0))
+        self.llm_tokens.labels("output").inc(attributes.get("llm.output_tokens", 0))
+        if span.parent_span_id and "llm.streaming" in attributes:
+            # astream_chat has no agent.step span; count its LLM calls as steps of the turn
+            self._on_step(span, status)
+
+    def _on_tool_call(self, span: Span, status: str) -> None:
+        tool = span.attributes.get("tool.name", "unknown")
+        self.tool_calls.labels(tool, status).inc()
+        self.tool_latency.labels(tool).observe(span.duration_s)
+        if "answer_cache.hit" in span.attributes:
+            self.answer_cache.labels("hit" if span.attributes["answer_cache.hit"] else "miss").inc()
+
+    def _on_rag_chain(self, span: Span, status: str) -> None:
+        self.rag_latency.observe(span.duration_s)
+
+    def _on_embedding(self, span: Span, status: str) -> None:
+        kind = "query" if span.name == "embedding.query" else "documents"
+        if kind == "query":
+            cache = "hit" if span.attributes.get("embedding.cache_hit") else "miss"
+        else:
+            cache = "miss" if span.attributes.get("embedding.cache_misses") else "hit"
+        self.embedding_latency.labels(kind, cache).observe(span.duration_s)
+
+    def _on_search(self, span: Span, status: str) -> None:
+        search_type = span.attributes.get("search.type", "unknown")
+        self.search_requests.labels(search_type, status).inc()
+        self.search_latency.labels(search_type).observe(span.duration_s)
+
+    _handlers = {
+        "agent.turn": _on_turn,
+        "agent.step": _on_step,
+        "llm.call": _on_llm_call,
+        "tool.call": _on_tool_call,
+        "rag.chain": _on_rag_chain,
+        "embedding.query": _on_embedding,
+        "embedding.documents": _on_embedding,
+        "opensearch.search": _on_search,
+    }
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request count, latency and in-flight requests.
+
+    Requests are labelled with the matched route template (or the mount path,
+    e.g. /chainlit), never the raw URL, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app: Any, metrics: FinPalMetrics, skip_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.metrics = metrics
+        self.skip_paths = skip_paths
+
+    @staticmethod
+    def _route(scope: Dict[str, Any]) -> str:
+        # The router stores the matched Route/Mount in the scope once it has dispatched
+        return getattr(scope.get("route"), "path", None) or "unmatched"
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        self.metrics.http_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.http_in_progress.dec()
+            route = self._route(scope)
+            self.metrics.http_latency.labels(scope["method"], route).observe(time.perf_counter() - start)
+            self.metrics.http_requests.labels(scope["method"], route, str(status["code"])).inc()
+
+
+_metrics: Optional[FinPalMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> FinPalMetrics:
+    """Process-wide FinPalMetrics, created and subscribed to spans on first use."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = FinPalMetrics()
+            _metrics.install()
+        return _metrics
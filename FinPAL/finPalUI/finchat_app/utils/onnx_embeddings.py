@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import inspect
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+IMPORT_ONNXRUNTIME_ERROR = (
+    "Could not import onnxruntime. Please install it with `pip install onnxruntime`."
+)
+IMPORT_EXPORT_DEPS_ERROR = (
+    "Exporting to ONNX needs torch and transformers. "
+    "Please install them with `pip install sentence-transformers`."
+)
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+
+def _model_dir(model_name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+def export_onnx_model(
+    model_name: str = DEFAULT_MODEL_NAME,
+    cache_dir: str = "onnx_models",
+    quantize: bool = True,
+    opset: int = 14,
+) -> str:
+    """Export a sentence-transformers model to ONNX and return the model path.
+
+    The transformer is exported with dynamic batch and sequence axes. With
+    `quantize=True` the weights are additionally quantized to int8 with
+    onnxruntime's dynamic quantization. Already exported files are reused.
+    """
+    output_dir = _model_dir(model_name, cache_dir)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+    except ImportError:
+        raise ImportError(IMPORT_EXPORT_DEPS_ERROR)
+
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        tokenizer.save_pretrained(output_dir)
+        sample = tokenizer(["FinPal export sample"], return_tensors="pt")
+        export_kwargs: Dict[str, Any] = dict(
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            # Newer torch defaults to the dynamo exporter, which needs onnxscript
+            export_kwargs["dynamo"] = False
+
+        class _Encoder(torch.nn.Module):
+            """Pins the traced signature to (input_ids, attention_mask) -> last_hidden_state."""
+
+            def __init__(self, transformer: Any):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, input_ids: Any, attention_mask: Any) -> Any:
+                return self.transformer(
+                    input_ids=input_ids, attention_mask=attention_mask
+                ).last_hidden_state
+
+        with torch.no_grad():
+            torch.onnx.export(
+                _Encoder(model),
+                (sample["input_ids"], sample["attention_mask"]),
+                fp32_path,
+                **export_kwargs,
+            )
+
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError(IMPORT_ONNXRUNTIME_ERROR)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return target
+
+
+class OnnxEmbeddings(Embeddings):
+    """CPU embeddings from an ONNX (optionally int8-quantized) export of a
+    sentence-transformers model, run with onnxruntime.
+
+    Produces the same vectors as `HuggingFaceEmbeddings` for the same model
+    (mean pooling over the attention mask, then L2 normalization, as
+    all-mpnet-base-v2 does), up to quantization error; use `check_parity` to
+    measure it. torch is only needed for the one-off export.
+
+    Example:
+        .. code-block:: python
+
+            embeddings = OnnxEmbeddings("sentence-transformers/all-mpnet-base-v2")
+            vector = embeddings.embed_query("what is inflation?")
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache_dir: str = "onnx_models",
+        quantize: bool = True,
+        max_length: int = 384,
+        batch_size: int = 32,
+        normalize: bool = True,
+        intra_op_num_threads: Optional[int] = None,
+    ):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(IMPORT_ONNXRUNTIME_ERROR)
+        try:
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ImportError(IMPORT_EXPORT_DEPS_ERROR)
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.model_path = export_onnx_model(model_name, cache_dir, quantize=quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(self.model_path))
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if intra_op_num_threads:
+            options.intra_op_num_threads = intra_op_num_threads
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: encoded[name].astype(np.int64)
+            for name in self._input_names
+            if name in encoded
+        }
+        token_embeddings = self.session.run(["last_hidden_state"], feeds)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(
+            mask.sum(axis=1), 1e-9, None
+        )
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = [
+            self._embed_batch(texts[i : i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def check_parity(
+    reference: Embeddings, candidate: Embeddings, texts: List[str]
+) -> Dict[str, Any]:
+    """Compare two embedding backends on the same texts.
+
+    Returns the mean and minimum cosine similarity between the reference and
+    candidate vectors, plus the per-text values.
+    """
+    expected = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    actual = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    actual /= np.linalg.norm(actual, axis=1, keepdims=True)
+    cosines = (expected * actual).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "per_text": [float(c) for c in cosines],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Export the embedding model to ONNX/int8 and report parity with PyTorch."
+    )
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--cache-dir", default="onnx_models")
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    sample_texts = [
+        "What is inflation and why is it important for my investments?",
+        "What's the difference between a mutual fund and an ETF?",
+        "Can you explain what a bond is?",
+        "What is compounding?",
+        "How can I start building an emergency fund?",
+        "What are the benefits of diversifying my investment portfolio?",
+    ]
+    torch_backend = HuggingFaceEmbeddings(model_name=args.model)
+    onnx_backend = OnnxEmbeddings(
+        args.model, cache_dir=args.cache_dir, quantize=not args.no_quantize
+    )
+    report = check_parity(torch_backend, onnx_backend, sample_texts)
+    for name, backend in (("pytorch", torch_backend), ("onnx", onnx_backend)):
+        start = time.perf_counter()
+        for text in sample_texts * 5:
+            backend.embed_query(text)
+        report[f"{name}_ms_per_query"] = (
+            (time.perf_counter() - start) * 1000 / (len(sample_texts) * 5)
+        )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import copy
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+IMPORT_OPENSEARCH_PY_ERROR = (
+    "Could not import OpenSearch. Please install it with `pip install opensearch-py`."
+)
+IMPORT_BOTO3_ERROR = "Could not import boto3. Please install it with `pip install boto3`."
+
+DEFAULT_POOL_SIZE = 32
+
+
+class OpenSearchClientFactory:
+    """Builds the sync and async OpenSearch clients from one set of connection settings.
+
+    - Pooled keep-alive connections: up to `pool_size` per host (requests'
+      HTTPAdapter for the sync client, the aiohttp connector for the async
+      one), so concurrent sessions reuse TLS connections instead of opening
+      new ones.
+    - gzip-compressed request bodies (`http_compress`). k-NN query vectors
+      and bulk bodies shrink several times. Bodies are compressed before
+      they are signed.
+    - SigV4 signing with refreshable botocore credentials. Every request is
+      signed with the current keys, so STS/instance-role rotation does not
+      break a long-running process.
+    - A local stand-in: an `http://` host (e.g. a local OpenSearch container,
+      `docker run -p 9200:9200 -e DISABLE_SECURITY_PLUGIN=true
+      opensearchproject/opensearch`, or the in-process fake server in
+      tests/fake_opensearch.py) gets plain, unsigned HTTP clients with the
+      same pool settings, for tests and development without AWS. Pass
+      `sign_requests=True` to sign them anyway, e.g. to check signing
+      against the fake server.
+
+    Example:
+        .. code-block:: python
+
+            factory = OpenSearchClientFactory.from_env()
+            client = factory.sync_client()
+            async_client = factory.async_client()
+    """
+
+    def __init__(
+        self,
+        host: str,
+        region: str = "ap-south-1",
+        service: str = "es",
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        retry_on_timeout: bool = True,
+        http_compress: bool = True,
+        credentials: Optional[Any] = None,
+        verify_certs: bool = True,
+        sign_requests: Optional[bool] = None,
+    ):
+        if not host:
+            raise ValueError("An OpenSearch host must be provided.")
+        url = urlparse(host if "://" in host else f"https://{host}")
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port or (443 if self.scheme == "https" else 9200)
+        self.region = region
+        self.service = service
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_on_timeout = retry_on_timeout
+        self.http_compress = http_compress
+        self.verify_certs = verify_certs
+        # Default: sign everything except plain-HTTP (local) endpoints
+        self.sign_requests = not self.is_local if sign_requests is None else sign_requests
+        self._credentials = credentials
+
+    @classmethod
+    def from_env(cls) -> OpenSearchClientFactory:
+        """Factory configured from OPENSEARCH_HOST, AWS_REGION and FINPAL_OPENSEARCH_* variables."""
+        host = os.getenv("OPENSEARCH_HOST")
+        if not host:
+            raise ValueError("OPENSEARCH_HOST environment variable not set.")
+        return cls(
+            host,
+            region=os.getenv("AWS_REGION", "ap-south-1"),
+            pool_size=int(os.getenv("FINPAL_OPENSEARCH_POOL_SIZE", str(DEFAULT_POOL_SIZE))),
+            timeout=float(os.getenv("FINPAL_OPENSEARCH_TIMEOUT_S", "10")),
+            max_retries=int(os.getenv("FINPAL_OPENSEARCH_MAX_RETRIES", "2")),
+            http_compress=os.getenv("FINPAL_OPENSEARCH_COMPRESS", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def under_deadline(self, deadline: Optional[float]) -> OpenSearchClientFactory:
+        """Copy for clients whose requests a caller-side ResiliencePolicy
+        (utils.resilience) already retries, hedges and times out: no transport
+        retries, which would multiply requests outside the policy's retry
+        budget, and a timeout no longer than the policy's `deadline`, so an
+        abandoned request does not outlive it."""
+        factory = copy.copy(self)
+        factory.max_retries = 0
+        factory.retry_on_timeout = False
+        if deadline is not None:
+            factory.timeout = min(self.timeout, deadline)
+        return factory
+
+    @property
+    def is_local(self) -> bool:
+        """Plain HTTP endpoint: no TLS and no request signing."""
+        return self.scheme == "http"
+
+    @property
+    def credentials(self) -> Any:
+        """Refreshable AWS credentials from the default boto3 chain (resolved once)."""
+        if self._credentials is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImportError(IMPORT_BOTO3_ERROR)
+            # Not frozen: the signers call get_frozen_credentials() per request,
+            # which refreshes them shortly before they expire
+            credentials = boto3.Session().get_credentials()
+            if credentials is None:
+                raise ValueError(
+                    "AWS credentials not found. Please set them in your .env file or environment."
+                )
+            self._credentials = credentials
+        return self._credentials
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "hosts": [{"host": self.host, "port": self.port}],
+            "use_ssl": not self.is_local,
+            "verify_certs": self.verify_certs and not self.is_local,
+            "http_compress": self.http_compress,
+            "timeout": self.timeout,
+            "max_retries": self.max_retries,
+            "retry_on_timeout": self.retry_on_timeout,
+        }
+
+    def sync_client(self) -> Any:
+        try:
+            from opensearchpy import AWSV4SignerAuth, OpenSearch, RequestsHttpConnection
+        except ImportError:
+            raise ImportError(IMPORT_OPENSEARCH_PY_ERROR)
+        kwargs = self._client_kwargs()
+        if self.sign_requests:
+            kwargs["http_auth"] = AWSV4SignerAuth(self.credentials, self.region, self.service)
+        return OpenSearch(
+            connection_class=RequestsHttpConnection,
+            pool_maxsize=self.pool_size,
+            **kwargs,
+        )
+
+    def async_client(self) -> Any:
+        try:
+            from opensearchpy import AsyncHttpConnection, AsyncOpenSearch, AWSV4SignerAsyncAuth
+        except ImportError:
+            raise ImportError(IMPORT_OPENSEARCH_PY_ERROR)
+        kwargs = self._client_kwargs()
+        if self.sign_requests:
+            kwargs["http_auth"] = AWSV4SignerAsyncAuth(self.credentials, self.region, self.service)
+        return AsyncOpenSearch(
+            connection_class=AsyncHttpConnection,
+            maxsize=self.pool_size,
+            **kwargs,
+        )
@@ -1,8 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
 import uuid
 import warnings
-from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import numpy as np
 from langchain_core.documents import Document
@@ -10,7 +30,15 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.utils import get_from_dict_or_env
 from langchain_core.vectorstores import VectorStore
 
-from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from utils.tracing import payload_size, tracer
+from utils.vector_codecs import (
+    PQ_FIELD,
+    VECTOR_DATA_TYPES,
+    ProductQuantizer,
+    decode_vectors,
+    encode_vectors,
+    fit_byte_scale,
+)
 
 IMPORT_OPENSEARCH_PY_ERROR = (
     "Could not import OpenSearch. Please install it with `pip install opensearch-py`."
@@ -23,6 +51,17 @@ SCRIPT_SCORING_SEARCH = "script_scoring"
 PAINLESS_SCRIPTING_SEARCH = "painless_scripting"
 MATCH_ALL_QUERY = {"match_all": {}}  # type: Dict
 HYBRID_SEARCH = "hybrid_search"
+# Reciprocal-rank fusion constant: a hit ranked r contributes 1 / (RRF_RANK_CONSTANT + r)
+RRF_RANK_CONSTANT = 60
+# Generation counter of an index (see OpenSearchVectorSearch.bump_index_generation)
+GENERATION_DOC_ID = "generation"
+GENERATION_INCREMENT = {
+    "script": {"source": "ctx._source.value += 1", "lang": "painless"},
+    "upsert": {"value": 1},
+}
+GENERATION_RETRY_ON_CONFLICT = 10
+# Index settings while a bulk_load() runs: no periodic refreshes, no replica writes
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
 
 if TYPE_CHECKING:
     from opensearchpy import AsyncOpenSearch, OpenSearch
@@ -64,11 +103,8 @@ def _validate_embeddings_and_bulk_size(embeddings_length: int, bulk_size: int) -
     """Validate Embeddings Length and Bulk Size."""
     if embeddings_length == 0:
         raise RuntimeError("Embeddings size is zero")
-    if bulk_size < embeddings_length:
-        raise RuntimeError(
-            f"The embeddings count, {embeddings_length} is more than the "
-            f"[bulk_size], {bulk_size}. Increase the value of [bulk_size]."
-        )
+    if bulk_size < 1:
+        raise ValueError(f"[bulk_size] must be at least 1, got {bulk_size}.")
 
 
 def _validate_aoss_with_engines(is_aoss: bool, engine: str) -> None:
@@ -80,6 +116,18 @@ def _validate_aoss_with_engines(is_aoss: bool, engine: str) -> None:
         )
 
 
+def _validate_vector_data_type(engine: str, data_type: str) -> None:
+    """Validate the knn_vector encoding against the engine."""
+    if data_type not in VECTOR_DATA_TYPES:
+        raise ValueError(
+            f"vector_data_type must be one of {VECTOR_DATA_TYPES}, got {data_type!r}"
+        )
+    if data_type == "byte" and engine not in ("lucene", "faiss"):
+        raise ValueError("`byte` vectors need the `lucene` or `faiss` engine")
+    if data_type == "fp16" and engine != "faiss":
+        raise ValueError("`fp16` vectors need the `faiss` engine")
+
+
 def _is_aoss_enabled(http_auth: Any) -> bool:
     """Check if the service is http_auth is set as `aoss`."""
     if (
@@ -91,6 +139,68 @@ def _is_aoss_enabled(http_auth: Any) -> bool:
     return False
 
 
+# Metadata describing where a chunk sits in its source. It is left out of
+# content-hash ids, so inserting text near the start of a file does not change
+# the ids (and force re-embedding) of every chunk after it. The stored values
+# are those of the write that created the document and can go stale when an
+# unchanged chunk moves.
+POSITION_METADATA_KEYS = ("chunk", "start_index")
+
+
+def _content_hash_id(text: str, metadata: Optional[dict] = None) -> str:
+    """Deterministic document id derived from the text and its metadata
+    (except POSITION_METADATA_KEYS).
+
+    Re-ingesting the same chunk overwrites the existing document instead of
+    adding a duplicate, and unchanged chunks can be recognised without
+    re-embedding them. Every write path (add_texts, ingest.py, the local
+    store) uses this function, so they agree on a chunk's id.
+    """
+    identity = {
+        key: value
+        for key, value in (metadata or {}).items()
+        if key not in POSITION_METADATA_KEYS
+    }
+    payload = json.dumps(
+        {"text": text, "metadata": identity}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _bulk_requests(
+    index_name: str,
+    embeddings: List[List[float]],
+    texts: Iterable[str],
+    metadatas: Optional[List[dict]],
+    ids: Optional[List[str]],
+    vector_field: str,
+    text_field: str,
+    is_aoss: bool,
+    extra_fields: Optional[List[dict]] = None,
+) -> Tuple[List[dict], List[str]]:
+    """Bulk `index` actions for the given texts and their ids."""
+    requests = []
+    return_ids = []
+    for i, text in enumerate(texts):
+        metadata = metadatas[i] if metadatas else {}
+        _id = ids[i] if ids else _content_hash_id(text, metadata)
+        request = {
+            "_op_type": "index",
+            "_index": index_name,
+            vector_field: embeddings[i],
+            text_field: text,
+            "metadata": metadata,
+            **(extra_fields[i] if extra_fields else {}),
+        }
+        if is_aoss:
+            request["id"] = _id
+        else:
+            request["_id"] = _id
+        requests.append(request)
+        return_ids.append(_id)
+    return requests, return_ids
+
+
 def _bulk_ingest_embeddings(
     client: OpenSearch,
     index_name: str,
@@ -103,43 +213,81 @@ def _bulk_ingest_embeddings(
     mapping: Optional[Dict] = None,
     max_chunk_bytes: Optional[int] = 1 * 1024 * 1024,
     is_aoss: bool = False,
+    bulk_size: int = 500,
+    refresh: bool = True,
+    ensure_index: bool = True,
+    thread_count: int = 1,
+    max_retries: int = 3,
+    initial_backoff: float = 2,
+    max_backoff: float = 60,
+    extra_fields: Optional[List[dict]] = None,
 ) -> List[str]:
-    """Bulk Ingest Embeddings into given index."""
+    """Bulk Ingest Embeddings into given index.
+
+    The actions are sent as `_bulk` requests of at most `bulk_size` documents
+    and `max_chunk_bytes` bytes, `thread_count` requests at a time. A request
+    rejected with 429 is retried up to `max_retries` times with exponential
+    backoff. `ensure_index=False` skips the index existence probe and
+    `refresh=False` leaves refreshing to the caller (see
+    `OpenSearchVectorSearch.bulk_load`). `extra_fields` holds additional
+    per-document source fields (e.g. product-quantized codes).
+    """
     if not mapping:
         mapping = dict()
     try:
         from opensearchpy.exceptions import NotFoundError
-        from opensearchpy.helpers import bulk
+        from opensearchpy.helpers import BulkIndexError, streaming_bulk
     except ImportError:
         raise ImportError(IMPORT_OPENSEARCH_PY_ERROR)
 
-    requests = []
-    return_ids = []
-    mapping = mapping
+    if ensure_index:
+        try:
+            client.indices.get(index=index_name)
+        except NotFoundError:
+            client.indices.create(index=index_name, body=mapping)
+
+    requests, return_ids = _bulk_requests(
+        index_name,
+        embeddings,
+        texts,
+        metadatas,
+        ids,
+        vector_field,
+        text_field,
+        is_aoss,
+        extra_fields=extra_fields,
+    )
 
-    try:
-        client.indices.get(index=index_name)
-    except NotFoundError:
-        client.indices.create(index=index_name, body=mapping)
+    def send(chunk: List[dict]) -> None:
+        # raise_on_error=False: with it on, the helper raises on a 429 item
+        # before retrying it, so errors are collected and raised here instead
+        errors = [
+            info
+            for ok, info in streaming_bulk(
+                client,
+                chunk,
+                chunk_size=bulk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                raise_on_error=False,
+                max_retries=max_retries,
+                initial_backoff=initial_backoff,
+                max_backoff=max_backoff,
+                yield_ok=False,
+            )
+        ]
+        if errors:
+            raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
 
-    for i, text in enumerate(texts):
-        metadata = metadatas[i] if metadatas else {}
-        _id = ids[i] if ids else str(uuid.uuid4())
-        request = {
-            "_op_type": "index",
-            "_index": index_name,
-            vector_field: embeddings[i],
-            text_field: text,
-            "metadata": metadata,
-        }
-        if is_aoss:
-            request["id"] = _id
-        else:
-            request["_id"] = _id
-        requests.append(request)
-        return_ids.append(_id)
-    bulk(client, requests, max_chunk_bytes=max_chunk_bytes)
-    if not is_aoss:
+    chunks = [requests[i : i + bulk_size] for i in range(0, len(requests), bulk_size)]
+    if thread_count > 1 and len(chunks) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(thread_count, len(chunks))) as pool:
+            list(pool.map(send, chunks))
+    else:
+        for chunk in chunks:
+            send(chunk)
+    if refresh and not is_aoss:
         client.indices.refresh(index=index_name)
     return return_ids
 
@@ -156,44 +304,71 @@ async def _abulk_ingest_embeddings(
     mapping: Optional[Dict] = None,
     max_chunk_bytes: Optional[int] = 1 * 1024 * 1024,
     is_aoss: bool = False,
+    bulk_size: int = 500,
+    refresh: bool = True,
+    ensure_index: bool = True,
+    thread_count: int = 1,
+    max_retries: int = 3,
+    initial_backoff: float = 2,
+    max_backoff: float = 60,
+    extra_fields: Optional[List[dict]] = None,
 ) -> List[str]:
-    """Bulk Ingest Embeddings into given index asynchronously using AsyncOpenSearch."""
+    """Bulk Ingest Embeddings into given index asynchronously using AsyncOpenSearch.
+
+    Same options as `_bulk_ingest_embeddings`; `thread_count` bounds the
+    number of `_bulk` requests in flight.
+    """
     if not mapping:
         mapping = dict()
 
     try:
         from opensearchpy.exceptions import NotFoundError
-        from opensearchpy.helpers import async_bulk
+        from opensearchpy.helpers import BulkIndexError, async_streaming_bulk
     except ImportError:
         raise ImportError(IMPORT_ASYNC_OPENSEARCH_PY_ERROR)
 
-    requests = []
-    return_ids = []
-
-    try:
-        await client.indices.get(index=index_name)
-    except NotFoundError:
-        await client.indices.create(index=index_name, body=mapping)
-
-    for i, text in enumerate(texts):
-        metadata = metadatas[i] if metadatas else {}
-        _id = ids[i] if ids else str(uuid.uuid4())
-        request = {
-            "_op_type": "index",
-            "_index": index_name,
-            vector_field: embeddings[i],
-            text_field: text,
-            "metadata": metadata,
-        }
-        if is_aoss:
-            request["id"] = _id
-        else:
-            request["_id"] = _id
-        requests.append(request)
-        return_ids.append(_id)
+    if ensure_index:
+        try:
+            await client.indices.get(index=index_name)
+        except NotFoundError:
+            await client.indices.create(index=index_name, body=mapping)
+
+    requests, return_ids = _bulk_requests(
+        index_name,
+        embeddings,
+        texts,
+        metadatas,
+        ids,
+        vector_field,
+        text_field,
+        is_aoss,
+        extra_fields=extra_fields,
+    )
+    in_flight = asyncio.Semaphore(max(1, thread_count))
+
+    async def send(chunk: List[dict]) -> None:
+        async with in_flight:
+            errors = [
+                info
+                async for ok, info in async_streaming_bulk(
+                    client,
+                    chunk,
+                    chunk_size=bulk_size,
+                    max_chunk_bytes=max_chunk_bytes,
+                    raise_on_error=False,
+                    max_retries=max_retries,
+                    initial_backoff=initial_backoff,
+                    max_backoff=max_backoff,
+                    yield_ok=False,
+                )
+            ]
+        if errors:
+            raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
 
-    await async_bulk(client, requests, max_chunk_bytes=max_chunk_bytes)
-    if not is_aoss:
+    await asyncio.gather(
+        *(send(requests[i : i + bulk_size]) for i in range(0, len(requests), bulk_size))
+    )
+    if refresh and not is_aoss:
         await client.indices.refresh(index=index_name)
 
     return return_ids
@@ -213,6 +388,44 @@ def _default_scripting_text_mapping(
     }
 
 
+def _maximal_marginal_relevance(
+    query_embedding: Any,
+    embeddings: Any,
+    lambda_mult: float = 0.5,
+    k: int = 4,
+) -> List[int]:
+    """Greedy MMR selection over a (n, dim) matrix, vectorized with NumPy.
+
+    Selects the same documents as langchain's `maximal_marginal_relevance`,
+    but the pairwise similarities are computed in one matrix product and each
+    step only folds the newly selected row into the running "max similarity
+    to the selection", instead of re-scoring every candidate in Python.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    k = min(k, len(matrix))
+    if k <= 0:
+        return []
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    unit = matrix / norms[:, None]
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    relevance = unit @ (query / (np.linalg.norm(query) or 1.0))
+    similarity = unit @ unit.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(unit), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
 def _default_text_mapping(
     dim: int,
     engine: str = "nmslib",
@@ -221,24 +434,40 @@ def _default_text_mapping(
     ef_construction: int = 512,
     m: int = 16,
     vector_field: str = "vector_field",
+    vector_encoding: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
-    """For Approximate k-NN Search, this is the default mapping to create index."""
+    """For Approximate k-NN Search, this is the default mapping to create index.
+
+    `vector_encoding` (see utils.vector_codecs) selects a compact knn_vector
+    type and is recorded in the mapping's `_meta`, so every reader of the
+    index encodes queries and decodes vectors the same way.
+    """
+    data_type = (vector_encoding or {}).get("data_type", "float")
+    _validate_vector_data_type(engine, data_type)
+    parameters: Dict[str, Any] = {"ef_construction": ef_construction, "m": m}
+    if data_type == "fp16":
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+    vector_mapping: Dict[str, Any] = {
+        "type": "knn_vector",
+        "dimension": dim,
+        "method": {
+            "name": "hnsw",
+            "space_type": space_type,
+            "engine": engine,
+            "parameters": parameters,
+        },
+    }
+    if data_type == "byte":
+        vector_mapping["data_type"] = "byte"
+    mappings: Dict[str, Any] = {"properties": {vector_field: vector_mapping}}
+    if vector_encoding:
+        mappings["_meta"] = {"vector_encoding": vector_encoding}
+        if vector_encoding.get("pq"):
+            # Not searchable; only read back from _source by the MMR re-rank
+            mappings["properties"][PQ_FIELD] = {"type": "binary"}
     return {
         "settings": {"index": {"knn": True, "knn.algo_param.ef_search": ef_search}},
-        "mappings": {
-            "properties": {
-                vector_field: {
-                    "type": "knn_vector",
-                    "dimension": dim,
-                    "method": {
-                        "name": "hnsw",
-                        "space_type": space_type,
-                        "engine": engine,
-                        "parameters": {"ef_construction": ef_construction, "m": m},
-                    },
-                }
-            }
-        },
+        "mappings": mappings,
     }
 
 
@@ -373,6 +602,22 @@ def _default_painless_scripting_query(
     }
 
 
+def _reciprocal_rank_fusion(
+    result_lists: List[List[dict]], k: int, rank_constant: int = RRF_RANK_CONSTANT
+) -> List[dict]:
+    """Fuse ranked hit lists: each hit scores the sum of 1 / (rank_constant + rank)
+    over the lists it appears in, ranks starting at 1. Returns the top `k`
+    hits with the fused score as `_score`."""
+    scores: Dict[str, float] = {}
+    hits: Dict[str, dict] = {}
+    for result in result_lists:
+        for rank, hit in enumerate(result, start=1):
+            scores[hit["_id"]] = scores.get(hit["_id"], 0.0) + 1.0 / (rank_constant + rank)
+            hits.setdefault(hit["_id"], hit)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+    return [{**hits[_id], "_score": scores[_id]} for _id in ranked]
+
+
 def _default_hybrid_search_query(
     query_text: str, query_vector: List[float], k: int = 4
 ) -> Dict:
@@ -453,6 +698,7 @@ class OpenSearchVectorSearch(VectorStore):
         index_name: str,
         embedding_function: Embeddings,
         opensearch_client=None,
+        async_opensearch_client=None,
         **kwargs: Any,
     ):
         """Initialize with necessary components."""
@@ -465,9 +711,87 @@ class OpenSearchVectorSearch(VectorStore):
         else:
             self.client = _get_opensearch_client(opensearch_url, **kwargs)
         #self.client = _get_opensearch_client(opensearch_url, **kwargs)
-        self.async_client = _get_async_opensearch_client(opensearch_url, **kwargs)
+        # Built on first use when not passed in, so sync-only callers never open
+        # an extra (and, from a bare URL, unauthenticated) connection pool
+        self._async_client = async_opensearch_client
+        self._async_client_args = (opensearch_url, kwargs)
+        # Clients for search reads (searches, the MMR vector _mget, generation
+        # checks). With a `search_policy`, pass clients built for its deadline
+        # (OpenSearchClientFactory.under_deadline) and keep the clients above for
+        # writes and admin calls (bulk loads, refreshes, settings, deletes),
+        # which may take far longer. Defaults to the clients above.
+        self.search_client = kwargs.get("search_client") or self.client
+        self._async_search_client = kwargs.get("async_search_client")
         self.engine = kwargs.get("engine", "nmslib")
         self.bulk_size = kwargs.get("bulk_size", 500)
+        # Bulk tuning: request size in bytes, concurrent _bulk requests and 429 retries
+        self.max_chunk_bytes = kwargs.get("max_chunk_bytes", 1 * 1024 * 1024)
+        self.bulk_threads = kwargs.get("bulk_threads", 1)
+        self.bulk_max_retries = kwargs.get("bulk_max_retries", 3)
+        # Indices known to exist, so adds do not probe the cluster every time
+        self._existing_indices: set = set()
+        # index name -> settings to restore when its bulk_load() ends
+        self._bulk_loads: Dict[str, Dict[str, Any]] = {}
+        # Encoding of indices this store creates: "float", "fp16" or "byte", plus an
+        # optional fitted ProductQuantizer whose codes back the MMR re-rank
+        self.vector_data_type = kwargs.get("vector_data_type", "float")
+        self.product_quantizer: Optional[ProductQuantizer] = kwargs.get(
+            "product_quantizer"
+        )
+        # index name -> vector encoding read from its mapping, and its quantizer
+        self._encodings: Dict[str, Dict[str, Any]] = {}
+        self._quantizers: Dict[str, Optional[ProductQuantizer]] = {}
+        # LRU of decoded document vectors, (index name, _id) -> float32 vector, so
+        # MMR only fetches the vectors of hits it has not seen before. Ids are
+        # content hashes, so an id keeps its vector until the document is deleted.
+        self.vector_cache_size = kwargs.get("vector_cache_size", 10000)
+        self._vector_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._vector_cache_lock = threading.Lock()
+        # LRU of raw search hits keyed by (index, generation, quantized embedding,
+        # k, search kwargs). Every write bumps the index generation, a counter
+        # document in the `<index>-generation` companion index. This store sees
+        # its own writes at once; writes by other processes (e.g. ingest.py) are
+        # only noticed at the next generation check, so for up to
+        # `generation_check_interval` seconds (5 by default) after such a write
+        # this store may still serve results from before it. 0 entries disables
+        # the cache. The counter document is read with the search client and
+        # under the search policy, so the search role needs read access to
+        # `<index>-generation` (GET `<index>-generation/_doc/generation`); when
+        # the read fails (403, brownout, open circuit), searches bypass the
+        # cache until the next check.
+        self.result_cache_size = kwargs.get("result_cache_size", 1024)
+        self.result_cache_ttl = kwargs.get("result_cache_ttl", 300.0)
+        self.generation_check_interval = kwargs.get("generation_check_interval", 5.0)
+        self._result_cache: "OrderedDict[tuple, Tuple[float, List[dict]]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        # index name -> (generation, monotonic time it was read); None when the
+        # read failed
+        self._generations: Dict[str, Tuple[Optional[str], float]] = {}
+        # Writes made by this store, so its own reads never wait for the next check
+        self._local_writes: Dict[str, int] = {}
+        self.result_cache_hits = 0
+        self.result_cache_misses = 0
+        # Optional utils.resilience.ResiliencePolicy (deadline, hedging, retries,
+        # circuit breaker) around the search requests behind the result cache
+        self.search_policy = kwargs.get("search_policy")
+
+    @property
+    def async_client(self) -> AsyncOpenSearch:
+        if self._async_client is None:
+            opensearch_url, kwargs = self._async_client_args
+            if opensearch_url is None:
+                raise ValueError(
+                    "async_opensearch_client or opensearch_url must be provided "
+                    "for the asynchronous methods."
+                )
+            self._async_client = _get_async_opensearch_client(opensearch_url, **kwargs)
+        return self._async_client
+
+    @property
+    def async_search_client(self) -> AsyncOpenSearch:
+        if self._async_search_client is None:
+            return self.async_client
+        return self._async_search_client
 
     @property
     def embeddings(self) -> Embeddings:
@@ -495,18 +819,30 @@ class OpenSearchVectorSearch(VectorStore):
         ef_construction = kwargs.get("ef_construction", 512)
         m = kwargs.get("m", 16)
         vector_field = kwargs.get("vector_field", "vector_field")
-        max_chunk_bytes = kwargs.get("max_chunk_bytes", 1 * 1024 * 1024)
+        max_chunk_bytes = kwargs.get("max_chunk_bytes", self.max_chunk_bytes)
 
         _validate_aoss_with_engines(self.is_aoss, engine)
 
+        encoding = self._write_encoding(index_name, embeddings)
         mapping = _default_text_mapping(
-            dim, engine, space_type, ef_search, ef_construction, m, vector_field
+            dim,
+            engine,
+            space_type,
+            ef_search,
+            ef_construction,
+            m,
+            vector_field,
+            vector_encoding=encoding,
+        )
+        self._ensure_index(index_name, mapping)
+        vectors, extra_fields = self._encode_documents(
+            embeddings, encoding, self._quantizer(index_name)
         )
 
-        return _bulk_ingest_embeddings(
+        ids = _bulk_ingest_embeddings(
             self.client,
             index_name,
-            embeddings,
+            vectors,
             texts,
             metadatas=metadatas,
             ids=ids,
@@ -515,7 +851,19 @@ class OpenSearchVectorSearch(VectorStore):
             mapping=mapping,
             max_chunk_bytes=max_chunk_bytes,
             is_aoss=self.is_aoss,
+            bulk_size=bulk_size,
+            # Inside bulk_load() the single refresh happens when the load ends
+            refresh=index_name not in self._bulk_loads,
+            ensure_index=False,
+            thread_count=kwargs.get("bulk_threads", self.bulk_threads),
+            max_retries=kwargs.get("bulk_max_retries", self.bulk_max_retries),
+            extra_fields=extra_fields,
         )
+        # Caller-chosen ids may be reused for new content
+        self._forget_vectors(index_name, ids)
+        if index_name not in self._bulk_loads:
+            self.bump_index_generation(index_name)
+        return ids
 
     async def __aadd(
         self,
@@ -539,18 +887,30 @@ class OpenSearchVectorSearch(VectorStore):
         ef_construction = kwargs.get("ef_construction", 512)
         m = kwargs.get("m", 16)
         vector_field = kwargs.get("vector_field", "vector_field")
-        max_chunk_bytes = kwargs.get("max_chunk_bytes", 1 * 1024 * 1024)
+        max_chunk_bytes = kwargs.get("max_chunk_bytes", self.max_chunk_bytes)
 
         _validate_aoss_with_engines(self.is_aoss, engine)
 
+        encoding = await self._awrite_encoding(index_name, embeddings)
         mapping = _default_text_mapping(
-            dim, engine, space_type, ef_search, ef_construction, m, vector_field
+            dim,
+            engine,
+            space_type,
+            ef_search,
+            ef_construction,
+            m,
+            vector_field,
+            vector_encoding=encoding,
+        )
+        await self._aensure_index(index_name, mapping)
+        vectors, extra_fields = self._encode_documents(
+            embeddings, encoding, await self._aquantizer(index_name)
         )
 
-        return await _abulk_ingest_embeddings(
+        ids = await _abulk_ingest_embeddings(
             self.async_client,
             index_name,
-            embeddings,
+            vectors,
             texts,
             metadatas=metadatas,
             ids=ids,
@@ -559,7 +919,19 @@ class OpenSearchVectorSearch(VectorStore):
             mapping=mapping,
             max_chunk_bytes=max_chunk_bytes,
             is_aoss=self.is_aoss,
+            bulk_size=bulk_size,
+            # Inside bulk_load() the single refresh happens when the load ends
+            refresh=index_name not in self._bulk_loads,
+            ensure_index=False,
+            thread_count=kwargs.get("bulk_threads", self.bulk_threads),
+            max_retries=kwargs.get("bulk_max_retries", self.bulk_max_retries),
+            extra_fields=extra_fields,
         )
+        # Caller-chosen ids may be reused for new content
+        self._forget_vectors(index_name, ids)
+        if index_name not in self._bulk_loads:
+            await self.abump_index_generation(index_name)
+        return ids
 
     def delete_index(self, index_name: Optional[str] = None) -> Optional[bool]:
         """Deletes a given index from vectorstore."""
@@ -569,10 +941,564 @@ class OpenSearchVectorSearch(VectorStore):
             index_name = self.index_name
         try:
             self.client.indices.delete(index=index_name)
+            self.client.indices.delete(
+                index=self._codecs_index(index_name), ignore_unavailable=True
+            )
+            self._existing_indices.discard(index_name)
+            self._encodings.pop(index_name, None)
+            self._quantizers.pop(index_name, None)
+            self._forget_vectors(index_name)
+            # The counter outlives the index, so a re-created index never
+            # repeats a generation other processes still have cached results for
+            self.bump_index_generation(index_name)
             return True
         except Exception as e:
             raise e
 
+    def _index_body(self, index_name: str, mapping: Dict) -> Dict:
+        """Mapping to create `index_name` with; bulk-load settings are applied
+        right away when the index is created during a bulk_load()."""
+        if index_name not in self._bulk_loads or self.is_aoss:
+            return mapping
+        # A new index has no previous settings; restore the cluster defaults afterwards
+        self._bulk_loads[index_name] = {"refresh_interval": None, "number_of_replicas": None}
+        settings = dict(mapping.get("settings", {}))
+        settings["index"] = {**settings.get("index", {}), **BULK_LOAD_SETTINGS}
+        return {**mapping, "settings": settings}
+
+    def _ensure_index(self, index_name: str, mapping: Dict) -> None:
+        """Create `index_name` unless it is known to exist."""
+        if index_name in self._existing_indices:
+            return
+        if not self.client.indices.exists(index=index_name):
+            self.client.indices.create(
+                index=index_name, body=self._index_body(index_name, mapping)
+            )
+        self._existing_indices.add(index_name)
+
+    async def _aensure_index(self, index_name: str, mapping: Dict) -> None:
+        """Asynchronously create `index_name` unless it is known to exist."""
+        if index_name in self._existing_indices:
+            return
+        if not await self.async_client.indices.exists(index=index_name):
+            await self.async_client.indices.create(
+                index=index_name, body=self._index_body(index_name, mapping)
+            )
+        self._existing_indices.add(index_name)
+
+    @staticmethod
+    def _generation_index(index_name: str) -> str:
+        """Companion index holding the generation counter of `index_name`."""
+        return f"{index_name}-generation"
+
+    @staticmethod
+    def _codecs_index(index_name: str) -> str:
+        """Companion index holding the product quantizer codebooks of `index_name`."""
+        return f"{index_name}-codecs"
+
+    def _new_encoding(self, index_name: str, embeddings: Any) -> Dict[str, Any]:
+        """Vector encoding for an index this store is about to create."""
+        encoding: Dict[str, Any] = {"data_type": self.vector_data_type}
+        if self.vector_data_type == "byte":
+            encoding["scale"] = fit_byte_scale(embeddings)
+        if self.product_quantizer is not None:
+            encoding["pq"] = {
+                "index": self._codecs_index(index_name),
+                "id": self.product_quantizer.fingerprint,
+                "m": self.product_quantizer.m,
+            }
+        return encoding
+
+    def _remember_encoding(self, index_name: str, response: Dict) -> Dict[str, Any]:
+        mappings = response.get(index_name, {}).get("mappings", {})
+        encoding = mappings.get("_meta", {}).get("vector_encoding") or {
+            "data_type": "float"
+        }
+        self._encodings[index_name] = encoding
+        return encoding
+
+    def _vector_encoding(self, index_name: str) -> Dict[str, Any]:
+        """Vector encoding of `index_name`, read from its mapping once per store."""
+        if index_name in self._encodings:
+            return self._encodings[index_name]
+        from opensearchpy.exceptions import NotFoundError
+
+        try:
+            response = self.client.indices.get_mapping(index=index_name)
+        except NotFoundError:
+            return {"data_type": "float"}
+        return self._remember_encoding(index_name, response)
+
+    async def _avector_encoding(self, index_name: str) -> Dict[str, Any]:
+        """Asynchronous counterpart of `_vector_encoding`."""
+        if index_name in self._encodings:
+            return self._encodings[index_name]
+        from opensearchpy.exceptions import NotFoundError
+
+        try:
+            response = await self.async_client.indices.get_mapping(index=index_name)
+        except NotFoundError:
+            return {"data_type": "float"}
+        return self._remember_encoding(index_name, response)
+
+    def _quantizer_for(
+        self, index_name: str, encoding: Dict[str, Any]
+    ) -> Tuple[Optional[ProductQuantizer], Optional[Dict]]:
+        """The cached quantizer of `index_name`, or the codebook document to fetch."""
+        pq = encoding.get("pq")
+        if not pq:
+            return None, None
+        if (
+            self.product_quantizer is not None
+            and self.product_quantizer.fingerprint == pq["id"]
+        ):
+            return self.product_quantizer, None
+        return None, pq
+
+    def _quantizer(self, index_name: str) -> Optional[ProductQuantizer]:
+        """Product quantizer of `index_name`, if it stores PQ codes."""
+        if index_name not in self._quantizers:
+            quantizer, pq = self._quantizer_for(
+                index_name, self._vector_encoding(index_name)
+            )
+            if pq is not None:
+                document = self.client.get(index=pq["index"], id=pq["id"])
+                quantizer = ProductQuantizer.from_dict(document["_source"])
+            self._quantizers[index_name] = quantizer
+        return self._quantizers[index_name]
+
+    async def _aquantizer(self, index_name: str) -> Optional[ProductQuantizer]:
+        """Asynchronous counterpart of `_quantizer`."""
+        if index_name not in self._quantizers:
+            quantizer, pq = self._quantizer_for(
+                index_name, await self._avector_encoding(index_name)
+            )
+            if pq is not None:
+                document = await self.async_client.get(index=pq["index"], id=pq["id"])
+                quantizer = ProductQuantizer.from_dict(document["_source"])
+            self._quantizers[index_name] = quantizer
+        return self._quantizers[index_name]
+
+    def _write_encoding(self, index_name: str, embeddings: Any) -> Dict[str, Any]:
+        """Encoding to write `embeddings` with: the index's own if it exists,
+        otherwise a new one (whose PQ codebook is stored right away)."""
+        if index_name in self._encodings:
+            return self._encodings[index_name]
+        if index_name in self._existing_indices or self.client.indices.exists(
+            index=index_name
+        ):
+            return self._vector_encoding(index_name)
+        encoding = self._new_encoding(index_name, embeddings)
+        if "pq" in encoding:
+            codecs_index = encoding["pq"]["index"]
+            if not self.client.indices.exists(index=codecs_index):
+                self.client.indices.create(
+                    index=codecs_index, body={"mappings": {"dynamic": False}}
+                )
+            self.client.index(
+                index=codecs_index,
+                id=encoding["pq"]["id"],
+                body=self.product_quantizer.to_dict(),
+                refresh=True,
+            )
+            self._quantizers[index_name] = self.product_quantizer
+        self._encodings[index_name] = encoding
+        return encoding
+
+    async def _awrite_encoding(self, index_name: str, embeddings: Any) -> Dict[str, Any]:
+        """Asynchronous counterpart of `_write_encoding`."""
+        if index_name in self._encodings:
+            return self._encodings[index_name]
+        if index_name in self._existing_indices or await self.async_client.indices.exists(
+            index=index_name
+        ):
+            return await self._avector_encoding(index_name)
+        encoding = self._new_encoding(index_name, embeddings)
+        if "pq" in encoding:
+            codecs_index = encoding["pq"]["index"]
+            if not await self.async_client.indices.exists(index=codecs_index):
+                await self.async_client.indices.create(
+                    index=codecs_index, body={"mappings": {"dynamic": False}}
+                )
+            await self.async_client.index(
+                index=codecs_index,
+                id=encoding["pq"]["id"],
+                body=self.product_quantizer.to_dict(),
+                refresh=True,
+            )
+            self._quantizers[index_name] = self.product_quantizer
+        self._encodings[index_name] = encoding
+        return encoding
+
+    @staticmethod
+    def _encode_documents(
+        embeddings: Any,
+        encoding: Dict[str, Any],
+        quantizer: Optional[ProductQuantizer],
+    ) -> Tuple[List[list], Optional[List[dict]]]:
+        """Vectors in the index encoding, plus the PQ code field of each document."""
+        vectors = encode_vectors(embeddings, encoding)
+        if quantizer is None:
+            return vectors, None
+        return vectors, [{PQ_FIELD: code} for code in quantizer.encode_base64(embeddings)]
+
+    @staticmethod
+    def _generation_from_document(response: Dict) -> str:
+        return str(response.get("_source", {}).get("value", 0))
+
+    def _cached_generation(
+        self, index_name: str
+    ) -> Optional[Tuple[Optional[str], float]]:
+        """The last generation check of `index_name`, if it is recent enough."""
+        entry = self._generations.get(index_name)
+        if entry is None or time.monotonic() - entry[1] >= self.generation_check_interval:
+            return None
+        return entry
+
+    def _remember_generation(
+        self, index_name: str, value: Optional[str], checked_at: float
+    ) -> Optional[Tuple[str, int]]:
+        self._generations[index_name] = (value, checked_at)
+        if value is None:
+            return None
+        return value, self._local_writes.get(index_name, 0)
+
+    def _read_generation(self, index_name: str) -> str:
+        from opensearchpy.exceptions import NotFoundError
+
+        try:
+            response = self.search_client.get(
+                index=self._generation_index(index_name), id=GENERATION_DOC_ID
+            )
+        except NotFoundError:
+            return "0"
+        return self._generation_from_document(response)
+
+    async def _aread_generation(self, index_name: str) -> str:
+        from opensearchpy.exceptions import NotFoundError
+
+        try:
+            response = await self.async_search_client.get(
+                index=self._generation_index(index_name), id=GENERATION_DOC_ID
+            )
+        except NotFoundError:
+            return "0"
+        return self._generation_from_document(response)
+
+    @staticmethod
+    def _generation_read_failed(error: Exception) -> None:
+        # Searches bypass the result cache until the next check instead of
+        # every one of them paying for another failed read
+        tracer.current_span().set_attribute(
+            "opensearch.generation_error", type(error).__name__
+        )
+
+    def _index_generation(self, index_name: str) -> Optional[Tuple[str, int]]:
+        """Current generation of `index_name`, re-read from its counter document
+        (a realtime get, under the search policy) at most every
+        `generation_check_interval` seconds. Between checks, writes made by
+        other processes go unnoticed. None when the last read failed: the
+        result cache is bypassed until the next check."""
+        entry = self._cached_generation(index_name)
+        if entry is not None:
+            return self._remember_generation(index_name, *entry)
+        try:
+            value: Optional[str] = self._guarded(self._read_generation, index_name)
+        except Exception as error:
+            self._generation_read_failed(error)
+            value = None
+        return self._remember_generation(index_name, value, time.monotonic())
+
+    async def _aindex_generation(self, index_name: str) -> Optional[Tuple[str, int]]:
+        """Asynchronous counterpart of `_index_generation`."""
+        entry = self._cached_generation(index_name)
+        if entry is not None:
+            return self._remember_generation(index_name, *entry)
+        try:
+            value: Optional[str] = await self._aguarded(
+                self._aread_generation, index_name
+            )
+        except Exception as error:
+            self._generation_read_failed(error)
+            value = None
+        return self._remember_generation(index_name, value, time.monotonic())
+
+    def index_generation(self, index_name: Optional[str] = None) -> Optional[str]:
+        """Generation of `index_name`; it changes with every write to the index,
+        so caches built from search results (e.g. an answer cache) can tag
+        their entries with it. Checked at most every
+        `generation_check_interval` seconds; None when it cannot be read."""
+        generation = self._index_generation(index_name or self.index_name)
+        return None if generation is None else generation[0]
+
+    async def aindex_generation(self, index_name: Optional[str] = None) -> Optional[str]:
+        """Asynchronous counterpart of `index_generation`."""
+        generation = await self._aindex_generation(index_name or self.index_name)
+        return None if generation is None else generation[0]
+
+    def _note_write(self, index_name: str) -> None:
+        """Invalidate this store's cached results of `index_name`."""
+        with self._result_cache_lock:
+            self._local_writes[index_name] = self._local_writes.get(index_name, 0) + 1
+            for key in [key for key in self._result_cache if key[0] == index_name]:
+                del self._result_cache[key]
+        self._generations.pop(index_name, None)
+
+    def bump_index_generation(self, index_name: Optional[str] = None) -> None:
+        """Mark `index_name` as changed, so cached search results are dropped
+        here at once and by other processes at their next generation check,
+        i.e. other processes may keep serving results from before the write
+        for up to their `generation_check_interval` (5 seconds by default).
+
+        The generation is a counter document incremented with a scripted
+        `_update`: one document write, atomic under concurrent writers, and no
+        cluster-state (mapping) update. Called once per write call or
+        bulk_load() by the write methods of this class; callers that write to
+        the index by other means (e.g. helpers.bulk) should call it afterwards.
+        """
+        index_name = index_name or self.index_name
+        self._note_write(index_name)
+        if self.is_aoss:
+            return
+        self.client.update(
+            index=self._generation_index(index_name),
+            id=GENERATION_DOC_ID,
+            body=GENERATION_INCREMENT,
+            retry_on_conflict=GENERATION_RETRY_ON_CONFLICT,
+        )
+
+    async def abump_index_generation(self, index_name: Optional[str] = None) -> None:
+        """Asynchronous counterpart of `bump_index_generation`."""
+        index_name = index_name or self.index_name
+        self._note_write(index_name)
+        if self.is_aoss:
+            return
+        await self.async_client.update(
+            index=self._generation_index(index_name),
+            id=GENERATION_DOC_ID,
+            body=GENERATION_INCREMENT,
+            retry_on_conflict=GENERATION_RETRY_ON_CONFLICT,
+        )
+
+    def _result_cache_key(
+        self,
+        generation: Tuple[str, int],
+        embedding: List[float],
+        k: int,
+        score_threshold: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> tuple:
+        # float16 rounding lets near-identical embeddings (e.g. the same query
+        # embedded in another batch) share an entry
+        quantized = np.asarray(embedding, dtype=np.float16).tobytes()
+        if kwargs.get("search_type") != HYBRID_SEARCH:
+            # similarity_search always passes the query text along, but only the
+            # lexical half of a hybrid search uses it; keying on it would keep
+            # differently worded queries with the same embedding apart
+            kwargs = {name: value for name, value in kwargs.items() if name != "query_text"}
+        return (
+            kwargs.get("index_name", self.index_name),
+            generation,
+            hashlib.sha1(quantized).hexdigest(),
+            k,
+            score_threshold,
+            json.dumps(kwargs, sort_keys=True, default=str),
+        )
+
+    def _get_cached_result(self, key: tuple) -> Optional[List[dict]]:
+        with self._result_cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.result_cache_ttl:
+                self.result_cache_misses += 1
+                return None
+            self._result_cache.move_to_end(key)
+            self.result_cache_hits += 1
+        # Callers build Documents around the hit dicts; keep the cached ones pristine
+        return copy.deepcopy(entry[1])
+
+    def _put_cached_result(self, key: tuple, hits: List[dict]) -> None:
+        with self._result_cache_lock:
+            if self._local_writes.get(key[0], 0) != key[1][1]:
+                return  # A write landed while the search was in flight
+            self._result_cache[key] = (time.monotonic(), copy.deepcopy(hits))
+            while len(self._result_cache) > self.result_cache_size:
+                self._result_cache.popitem(last=False)
+
+    def _forget_vectors(
+        self, index_name: str, ids: Optional[Iterable[str]] = None
+    ) -> None:
+        """Drop cached vectors of `ids`, or of the whole index."""
+        with self._vector_cache_lock:
+            if ids is None:
+                for key in [key for key in self._vector_cache if key[0] == index_name]:
+                    del self._vector_cache[key]
+            else:
+                for _id in ids:
+                    self._vector_cache.pop((index_name, _id), None)
+
+    def _cached_vectors(
+        self, index_name: str, ids: List[str]
+    ) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Cached vectors of `ids`, and the ids that still have to be fetched."""
+        found: Dict[str, np.ndarray] = {}
+        with self._vector_cache_lock:
+            for _id in ids:
+                vector = self._vector_cache.get((index_name, _id))
+                if vector is not None:
+                    self._vector_cache.move_to_end((index_name, _id))
+                    found[_id] = vector
+        return found, [_id for _id in ids if _id not in found]
+
+    def _decode_and_cache(
+        self,
+        index_name: str,
+        ids: List[str],
+        values: List[Any],
+        quantizer: Optional[ProductQuantizer],
+    ) -> Dict[str, np.ndarray]:
+        """Decode raw `_source` vectors (or PQ codes) and remember them."""
+        if not ids:
+            return {}
+        if quantizer is not None:
+            matrix = quantizer.decode_base64(values)
+        else:
+            matrix = decode_vectors(values, self._encodings.get(index_name))
+        decoded = dict(zip(ids, matrix))
+        if self.vector_cache_size > 0:
+            with self._vector_cache_lock:
+                for _id, vector in decoded.items():
+                    self._vector_cache[(index_name, _id)] = vector
+                while len(self._vector_cache) > self.vector_cache_size:
+                    self._vector_cache.popitem(last=False)
+        return decoded
+
+    def _mmr_search_kwargs(
+        self, quantizer: Optional[ProductQuantizer], **kwargs: Any
+    ) -> Tuple[Dict[str, Any], str, bool]:
+        """Search kwargs for the MMR candidates, the `_source` field the vectors
+        are read from, and whether the search returns them itself.
+
+        With the vector cache on, the search returns text and metadata only and
+        the vectors of uncached hits are fetched with one `_mget`.
+        """
+        vector_field = kwargs.get("vector_field", "vector_field")
+        text_field = kwargs.get("text_field", "text")
+        metadata_field = kwargs.get("metadata_field", "metadata")
+        stored_field = PQ_FIELD if quantizer is not None else vector_field
+        inline = self.vector_cache_size <= 0
+        if metadata_field == "*":
+            excluded = [
+                field
+                for field in (vector_field, PQ_FIELD)
+                if not (inline and field == stored_field)
+            ]
+            source_filter: Dict[str, Any] = {"excludes": excluded}
+        else:
+            included = [text_field, metadata_field]
+            source_filter = {"includes": included + [stored_field] if inline else included}
+        kwargs.setdefault("source_filter", source_filter)
+        return kwargs, stored_field, inline
+
+    def _select_mmr_documents(
+        self,
+        embedding: List[float],
+        hits: List[Dict],
+        vectors: Dict[str, np.ndarray],
+        k: int,
+        lambda_mult: float,
+        **kwargs: Any,
+    ) -> List[Document]:
+        # Hits deleted between the search and the _mget have no vector; skip them
+        hits = [hit for hit in hits if hit["_id"] in vectors]
+        if not hits:
+            return []
+        matrix = np.stack([vectors[hit["_id"]] for hit in hits])
+        selected = _maximal_marginal_relevance(
+            embedding, matrix, k=k, lambda_mult=lambda_mult
+        )
+        documents = self._hits_to_documents_with_scores([hits[i] for i in selected], **kwargs)
+        return [document for document, _ in documents]
+
+    def _start_bulk_load(self, index_name: str, current: Optional[Dict]) -> bool:
+        """Record the settings to restore; returns whether they must be changed now."""
+        if index_name in self._bulk_loads:
+            raise RuntimeError(f"A bulk load into {index_name} is already running.")
+        if current is None:
+            # Index created later by the load (see _index_body)
+            self._bulk_loads[index_name] = {}
+            return False
+        index_settings = current.get(index_name, {}).get("settings", {}).get("index", {})
+        self._bulk_loads[index_name] = {
+            key: index_settings.get(key) for key in BULK_LOAD_SETTINGS
+        }
+        return not self.is_aoss
+
+    @contextmanager
+    def bulk_load(self, index_name: Optional[str] = None) -> Iterator[None]:
+        """Tune `index_name` for a large load: refreshes are switched off and
+        replicas dropped while the block runs, adds inside it skip their
+        per-call refresh, and on exit the previous settings are restored and
+        the index is refreshed once.
+
+        Example:
+            .. code-block:: python
+
+                with vectorstore.bulk_load():
+                    for batch in batches:
+                        vectorstore.add_texts(batch)
+        """
+        index_name = index_name or self.index_name
+        exists = index_name in self._existing_indices or self.client.indices.exists(
+            index=index_name
+        )
+        current = (
+            self.client.indices.get_settings(index=index_name) if exists else None
+        )
+        if self._start_bulk_load(index_name, current):
+            self.client.indices.put_settings(
+                index=index_name, body={"index": BULK_LOAD_SETTINGS}
+            )
+        try:
+            yield
+        finally:
+            previous = self._bulk_loads.pop(index_name)
+            if previous and not self.is_aoss:
+                self.client.indices.put_settings(
+                    index=index_name, body={"index": previous}
+                )
+                self.client.indices.refresh(index=index_name)
+            # One generation bump for everything written during the load
+            self.bump_index_generation(index_name)
+
+    @asynccontextmanager
+    async def abulk_load(self, index_name: Optional[str] = None) -> AsyncIterator[None]:
+        """Asynchronous counterpart of `bulk_load`."""
+        index_name = index_name or self.index_name
+        exists = (
+            index_name in self._existing_indices
+            or await self.async_client.indices.exists(index=index_name)
+        )
+        current = (
+            await self.async_client.indices.get_settings(index=index_name)
+            if exists
+            else None
+        )
+        if self._start_bulk_load(index_name, current):
+            await self.async_client.indices.put_settings(
+                index=index_name, body={"index": BULK_LOAD_SETTINGS}
+            )
+        try:
+            yield
+        finally:
+            previous = self._bulk_loads.pop(index_name)
+            if previous and not self.is_aoss:
+                await self.async_client.indices.put_settings(
+                    index=index_name, body={"index": previous}
+                )
+                await self.async_client.indices.refresh(index=index_name)
+            # One generation bump for everything written during the load
+            await self.abump_index_generation(index_name)
+
     def index_exists(self, index_name: Optional[str] = None) -> Optional[bool]:
         """If given index present in vectorstore, returns True else False."""
         if index_name is None:
@@ -625,6 +1551,7 @@ class OpenSearchVectorSearch(VectorStore):
         if self.index_exists(index_name):
             raise RuntimeError(f"The index, {index_name} already exists.")
         self.client.indices.create(index=index_name, body=mapping)
+        self._existing_indices.add(index_name)
         return index_name
 
     def add_texts(
@@ -640,8 +1567,10 @@ class OpenSearchVectorSearch(VectorStore):
         Args:
             texts: Iterable of strings to add to the vectorstore.
             metadatas: Optional list of metadatas associated with the texts.
-            ids: Optional list of ids to associate with the texts.
-            bulk_size: Bulk API request count; Default: 500
+            ids: Optional list of ids to associate with the texts. Defaults to a
+                content hash of each text and its metadata, so re-adding a
+                chunk overwrites it instead of duplicating it.
+            bulk_size: Documents per _bulk request; Default: 500
 
         Returns:
             List of ids from adding the texts into the vectorstore.
@@ -701,8 +1630,10 @@ class OpenSearchVectorSearch(VectorStore):
             text_embeddings: Iterable pairs of string and embedding to
                 add to the vectorstore.
             metadatas: Optional list of metadatas associated with the texts.
-            ids: Optional list of ids to associate with the texts.
-            bulk_size: Bulk API request count; Default: 500
+            ids: Optional list of ids to associate with the texts. Defaults to a
+                content hash of each text and its metadata, so re-adding a
+                chunk overwrites it instead of duplicating it.
+            bulk_size: Documents per _bulk request; Default: 500
 
         Returns:
             List of ids from adding the texts into the vectorstore.
@@ -753,9 +1684,12 @@ class OpenSearchVectorSearch(VectorStore):
         for _id in ids:
             body.append({"_op_type": "delete", "_index": index_name, "_id": _id})
 
+        self._forget_vectors(index_name, ids)
         if len(body) > 0:
             try:
                 bulk(self.client, body, refresh=refresh_indices, ignore_status=404)
+                if index_name not in self._bulk_loads:
+                    self.bump_index_generation(index_name)
                 return True
             except Exception as e:
                 raise e
@@ -780,8 +1714,11 @@ class OpenSearchVectorSearch(VectorStore):
         index_name = kwargs.get("index_name", self.index_name)
         if self.index_name is None:
             raise ValueError("index_name must be provided.")
+        self._forget_vectors(index_name, ids)
         actions = [{"delete": {"_index": index_name, "_id": id_}} for id_ in ids]
         response = await self.async_client.bulk(body=actions, **kwargs)
+        if index_name not in self._bulk_loads:
+            await self.abump_index_generation(index_name)
         return not any(
             item.get("delete", {}).get("error") for item in response["items"]
         )
@@ -983,6 +1920,20 @@ class OpenSearchVectorSearch(VectorStore):
 
             pre_filter: script_score query to pre-filter documents before identifying
             nearest neighbors; default: {"match_all": {}}
+
+        Optional Args for Hybrid Search:
+            search_type: "hybrid_search"; default: "approximate_search"
+
+            search_pipeline: normalization pipeline (see
+            `configure_search_pipelines`) the hybrid query runs through. Without
+            one, the lexical and k-NN queries go out in one `_msearch` and are
+            fused here with reciprocal-rank fusion.
+
+            post_filter: filter applied to the hits of both queries
+
+            rrf_window: hits fetched per query for the fusion; default: 2 * k
+
+            rrf_rank_constant: RRF rank constant; default: 60
         """
         docs_with_scores = self.similarity_search_with_score(
             query, k, score_threshold, **kwargs
@@ -1057,29 +2008,10 @@ class OpenSearchVectorSearch(VectorStore):
         Optional Args:
             same as `similarity_search`
         """
-        text_field = kwargs.get("text_field", "text")
-        metadata_field = kwargs.get("metadata_field", "metadata")
-
         hits = self._raw_similarity_search_with_score_by_vector(
             embedding=embedding, k=k, score_threshold=score_threshold, **kwargs
         )
-
-        documents_with_scores = [
-            (
-                Document(
-                    page_content=hit["_source"][text_field],
-                    metadata=(
-                        hit["_source"]
-                        if metadata_field == "*" or metadata_field not in hit["_source"]
-                        else hit["_source"][metadata_field]
-                    ),
-                    id=hit["_id"],
-                ),
-                hit["_score"],
-            )
-            for hit in hits
-        ]
-        return documents_with_scores
+        return self._hits_to_documents_with_scores(hits, **kwargs)
 
     def _raw_similarity_search_with_score_by_vector(
         self,
@@ -1087,6 +2019,75 @@ class OpenSearchVectorSearch(VectorStore):
         k: int = 4,
         score_threshold: Optional[float] = 0.0,
         **kwargs: Any,
+    ) -> List[dict]:
+        """`_search_hits`, served from the result cache when the same search
+        already ran against the current generation of the index."""
+        if self.result_cache_size <= 0:
+            return self._guarded_search_hits(embedding, k, score_threshold, **kwargs)
+        generation = self._index_generation(kwargs.get("index_name", self.index_name))
+        if generation is None:
+            return self._guarded_search_hits(embedding, k, score_threshold, **kwargs)
+        key = self._result_cache_key(generation, embedding, k, score_threshold, kwargs)
+        hits = self._get_cached_result(key)
+        if hits is None:
+            hits = self._guarded_search_hits(embedding, k, score_threshold, **kwargs)
+            self._put_cached_result(key, hits)
+        return hits
+
+    async def _araw_similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[dict]:
+        """Asynchronous counterpart of `_raw_similarity_search_with_score_by_vector`."""
+        if self.result_cache_size <= 0:
+            return await self._aguarded_search_hits(embedding, k, score_threshold, **kwargs)
+        generation = await self._aindex_generation(
+            kwargs.get("index_name", self.index_name)
+        )
+        if generation is None:
+            return await self._aguarded_search_hits(embedding, k, score_threshold, **kwargs)
+        key = self._result_cache_key(generation, embedding, k, score_threshold, kwargs)
+        hits = self._get_cached_result(key)
+        if hits is None:
+            hits = await self._aguarded_search_hits(embedding, k, score_threshold, **kwargs)
+            self._put_cached_result(key, hits)
+        return hits
+
+    def _guarded(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """`fn(*args, **kwargs)` under the search policy, if there is one."""
+        if self.search_policy is None:
+            return fn(*args, **kwargs)
+        return self.search_policy.call(fn, *args, **kwargs)
+
+    async def _aguarded(
+        self, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Asynchronous counterpart of `_guarded`."""
+        if self.search_policy is None:
+            return await fn(*args, **kwargs)
+        return await self.search_policy.acall(fn, *args, **kwargs)
+
+    def _guarded_search_hits(
+        self, embedding: List[float], k: int, score_threshold: Optional[float], **kwargs: Any
+    ) -> List[dict]:
+        return self._guarded(self._search_hits, embedding, k, score_threshold, **kwargs)
+
+    async def _aguarded_search_hits(
+        self, embedding: List[float], k: int, score_threshold: Optional[float], **kwargs: Any
+    ) -> List[dict]:
+        return await self._aguarded(
+            self._asearch_hits, embedding, k, score_threshold, **kwargs
+        )
+
+    def _search_hits(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
     ) -> List[dict]:
         """Return raw opensearch documents (dict) including vectors,
         scores most similar to the embedding vector.
@@ -1106,12 +2107,411 @@ class OpenSearchVectorSearch(VectorStore):
         Optional Args:
             same as `similarity_search`
         """
-        search_type = kwargs.get("search_type", "approximate_search")
-        vector_field = kwargs.get("vector_field", "vector_field")
-        index_name = kwargs.get("index_name", self.index_name)
-        if self.index_name is None:
+        self._vector_encoding(kwargs.get("index_name", self.index_name))
+        if self._is_client_side_hybrid(**kwargs):
+            body = self._build_rrf_msearch_body(embedding, k, score_threshold, **kwargs)
+            with self._search_span(k, body, **kwargs) as span:
+                response = self.search_client.msearch(body=body)
+                result_lists = self._demultiplex_msearch(span, response)
+            return _reciprocal_rank_fusion(
+                result_lists, k, kwargs.get("rrf_rank_constant", RRF_RANK_CONSTANT)
+            )
+        path, search_query = self._build_search_request(
+            embedding, k=k, score_threshold=score_threshold, **kwargs
+        )
+        with self._search_span(k, search_query, **kwargs) as span:
+            if path is not None:
+                response = self.search_client.transport.perform_request(
+                    method="GET", url=path, body=search_query
+                )
+            else:
+                index_name = kwargs.get("index_name", self.index_name)
+                response = self.search_client.search(index=index_name, body=search_query)
+            self._describe_search_response(span, response)
+
+        return [hit for hit in response["hits"]["hits"]]
+
+    async def _asearch_hits(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[dict]:
+        """Asynchronously return raw opensearch documents (dict) most similar to
+        the embedding vector, using the AsyncOpenSearch client.
+
+        Optional Args:
+            same as `similarity_search`
+        """
+        await self._avector_encoding(kwargs.get("index_name", self.index_name))
+        if self._is_client_side_hybrid(**kwargs):
+            body = self._build_rrf_msearch_body(embedding, k, score_threshold, **kwargs)
+            with self._search_span(k, body, **kwargs) as span:
+                response = await self.async_search_client.msearch(body=body)
+                result_lists = self._demultiplex_msearch(span, response)
+            return _reciprocal_rank_fusion(
+                result_lists, k, kwargs.get("rrf_rank_constant", RRF_RANK_CONSTANT)
+            )
+        path, search_query = self._build_search_request(
+            embedding, k=k, score_threshold=score_threshold, **kwargs
+        )
+        with self._search_span(k, search_query, **kwargs) as span:
+            if path is not None:
+                response = await self.async_search_client.transport.perform_request(
+                    method="GET", url=path, body=search_query
+                )
+            else:
+                index_name = kwargs.get("index_name", self.index_name)
+                response = await self.async_search_client.search(
+                    index=index_name, body=search_query
+                )
+            self._describe_search_response(span, response)
+
+        return [hit for hit in response["hits"]["hits"]]
+
+    @staticmethod
+    def _is_client_side_hybrid(**kwargs: Any) -> bool:
+        """hybrid_search without a `search_pipeline` is fused on this side."""
+        return (
+            kwargs.get("search_type") == HYBRID_SEARCH
+            and kwargs.get("search_pipeline") is None
+        )
+
+    def _build_rrf_msearch_body(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Dict]:
+        """`_msearch` body with a lexical (BM25 `match`) and a k-NN query for the
+        same question, each returning the top `rrf_window` hits to fuse."""
+        query_text = kwargs.get("query_text")
+        if query_text is None:
+            raise ValueError("query_text must be provided for hybrid search")
+        index_name = kwargs.get("index_name", self.index_name)
+        text_field = kwargs.get("text_field", "text")
+        vector_field = kwargs.get("vector_field", "vector_field")
+        post_filter = kwargs.get("post_filter", {})
+        window = max(k, kwargs.get("rrf_window", 2 * k))
+        source_filter = kwargs.get(
+            "source_filter", {"excludes": [vector_field, PQ_FIELD]}
+        )
+
+        knn_kwargs = {
+            **kwargs,
+            "search_type": "approximate_search",
+            "source_filter": source_filter,
+        }
+        _, knn_query = self._build_search_request(
+            embedding, k=window, score_threshold=score_threshold, **knn_kwargs
+        )
+        lexical_query: Dict[str, Any] = {
+            "size": window,
+            "query": {"match": {text_field: {"query": query_text}}},
+            "_source": source_filter,
+        }
+        if post_filter:
+            knn_query["post_filter"] = post_filter
+            lexical_query["post_filter"] = post_filter
+        header = {"index": index_name}
+        return [header, lexical_query, header, knn_query]
+
+    def _build_msearch_body(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Dict]:
+        """`_msearch` body: a header and a search body per query embedding."""
+        header = {"index": kwargs.get("index_name", self.index_name)}
+        body: List[Dict] = []
+        for embedding in embeddings:
+            path, search_query = self._build_search_request(
+                embedding, k=k, score_threshold=score_threshold, **kwargs
+            )
+            if path is not None:
+                raise ValueError(
+                    "hybrid_search goes through a search pipeline and cannot be batched"
+                )
+            body.extend((header, search_query))
+        return body
+
+    @staticmethod
+    def _demultiplex_msearch(span: Any, response: Dict) -> List[List[dict]]:
+        """Hits of every query of an `_msearch` response, in request order."""
+        results = []
+        for i, item in enumerate(response["responses"]):
+            if "error" in item:
+                raise ValueError(f"Query {i} of the batch failed: {item['error']}")
+            results.append(item["hits"]["hits"])
+        if span.is_recording:
+            span.set_attributes(
+                {
+                    "search.hits": sum(len(hits) for hits in results),
+                    "search.took_ms": response.get("took", -1),
+                }
+            )
+            if span.records_payloads:
+                span.set_attribute("search.response_bytes", payload_size(response))
+        return results
+
+    def _batch_cache_keys(
+        self,
+        generation: Optional[Tuple[str, int]],
+        embeddings: List[List[float]],
+        k: int,
+        score_threshold: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> List[Optional[tuple]]:
+        """Result cache key of every query of a batch (None: bypass the cache)."""
+        if self.result_cache_size <= 0 or generation is None:
+            return [None] * len(embeddings)
+        return [
+            self._result_cache_key(generation, embedding, k, score_threshold, kwargs)
+            for embedding in embeddings
+        ]
+
+    def _fill_batch(
+        self,
+        keys: List[Optional[tuple]],
+        results: List[Optional[List[dict]]],
+        missing: List[int],
+        fetched: List[List[dict]],
+    ) -> List[List[dict]]:
+        """Put the hits fetched for the `missing` queries into `results` and the cache."""
+        for i, hits in zip(missing, fetched):
+            results[i] = hits
+            if keys[i] is not None:
+                self._put_cached_result(keys[i], hits)
+        return results
+
+    def _raw_batch_similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[dict]]:
+        """Raw hits for several query embeddings. Queries already in the result
+        cache are answered from it; the rest go in one `_msearch` round trip,
+        under the search policy.
+
+        Optional Args:
+            same as `similarity_search`, applied to every query
+        """
+        if not embeddings:
+            return []
+        generation = None
+        if self.result_cache_size > 0:
+            generation = self._index_generation(kwargs.get("index_name", self.index_name))
+        keys = self._batch_cache_keys(generation, embeddings, k, score_threshold, kwargs)
+        results = [None if key is None else self._get_cached_result(key) for key in keys]
+        missing = [i for i, hits in enumerate(results) if hits is None]
+        fetched = []
+        if missing:
+            fetched = self._guarded(
+                self._msearch_hits,
+                [embeddings[i] for i in missing],
+                k,
+                score_threshold,
+                **kwargs,
+            )
+        return self._fill_batch(keys, results, missing, fetched)
+
+    async def _araw_batch_similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[dict]]:
+        """Asynchronous counterpart of `_raw_batch_similarity_search_by_vectors`."""
+        if not embeddings:
+            return []
+        generation = None
+        if self.result_cache_size > 0:
+            generation = await self._aindex_generation(
+                kwargs.get("index_name", self.index_name)
+            )
+        keys = self._batch_cache_keys(generation, embeddings, k, score_threshold, kwargs)
+        results = [None if key is None else self._get_cached_result(key) for key in keys]
+        missing = [i for i, hits in enumerate(results) if hits is None]
+        fetched = []
+        if missing:
+            fetched = await self._aguarded(
+                self._amsearch_hits,
+                [embeddings[i] for i in missing],
+                k,
+                score_threshold,
+                **kwargs,
+            )
+        return self._fill_batch(keys, results, missing, fetched)
+
+    def _msearch_hits(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[dict]]:
+        """Raw hits for several query embeddings, in one `_msearch` round trip."""
+        self._vector_encoding(kwargs.get("index_name", self.index_name))
+        body = self._build_msearch_body(
+            embeddings, k=k, score_threshold=score_threshold, **kwargs
+        )
+        with self._search_span(k, body, **kwargs) as span:
+            span.set_attribute("search.batch_size", len(embeddings))
+            response = self.search_client.msearch(body=body)
+            return self._demultiplex_msearch(span, response)
+
+    async def _amsearch_hits(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[dict]]:
+        """Asynchronous counterpart of `_msearch_hits`."""
+        await self._avector_encoding(kwargs.get("index_name", self.index_name))
+        body = self._build_msearch_body(
+            embeddings, k=k, score_threshold=score_threshold, **kwargs
+        )
+        with self._search_span(k, body, **kwargs) as span:
+            span.set_attribute("search.batch_size", len(embeddings))
+            response = await self.async_search_client.msearch(body=body)
+            return self._demultiplex_msearch(span, response)
+
+    def batch_similarity_search_with_score(
+        self,
+        queries: List[str],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Return docs and scores most similar to each of `queries`.
+
+        The queries are embedded in one `embed_documents` call (one forward
+        pass; the app's embedding model is symmetric, so this matches
+        `embed_query`); the ones not in the result cache are searched with a
+        single `_msearch` request, so several retrievals cost at most one
+        round trip.
+
+        Args:
+            queries: Texts to look up documents similar to.
+            k: Number of Documents to return per query. Defaults to 4.
+            score_threshold: Specify a score threshold to return only documents
+            above the threshold. Defaults to 0.0.
+
+        Returns:
+            One list of (Document, score) per query, in the order of `queries`.
+
+        Optional Args:
+            same as `similarity_search`, applied to every query; hybrid_search
+            is not supported.
+        """
+        embeddings = self.embedding_function.embed_documents(list(queries))
+        results = self._raw_batch_similarity_search_by_vectors(
+            embeddings, k=k, score_threshold=score_threshold, **kwargs
+        )
+        return [self._hits_to_documents_with_scores(hits, **kwargs) for hits in results]
+
+    def batch_similarity_search(
+        self,
+        queries: List[str],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[Document]]:
+        """Return docs most similar to each of `queries`, in one `_msearch`.
+
+        Optional Args:
+            same as `batch_similarity_search_with_score`
+        """
+        results = self.batch_similarity_search_with_score(
+            queries, k, score_threshold, **kwargs
+        )
+        return [[doc for doc, _ in docs_with_scores] for docs_with_scores in results]
+
+    async def abatch_similarity_search_with_score(
+        self,
+        queries: List[str],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Asynchronous counterpart of `batch_similarity_search_with_score`."""
+        embeddings = await self.embedding_function.aembed_documents(list(queries))
+        results = await self._araw_batch_similarity_search_by_vectors(
+            embeddings, k=k, score_threshold=score_threshold, **kwargs
+        )
+        return [self._hits_to_documents_with_scores(hits, **kwargs) for hits in results]
+
+    async def abatch_similarity_search(
+        self,
+        queries: List[str],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[List[Document]]:
+        """Asynchronous counterpart of `batch_similarity_search`."""
+        results = await self.abatch_similarity_search_with_score(
+            queries, k, score_threshold, **kwargs
+        )
+        return [[doc for doc, _ in docs_with_scores] for docs_with_scores in results]
+
+    def _search_span(self, k: int, search_query: Dict, **kwargs: Any) -> Any:
+        """Span around one OpenSearch search round trip (a no-op when tracing is off)."""
+        span = tracer.span(
+            "opensearch.search",
+            **{
+                "db.system": "opensearch",
+                "opensearch.index": kwargs.get("index_name", self.index_name),
+                "search.type": kwargs.get("search_type", "approximate_search"),
+                "search.k": k,
+            },
+        )
+        if span.records_payloads:
+            span.set_attribute("search.request_bytes", payload_size(search_query))
+        return span
+
+    @staticmethod
+    def _describe_search_response(span: Any, response: Dict) -> None:
+        if span.is_recording:
+            span.set_attributes(
+                {
+                    "search.hits": len(response["hits"]["hits"]),
+                    "search.took_ms": response.get("took", -1),
+                }
+            )
+            if span.records_payloads:
+                span.set_attribute("search.response_bytes", payload_size(response))
+
+    def _build_search_request(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> Tuple[Optional[str], Dict]:
+        """Build the search body for the requested `search_type`.
+
+        Returns:
+            Tuple of (path, body). The path is only set for hybrid search, which
+            goes through a search pipeline instead of the plain search API.
+        """
+        search_type = kwargs.get("search_type", "approximate_search")
+        vector_field = kwargs.get("vector_field", "vector_field")
+        index_name = kwargs.get("index_name", self.index_name)
+        if self.index_name is None:
             raise ValueError("index_name must be provided.")
         filter = kwargs.get("filter", {})
+        encoding = self._encodings.get(index_name)
+        if encoding and encoding.get("data_type") == "byte":
+            # Byte indices are searched with the query on the same int8 scale
+            embedding = encode_vectors([embedding], encoding)[0]
 
         if (
             self.is_aoss
@@ -1230,8 +2630,8 @@ class OpenSearchVectorSearch(VectorStore):
             if search_pipeline is None:
                 raise ValueError("search_pipeline must be provided for hybrid search")
 
-            # embedding the query_text
-            embeded_query = self.embedding_function.embed_query(query_text)
+            # The caller already embedded query_text (and encoded it for byte indices)
+            embeded_query = embedding
 
             # if post filter is provided
             if post_filter != {}:
@@ -1243,18 +2643,105 @@ class OpenSearchVectorSearch(VectorStore):
                 # hybrid search without post filter
                 payload = _default_hybrid_search_query(query_text, embeded_query, k)
 
-            response = self.client.transport.perform_request(
-                method="GET", url=path, body=payload
-            )
-
-            return [hit for hit in response["hits"]["hits"]]
+            return path, payload
 
         else:
             raise ValueError("Invalid `search_type` provided as an argument")
 
-        response = self.client.search(index=index_name, body=search_query)
+        if "source_filter" in kwargs:
+            search_query["_source"] = kwargs["source_filter"]
+        return None, search_query
 
-        return [hit for hit in response["hits"]["hits"]]
+    def _hits_to_documents_with_scores(
+        self, hits: List[dict], **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        text_field = kwargs.get("text_field", "text")
+        metadata_field = kwargs.get("metadata_field", "metadata")
+        return [
+            (
+                Document(
+                    page_content=hit["_source"][text_field],
+                    metadata=(
+                        hit["_source"]
+                        if metadata_field == "*" or metadata_field not in hit["_source"]
+                        else hit["_source"][metadata_field]
+                    ),
+                    id=hit["_id"],
+                ),
+                hit["_score"],
+            )
+            for hit in hits
+        ]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Asynchronously return docs most similar to query.
+
+        Uses the AsyncOpenSearch client instead of running the synchronous
+        search in a thread pool.
+
+        Optional Args:
+            same as `similarity_search`
+        """
+        docs_with_scores = await self.asimilarity_search_with_score(
+            query, k, score_threshold, **kwargs
+        )
+        return [doc[0] for doc in docs_with_scores]
+
+    async def asimilarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Asynchronously return docs most similar to the embedding vector."""
+        docs_with_scores = await self.asimilarity_search_with_score_by_vector(
+            embedding, k, score_threshold, **kwargs
+        )
+        return [doc[0] for doc in docs_with_scores]
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Asynchronously return docs and it's scores most similar to query.
+
+        Optional Args:
+            same as `similarity_search`
+        """
+        # added query_text to kwargs for Hybrid Search
+        kwargs["query_text"] = query
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(
+            embedding, k, score_threshold, **kwargs
+        )
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        score_threshold: Optional[float] = 0.0,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Asynchronously return docs and it's scores most similar to the
+        embedding vector.
+
+        Optional Args:
+            same as `similarity_search`
+        """
+        hits = await self._araw_similarity_search_with_score_by_vector(
+            embedding=embedding, k=k, score_threshold=score_threshold, **kwargs
+        )
+        return self._hits_to_documents_with_scores(hits, **kwargs)
 
     def max_marginal_relevance_search(
         self,
@@ -1282,38 +2769,138 @@ class OpenSearchVectorSearch(VectorStore):
             List of Documents selected by maximal marginal relevance.
         """
 
-        vector_field = kwargs.get("vector_field", "vector_field")
-        text_field = kwargs.get("text_field", "text")
-        metadata_field = kwargs.get("metadata_field", "metadata")
-
-        # Get embedding of the user query
+        # added query_text to kwargs for Hybrid Search
+        kwargs["query_text"] = query
         embedding = self.embedding_function.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(
+            embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs
+        )
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs selected using the maximal marginal relevance to `embedding`.
+
+        Only text and metadata come back with the `fetch_k` candidates; their
+        vectors are taken from the store's `_id` cache, and the ones not cached
+        yet are fetched in a single `_mget` of just the vector field (or the
+        PQ codes, when the index has them), under the search policy like the
+        k-NN search. The re-rank itself runs on one contiguous NumPy matrix.
+
+        Args:
+            same as `max_marginal_relevance_search`, with the query embedding
+            instead of the query text.
+        """
+        index_name = kwargs.get("index_name", self.index_name)
+        quantizer = self._quantizer(index_name)
+        kwargs, stored_field, inline = self._mmr_search_kwargs(quantizer, **kwargs)
 
         # Do ANN/KNN search to get top fetch_k results where fetch_k >= k
-        results = self._raw_similarity_search_with_score_by_vector(
+        hits = self._raw_similarity_search_with_score_by_vector(
             embedding, fetch_k, **kwargs
         )
+        if inline:
+            vectors = self._decode_and_cache(
+                index_name,
+                [hit["_id"] for hit in hits],
+                [hit["_source"][stored_field] for hit in hits],
+                quantizer,
+            )
+        else:
+            vectors, missing = self._cached_vectors(
+                index_name, [hit["_id"] for hit in hits]
+            )
+            if missing:
+                response = self._guarded(
+                    self.search_client.mget,
+                    index=index_name,
+                    body={"ids": missing},
+                    _source_includes=[stored_field],
+                )
+                found = [doc for doc in response["docs"] if doc.get("found")]
+                vectors.update(
+                    self._decode_and_cache(
+                        index_name,
+                        [doc["_id"] for doc in found],
+                        [doc["_source"][stored_field] for doc in found],
+                        quantizer,
+                    )
+                )
+        return self._select_mmr_documents(
+            embedding, hits, vectors, k, lambda_mult, **kwargs
+        )
 
-        embeddings = [result["_source"][vector_field] for result in results]
+    async def amax_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Asynchronously return docs selected using the maximal marginal relevance.
 
-        # Rerank top k results using MMR, (mmr_selected is a list of indices)
-        mmr_selected = maximal_marginal_relevance(
-            np.array(embedding), embeddings, k=k, lambda_mult=lambda_mult
+        Optional Args:
+            same as `max_marginal_relevance_search`
+        """
+        # added query_text to kwargs for Hybrid Search
+        kwargs["query_text"] = query
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.amax_marginal_relevance_search_by_vector(
+            embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs
         )
 
-        return [
-            Document(
-                page_content=results[i]["_source"][text_field],
-                metadata=(
-                    results[i]["_source"]
-                    if metadata_field == "*"
-                    or metadata_field not in results[i]["_source"]
-                    else results[i]["_source"][metadata_field]
-                ),
-                id=results[i]["_id"],
+    async def amax_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Asynchronous counterpart of `max_marginal_relevance_search_by_vector`."""
+        index_name = kwargs.get("index_name", self.index_name)
+        quantizer = await self._aquantizer(index_name)
+        kwargs, stored_field, inline = self._mmr_search_kwargs(quantizer, **kwargs)
+
+        hits = await self._araw_similarity_search_with_score_by_vector(
+            embedding, fetch_k, **kwargs
+        )
+        if inline:
+            vectors = self._decode_and_cache(
+                index_name,
+                [hit["_id"] for hit in hits],
+                [hit["_source"][stored_field] for hit in hits],
+                quantizer,
             )
-            for i in mmr_selected
-        ]
+        else:
+            vectors, missing = self._cached_vectors(
+                index_name, [hit["_id"] for hit in hits]
+            )
+            if missing:
+                response = await self._aguarded(
+                    self.async_search_client.mget,
+                    index=index_name,
+                    body={"ids": missing},
+                    _source_includes=[stored_field],
+                )
+                found = [doc for doc in response["docs"] if doc.get("found")]
+                vectors.update(
+                    self._decode_and_cache(
+                        index_name,
+                        [doc["_id"] for doc in found],
+                        [doc["_source"][stored_field] for doc in found],
+                        quantizer,
+                    )
+                )
+        return self._select_mmr_documents(
+            embedding, hits, vectors, k, lambda_mult, **kwargs
+        )
 
     @classmethod
     def from_texts(
@@ -1580,6 +3167,7 @@ class OpenSearchVectorSearch(VectorStore):
             mapping=mapping,
             max_chunk_bytes=max_chunk_bytes,
             is_aoss=is_aoss,
+            bulk_size=bulk_size,
         )
         kwargs["engine"] = engine
         return cls(opensearch_url, index_name, embedding, **kwargs)
@@ -1715,6 +3303,7 @@ class OpenSearchVectorSearch(VectorStore):
             mapping=mapping,
             max_chunk_bytes=max_chunk_bytes,
             is_aoss=is_aoss,
+            bulk_size=bulk_size,
         )
         kwargs["engine"] = engine
         return cls(opensearch_url, index_name, embedding, **kwargs)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from pydantic import ConfigDict, PrivateAttr
+
+from utils.tracing import tracer
+
+IMPORT_SENTENCE_TRANSFORMERS_ERROR = (
+    "Could not import sentence_transformers. "
+    "Please install it with `pip install sentence-transformers`."
+)
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs with a small cross-encoder on CPU.
+
+    All candidates of a query are scored in one batched forward pass. Scores
+    are the sigmoid of the model's relevance logit, so a threshold reads as
+    a probability and does not depend on the model's logit scale.
+
+    Example:
+        .. code-block:: python
+
+            reranker = CrossEncoderReranker()
+            scores = reranker.score("what is an ETF?", [doc.page_content for doc in docs])
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_CROSS_ENCODER,
+        max_length: int = 512,
+        device: str = "cpu",
+        model: Optional[Any] = None,
+    ):
+        if model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise ImportError(IMPORT_SENTENCE_TRANSFORMERS_ERROR)
+            model = CrossEncoder(model_name, max_length=max_length, device=device)
+        self.model_name = model_name
+        self.model = model
+        # One forward pass at a time; torch already uses every core for one batch
+        self._lock = threading.Lock()
+
+    def score(self, query: str, passages: Sequence[str]) -> np.ndarray:
+        if not passages:
+            return np.zeros(0, dtype=np.float32)
+        pairs = [(query, passage) for passage in passages]
+        with self._lock:
+            logits = self.model.predict(
+                pairs, batch_size=len(pairs), show_progress_bar=False, convert_to_numpy=True
+            )
+        logits = np.asarray(logits, dtype=np.float32).reshape(len(pairs), -1)[:, -1]
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class RerankingRetriever(BaseRetriever):
+    """Over-fetches candidates from a vector store and keeps the passages a
+    cross-encoder rates relevant.
+
+    At most `k` passages scoring at least `min_score` are returned (but never
+    fewer than `min_k`, so the chain always has some context). `fetch_k`
+    adapts to the traffic: the store is asked for about `fetch_margin` times
+    as many candidates as the deepest vector-search rank that recently made
+    it into the result, within [`min_fetch_k`, `max_fetch_k`]. When the best
+    passages are usually near the top, fewer candidates are scored; when a
+    result reaches the last candidate, the next query fetches more.
+
+    Example:
+        .. code-block:: python
+
+            retriever = RerankingRetriever(
+                vectorstore=vectorstore, reranker=CrossEncoderReranker(), k=3, min_score=0.1
+            )
+            docs = retriever.invoke("explain bond duration")
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: VectorStore
+    reranker: Any
+    k: int = 3
+    min_k: int = 1
+    min_score: float = 0.1
+    min_fetch_k: int = 8
+    max_fetch_k: int = 40
+    fetch_margin: float = 1.5
+    # Weight of the newest query in the running estimate of the useful depth
+    depth_smoothing: float = 0.2
+    search_kwargs: dict = {}
+
+    _depth: Optional[float] = PrivateAttr(default=None)
+    _depth_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def fetch_k(self) -> int:
+        """Candidates the next query will fetch."""
+        if self._depth is None:
+            return self.max_fetch_k
+        wanted = math.ceil(self._depth * self.fetch_margin)
+        return int(min(self.max_fetch_k, max(self.min_fetch_k, self.k, wanted)))
+
+    def _observe(self, depth: int, fetch_k: int, candidates: int) -> None:
+        with self._depth_lock:
+            if depth >= candidates and candidates >= fetch_k:
+                # The last candidate was kept: the useful depth may be beyond what was fetched
+                depth = min(self.max_fetch_k, 2 * fetch_k)
+            if self._depth is None:
+                self._depth = float(depth)
+            else:
+                self._depth += self.depth_smoothing * (depth - self._depth)
+
+    def _rerank(self, query: str, candidates: List[Document], fetch_k: int) -> List[Document]:
+        with tracer.span(
+            "retrieval.rerank",
+            **{"rerank.model": getattr(self.reranker, "model_name", ""), "rerank.fetch_k": fetch_k},
+        ) as span:
+            scores = self.reranker.score(query, [doc.page_content for doc in candidates])
+            order = np.argsort(-scores, kind="stable")[: self.k]
+            kept: List[Tuple[int, float]] = [
+                (int(i), float(scores[i]))
+                for rank, i in enumerate(order)
+                if scores[i] >= self.min_score or rank < self.min_k
+            ]
+            if kept:
+                self._observe(max(i for i, _ in kept) + 1, fetch_k, len(candidates))
+            span.set_attributes({"rerank.candidates": len(candidates), "rerank.kept": len(kept)})
+        documents = []
+        for i, score in kept:
+            document = candidates[i]
+            documents.append(
+                Document(
+                    page_content=document.page_content,
+                    metadata={**document.metadata, "rerank_score": score},
+                    id=document.id,
+                )
+            )
+        return documents
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        fetch_k = self.fetch_k
+        candidates = self.vectorstore.similarity_search(query, k=fetch_k, **self.search_kwargs)
+        return self._rerank(query, candidates, fetch_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        fetch_k = self.fetch_k
+        candidates = await self.vectorstore.asimilarity_search(
+            query, k=fetch_k, **self.search_kwargs
+        )
+        # The forward pass is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self._rerank, query, candidates, fetch_k)
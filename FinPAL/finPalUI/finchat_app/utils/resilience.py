@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Optional
+
+from utils.tracing import run_in_context, tracer
+
+try:
+    import httpx  # ChatMistralAI's transport
+
+    _TRANSIENT_ERRORS: tuple = (TimeoutError, ConnectionError, asyncio.TimeoutError, httpx.TransportError)
+except ImportError:
+    _TRANSIENT_ERRORS = (TimeoutError, ConnectionError, asyncio.TimeoutError)
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency's circuit is open; the call was not attempted."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call, including its hedges and retries, did not finish in time."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether `error` is worth retrying and counts against the circuit:
+    timeouts, connection errors (including httpx's, which do not subclass the
+    built-in ones), throttling (429) and server errors (5xx). Client errors
+    (4xx) mean the dependency is up and the request is wrong."""
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    # opensearch-py reports timeouts and connection errors with status "N/A"
+    return type(error).__name__ in ("ConnectionError", "ConnectionTimeout", "SSLError")
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The `q`-quantile (0-1) of the window, or None until it has `min_samples`."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class RetryBudget:
+    """Token bucket bounding the extra load retries and hedges may add.
+
+    Every successful call deposits `ratio` tokens and `min_per_s` tokens
+    trickle in per second; a retry or hedge spends one. With ratio=0.1 a
+    struggling dependency sees at most ~10% more requests than it is already
+    getting, instead of every caller multiplying its load by `max_retries`.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_s: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_s)
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    `failure_threshold` consecutive transient failures open the circuit:
+    calls fail fast with CircuitOpenError for `reset_timeout` seconds. Then a
+    single probe call is let through (half-open); its success closes the
+    circuit, its failure opens it again. A probe that ends without an outcome
+    (cancelled) should be handed back with `release_probe`; one that has not
+    reported back within `reset_timeout` is given up on and another call
+    becomes the probe, so a lost probe never keeps the circuit open for good.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # Ticket and start time of the outstanding half-open probe
+        self._probe: Optional[int] = None
+        self._probe_started = 0.0
+        self._tickets = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probe is not None or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def acquire(self) -> Optional[int]:
+        """None when the call must fail fast, otherwise 0, or a probe ticket
+        (> 0) when the call is the half-open probe."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return None
+            if self._probe is not None and now - self._probe_started < self.reset_timeout:
+                return None
+            self._tickets += 1
+            self._probe = self._tickets
+            self._probe_started = now
+            return self._probe
+
+    def allow(self) -> bool:
+        return self.acquire() is not None
+
+    def release_probe(self, ticket: int) -> None:
+        """Hand back a probe that ended without an outcome, e.g. was cancelled."""
+        with self._lock:
+            if ticket and self._probe == ticket:
+                self._probe = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probe = None
+
+
+class ResiliencePolicy:
+    """Deadline, hedging, budgeted retries and a circuit breaker for one dependency.
+
+    - `deadline`: seconds the whole call (hedges and retries included) may
+      take before DeadlineExceeded is raised. A sync call that overruns is
+      abandoned, not interrupted: its worker thread finishes in the background.
+    - `hedge`: once a call has been outstanding for the dependency's recent
+      `hedge_quantile` latency (at least `min_hedge_delay`), an identical
+      second request is sent and the first answer wins. Only for idempotent
+      reads; hedging starts once the latency window has enough samples.
+    - `max_retries`: transient failures (see `is_transient`) are retried with
+      jittered exponential backoff, while the deadline allows it.
+    - Retries and hedges are paid from `budget`; when it is empty the call
+      gets only its first attempt.
+    - `breaker` counts transient failures and deadline overruns. A
+      CircuitOpenError from a nested policy is neutral: it is neither
+      recorded nor retried.
+
+    Example:
+        .. code-block:: python
+
+            policy = ResiliencePolicy("opensearch", deadline=2.0, hedge=True, max_retries=1)
+            response = policy.call(client.search, index="finpal", body=query)
+            response = await policy.acall(async_client.search, index="finpal", body=query)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        deadline: Optional[float] = None,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.05,
+        max_retries: int = 0,
+        backoff: float = 0.2,
+        retryable: Callable[[BaseException], bool] = is_transient,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[RetryBudget] = None,
+        latency: Optional[LatencyTracker] = None,
+        max_workers: int = 16,
+    ):
+        self.name = name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retryable = retryable
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget or RetryBudget()
+        self.latency = latency or LatencyTracker()
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"resilience-{self.name}"
+                    )
+        return self._executor
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        quantile = self.latency.percentile(self.hedge_quantile)
+        return None if quantile is None else max(self.min_hedge_delay, quantile)
+
+    def _check_circuit(self) -> int:
+        """Probe ticket of the call (see CircuitBreaker.acquire); raises when the circuit is open."""
+        ticket = self.breaker.acquire()
+        if ticket is None:
+            tracer.current_span().set_attribute("resilience.circuit_open", self.name)
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        return ticket
+
+    def _retry_delay(self, attempt: int, deadline_at: Optional[float]) -> Optional[float]:
+        """Backoff before retry number `attempt`, or None when it must not be retried."""
+        if attempt > self.max_retries:
+            return None
+        delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+            return None
+        if not self.budget.try_spend():
+            return None
+        return delay
+
+    def _settle(self, error: BaseException) -> bool:
+        """Record a failed attempt; True when it is worth retrying."""
+        if isinstance(error, CircuitOpenError):
+            # A nested dependency's circuit is open: this call was never really
+            # attempted, so it says nothing either way about this dependency
+            return False
+        transient = isinstance(error, DeadlineExceeded) or self.retryable(error)
+        if transient:
+            self.breaker.record_failure()
+        else:
+            # The dependency answered; the request itself was at fault
+            self.breaker.record_success()
+        return transient and not isinstance(error, DeadlineExceeded)
+
+    def _succeed(self, started: float) -> None:
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+        self.budget.deposit()
+
+    @staticmethod
+    def _remaining(deadline_at: Optional[float]) -> Optional[float]:
+        return None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` under this policy."""
+        ticket = self._check_circuit()
+        try:
+            return self._call(fn, args, kwargs)
+        except BaseException as error:
+            if not isinstance(error, Exception) or isinstance(error, CircuitOpenError):
+                # Interrupted (e.g. KeyboardInterrupt) or failed fast on a nested
+                # open circuit: no outcome to report
+                self.breaker.release_probe(ticket)
+            raise
+
+    def _call(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        deadline_at = None if self.deadline is None else time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = self._attempt(fn, args, kwargs, deadline_at)
+            except Exception as error:
+                attempt += 1
+                delay = self._retry_delay(attempt, deadline_at) if self._settle(error) else None
+                if delay is None:
+                    raise
+                tracer.current_span().set_attribute(f"{self.name}.retries", attempt)
+                time.sleep(delay)
+                continue
+            self._succeed(started)
+            return result
+
+    def _attempt(
+        self, fn: Callable[..., Any], args: tuple, kwargs: dict, deadline_at: Optional[float]
+    ) -> Any:
+        hedge_delay = self._hedge_delay()
+        if deadline_at is None and hedge_delay is None:
+            return fn(*args, **kwargs)
+        executor = self._get_executor()
+        pending = {executor.submit(run_in_context(fn, *args, **kwargs))}
+        if hedge_delay is not None:
+            remaining = self._remaining(deadline_at)
+            done, _ = wait(pending, timeout=hedge_delay if remaining is None else min(hedge_delay, remaining))
+            if not done and self._remaining(deadline_at) != 0.0 and self.budget.try_spend():
+                tracer.current_span().set_attribute(f"{self.name}.hedged", True)
+                pending.add(executor.submit(run_in_context(fn, *args, **kwargs)))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(deadline_at), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise DeadlineExceeded(f"{self.name} did not answer within {self.deadline:g}s")
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """Asynchronous counterpart of `call`; `fn` returns an awaitable.
+        A losing hedge or an overrunning request is cancelled."""
+        ticket = self._check_circuit()
+        try:
+            return await self._acall(fn, args, kwargs)
+        except BaseException as error:
+            if not isinstance(error, Exception) or isinstance(error, CircuitOpenError):
+                # Cancelled (tool timeout, stopped run) or failed fast on a nested
+                # open circuit: no outcome to report
+                self.breaker.release_probe(ticket)
+            raise
+
+    async def _acall(self, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        deadline_at = None if self.deadline is None else time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = await self._aattempt(fn, args, kwargs, deadline_at)
+            except Exception as error:
+                attempt += 1
+                delay = self._retry_delay(attempt, deadline_at) if self._settle(error) else None
+                if delay is None:
+                    raise
+                tracer.current_span().set_attribute(f"{self.name}.retries", attempt)
+                await asyncio.sleep(delay)
+                continue
+            self._succeed(started)
+            return result
+
+    async def _aattempt(
+        self, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict, deadline_at: Optional[float]
+    ) -> Any:
+        hedge_delay = self._hedge_delay()
+        if deadline_at is None and hedge_delay is None:
+            return await fn(*args, **kwargs)
+        pending = {asyncio.ensure_future(fn(*args, **kwargs))}
+        try:
+            if hedge_delay is not None:
+                remaining = self._remaining(deadline_at)
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_delay if remaining is None else min(hedge_delay, remaining)
+                )
+                if not done and self._remaining(deadline_at) != 0.0 and self.budget.try_spend():
+                    tracer.current_span().set_attribute(f"{self.name}.hedged", True)
+                    pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=self._remaining(deadline_at), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded(f"{self.name} did not answer within {self.deadline:g}s")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(
+        self,
+        fn: Callable[..., AsyncIterator[Any]],
+        *args: Any,
+        first_item_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Yield the items of the async iterator `fn(*args, **kwargs)` under the circuit breaker.
+
+        The first item must arrive within `first_item_timeout` (default: `deadline`),
+        or DeadlineExceeded is raised; once items flow the stream is not timed, a long
+        answer is still making progress. Streams are never retried or hedged, since
+        items may already have been passed on. The outcome of the whole stream is
+        recorded on the breaker.
+        """
+        ticket = self._check_circuit()
+        timeout = self.deadline if first_item_timeout is None else first_item_timeout
+        iterator = fn(*args, **kwargs).__aiter__()
+        try:
+            try:
+                first = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                pass
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{self.name} sent nothing within {timeout:g}s") from None
+            else:
+                yield first
+                async for item in iterator:
+                    yield item
+        except BaseException as error:
+            if isinstance(error, Exception):
+                self._settle(error)
+            if not isinstance(error, Exception) or isinstance(error, CircuitOpenError):
+                # Cancelled, or closed early by the consumer: no outcome to report
+                self.breaker.release_probe(ticket)
+            raise
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        self.breaker.record_success()
+        self.budget.deposit()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+PENDING = "pending"
+BUILDING = "building"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Resource:
+    """Book-keeping for a single lazily built resource."""
+
+    def __init__(self, name: str, builder: Callable[[], Any], depends_on: Iterable[str]):
+        self.name = name
+        self.builder = builder
+        self.depends_on = list(depends_on)
+        self.future: Future = Future()
+        self.claimed = False
+        self.started_at: Optional[float] = None
+        self.elapsed: Optional[float] = None
+        # Consecutive failed builds, and when the next attempt may start
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class LazyResourceRegistry:
+    """Registry of expensive objects that are built on first use or at warm-up.
+
+    Each resource is registered with a zero-argument builder. A builder may call
+    `get` for the resources it depends on. Whoever claims a resource first builds
+    it in its own thread, everyone else waits on the same future, so warm-up tasks
+    and on-demand callers never deadlock and never build anything twice.
+
+    A failed build is not permanent: it stays FAILED (and `get` re-raises its
+    error) for a backoff that doubles with every consecutive failure, from
+    `retry_backoff` up to `max_retry_backoff` seconds; after that the next
+    `get` or `warm_up` builds it again.
+
+    Example:
+        .. code-block:: python
+
+            resources = LazyResourceRegistry()
+            resources.register("embeddings", build_embeddings)
+            resources.register("vectorstore", build_vectorstore, depends_on=["embeddings"])
+            resources.warm_up()                  # returns immediately
+            vectorstore = resources.get("vectorstore")
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        retry_backoff: float = 1.0,
+        max_retry_backoff: float = 60.0,
+    ):
+        self._resources: Dict[str, _Resource] = {}
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(
+        self,
+        name: str,
+        builder: Callable[[], Any],
+        depends_on: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Register (or replace, if not yet built) a resource builder."""
+        with self._lock:
+            existing = self._resources.get(name)
+            if existing is not None and existing.claimed:
+                raise RuntimeError(f"Resource '{name}' has already been built.")
+            self._resources[name] = _Resource(name, builder, depends_on or [])
+
+    def set(self, name: str, value: Any) -> None:
+        """Install an already built value, e.g. a fake backend for offline runs."""
+        resource = _Resource(name, lambda: value, [])
+        resource.claimed = True
+        resource.elapsed = 0.0
+        resource.future.set_result(value)
+        with self._lock:
+            self._resources[name] = resource
+
+    @staticmethod
+    def _release_if_retryable(resource: _Resource) -> None:
+        """Make a failed resource buildable again once its backoff has passed.
+        Callers that already hold the failed future still see its error."""
+        failed = resource.future.done() and resource.future.exception() is not None
+        if resource.claimed and failed and time.monotonic() >= resource.retry_at:
+            resource.future = Future()
+            resource.claimed = False
+
+    def _claim(self, name: str) -> Optional[_Resource]:
+        """Mark the resource as being built by the caller. Returns None if taken
+        (or if it failed and its retry backoff has not passed yet)."""
+        with self._lock:
+            if name not in self._resources:
+                raise KeyError(f"Unknown resource: {name}")
+            resource = self._resources[name]
+            self._release_if_retryable(resource)
+            if resource.claimed:
+                return None
+            resource.claimed = True
+            resource.started_at = time.perf_counter()
+            return resource
+
+    def _build(self, name: str) -> None:
+        resource = self._claim(name)
+        if resource is None:
+            return
+        try:
+            value = resource.builder()
+        except BaseException as e:
+            resource.elapsed = time.perf_counter() - resource.started_at
+            with self._lock:
+                resource.failures += 1
+                backoff = self.retry_backoff * 2 ** (resource.failures - 1)
+                resource.retry_at = time.monotonic() + min(backoff, self.max_retry_backoff)
+            resource.future.set_exception(e)
+        else:
+            resource.elapsed = time.perf_counter() - resource.started_at
+            resource.failures = 0
+            resource.future.set_result(value)
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Return the resource, building it in the calling thread if nobody has yet."""
+        self._build(name)
+        return self._resources[name].future.result(timeout=timeout)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> List[Future]:
+        """Start building resources in the background and return their futures.
+
+        Resources are submitted dependencies-last so that independent builders
+        (embedding model, AWS credentials, LLM clients) run in parallel.
+        """
+        with self._lock:
+            targets = list(names) if names is not None else list(self._resources)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers or max(len(self._resources), 1),
+                    thread_name_prefix="finpal-warmup",
+                )
+            # So the returned futures are those of the rebuilds, not of the failures
+            for name in targets:
+                self._release_if_retryable(self._resources[name])
+        targets.sort(key=lambda n: len(self._resources[n].depends_on))
+        for name in targets:
+            self._executor.submit(self._build, name)
+        return [self._resources[name].future for name in targets]
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every registered resource has been built. Returns readiness."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for resource in list(self._resources.values()):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                resource.future.result(timeout=remaining)
+            except Exception:
+                return False
+        return self.is_ready()
+
+    def state(self, name: str) -> str:
+        resource = self._resources[name]
+        if not resource.claimed:
+            return PENDING
+        if not resource.future.done():
+            return BUILDING
+        return FAILED if resource.future.exception() is not None else READY
+
+    def is_ready(self) -> bool:
+        return all(self.state(name) == READY for name in self._resources)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-resource state, build time and error message (for readiness probes)."""
+        report = {}
+        for name, resource in list(self._resources.items()):
+            state = self.state(name)
+            entry: Dict[str, Any] = {"state": state}
+            if resource.elapsed is not None:
+                entry["seconds"] = round(resource.elapsed, 3)
+            if state == FAILED:
+                entry["error"] = repr(resource.future.exception())
+                entry["failures"] = resource.failures
+            report[name] = entry
+        return report
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    version TEXT
+)
+"""
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+class SemanticCache:
+    """Answer cache keyed on the query embedding instead of the exact query text.
+
+    A lookup returns a stored answer when the cosine similarity between the new
+    query and a cached query is at least `similarity_threshold`, so near
+    duplicates ("what is inflation", "what is inflation?", "explain inflation")
+    share one entry. Entries expire after `ttl_seconds`, and the least recently
+    used ones are evicted beyond `max_entries`.
+
+    Expired entries are kept until `stale_ttl_seconds` (if longer than the
+    TTL) for `lookup_by_vector(..., allow_stale=True)`, i.e. as a fallback
+    while the source of the answers is unavailable. They are evicted first.
+
+    Entries can be tagged with a `version` of the data the answer was built
+    from (e.g. the generation of the index behind a RAG chain); a lookup for
+    another version treats them as misses, so answers built from deleted or
+    changed documents are not served after a re-index.
+
+    Hits only update the in-memory access times; those are written to SQLite
+    in batches (on `add`, every `ACCESS_FLUSH_BATCH` hits, or on `flush`), so
+    lookups never wait for a commit.
+
+    Entries are persisted in SQLite (so they survive restarts); the embeddings
+    are also held in memory as one normalized NumPy matrix, so a lookup is a
+    single matrix-vector product.
+
+    Example:
+        .. code-block:: python
+
+            cache = SemanticCache(embedding_function, path="answer_cache.sqlite3")
+            answer = cache.lookup("what is compounding?")
+            if answer is None:
+                answer = expensive_rag_call(...)
+                cache.add("what is compounding?", answer)
+    """
+
+    ACCESS_FLUSH_BATCH = 256
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        path: str = ":memory:",
+        similarity_threshold: float = 0.92,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        stale_ttl_seconds: Optional[float] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        if ttl_seconds is None:
+            stale_ttl_seconds = None
+        elif stale_ttl_seconds is None or stale_ttl_seconds < ttl_seconds:
+            stale_ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self._lock = threading.Lock()
+        # entry id -> last access time not yet written to SQLite
+        self._pending_access: Dict[int, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+        if "version" not in columns:
+            # Caches written before entries were versioned
+            self._conn.execute("ALTER TABLE answers ADD COLUMN version TEXT")
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the in-memory matrix from SQLite, dropping entries past the stale TTL."""
+        self._purge_expired_rows(time.time())
+        rows = self._conn.execute(
+            "SELECT id, embedding, created_at, last_access, version FROM answers ORDER BY id"
+        ).fetchall()
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._created_at = np.array([row[2] for row in rows], dtype=np.float64)
+        self._last_access = np.array([row[3] for row in rows], dtype=np.float64)
+        self._versions = np.array([row[4] for row in rows], dtype=object)
+        if rows:
+            self._matrix = np.vstack(
+                [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+            )
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    def _purge_expired_rows(self, now: float) -> None:
+        if self.stale_ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM answers WHERE created_at < ?", (now - self.stale_ttl_seconds,)
+            )
+            self._conn.commit()
+
+    def _write_pending_access(self) -> None:
+        """Queue the batched access times on the connection; the caller commits."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE answers SET last_access = ? WHERE id = ?",
+                [(accessed, entry_id) for entry_id, accessed in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+
+    def flush(self) -> None:
+        """Write the access times of recent hits to SQLite."""
+        with self._lock:
+            self._write_pending_access()
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent query, if any."""
+        hit = self.lookup_by_vector(self.embedding_function.embed_query(query))
+        return hit[0] if hit else None
+
+    async def alookup(self, query: str) -> Optional[str]:
+        """Async version of `lookup` (embeds with `aembed_query`)."""
+        hit = self.lookup_by_vector(await self.embedding_function.aembed_query(query))
+        return hit[0] if hit else None
+
+    def lookup_by_vector(
+        self,
+        embedding: List[float],
+        min_similarity: Optional[float] = None,
+        allow_stale: bool = False,
+        version: Optional[str] = None,
+    ) -> Optional[Tuple[str, float]]:
+        """Return (answer, similarity) of the closest live entry above the threshold.
+
+        `min_similarity` overrides the cache's threshold. With `version`, only
+        entries added with that version are considered. `allow_stale` also
+        considers entries past their TTL (up to `stale_ttl_seconds`) and of any
+        version, e.g. for a fallback answer while the knowledge base is
+        unreachable.
+        """
+        query_vector = _normalize(embedding)
+        now = time.time()
+        threshold = self.similarity_threshold if min_similarity is None else min_similarity
+        with self._lock:
+            if len(self._ids) == 0 or self._matrix.shape[1] != query_vector.shape[0]:
+                return None
+            similarities = self._matrix @ query_vector
+            if self.ttl_seconds is not None and not allow_stale:
+                similarities[self._created_at < now - self.ttl_seconds] = -np.inf
+            if version is not None and not allow_stale:
+                similarities[self._versions != version] = -np.inf
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < threshold:
+                return None
+            entry_id = int(self._ids[best])
+            self._last_access[best] = now
+            self._pending_access[entry_id] = now
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if len(self._pending_access) >= self.ACCESS_FLUSH_BATCH:
+                self._write_pending_access()
+                self._conn.commit()
+        return (row[0], similarity) if row else None
+
+    def add(
+        self,
+        query: str,
+        answer: str,
+        embedding: Optional[List[float]] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        """Store an answer; pass the query embedding if it was already computed,
+        and the `version` of the data the answer was built from, if any."""
+        if embedding is None:
+            embedding = self.embedding_function.embed_query(query)
+        vector = _normalize(embedding)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (query, answer, embedding, created_at, last_access, version) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, answer, vector.tobytes(), now, now, version),
+            )
+            self._write_pending_access()
+            self._conn.commit()
+            if len(self._ids) == 0 or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = vector.reshape(1, -1)
+                self._ids = np.array([cursor.lastrowid], dtype=np.int64)
+                self._created_at = np.array([now])
+                self._last_access = np.array([now])
+                self._versions = np.array([version], dtype=object)
+            else:
+                self._matrix = np.vstack([self._matrix, vector])
+                self._ids = np.append(self._ids, cursor.lastrowid)
+                self._created_at = np.append(self._created_at, now)
+                self._last_access = np.append(self._last_access, now)
+                self._versions = np.append(self._versions, np.array([version], dtype=object))
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop entries past the stale TTL, then stale and least recently used
+        ones (in that order) beyond max_entries."""
+        keep = np.ones(len(self._ids), dtype=bool)
+        stale = np.zeros(len(self._ids), dtype=bool)
+        if self.stale_ttl_seconds is not None:
+            keep &= self._created_at >= now - self.stale_ttl_seconds
+            stale = self._created_at < now - self.ttl_seconds
+        overflow = int(keep.sum()) - self.max_entries
+        if overflow > 0:
+            live = np.flatnonzero(keep)
+            # lexsort sorts by the last key first: stale entries, then oldest access
+            lru = live[np.lexsort((self._last_access[live], ~stale[live]))[:overflow]]
+            keep[lru] = False
+        if keep.all():
+            return
+        dropped = [(int(entry_id),) for entry_id in self._ids[~keep]]
+        for (entry_id,) in dropped:
+            self._pending_access.pop(entry_id, None)
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", dropped)
+        self._conn.commit()
+        self._matrix = self._matrix[keep]
+        self._ids = self._ids[keep]
+        self._created_at = self._created_at[keep]
+        self._last_access = self._last_access[keep]
+        self._versions = self._versions[keep]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._pending_access.clear()
+            self._load()
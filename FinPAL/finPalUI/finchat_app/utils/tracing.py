@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "finpal_current_span", default=None
+)
+
+
+class SpanSink(Protocol):
+    """Receives every finished span. `export` must be cheap; do slow I/O elsewhere.
+
+    A sink may also define `on_start(span)`, called when a span is entered
+    (used for in-progress gauges), and set `records_payloads = False` when it
+    never reads payload sizes (the `*_bytes` attributes): while only such
+    sinks are registered, instrumented code skips computing them.
+    """
+
+    def export(self, span: "Span") -> None:
+        ...
+
+    def shutdown(self) -> None:
+        ...
+
+
+class Span:
+    """A timed unit of work (turn, step, LLM call, tool call, search, ...).
+
+    Attributes follow the OpenTelemetry model: a flat dict of str/int/float/bool
+    values. Spans started while another span is current become its children.
+    """
+
+    is_recording = True
+
+    @property
+    def records_payloads(self) -> bool:
+        """Whether a registered sink wants payload sizes (see `payload_size`)."""
+        return self.tracer.records_payloads
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_time_ns = time.time_ns()
+        self._start_perf = time.perf_counter()
+        self.end_time_ns: Optional[int] = None
+        self.duration_s: Optional[float] = None
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def end(self) -> None:
+        if self.end_time_ns is not None:
+            return
+        self.duration_s = time.perf_counter() - self._start_perf
+        self.end_time_ns = self.start_time_ns + int(self.duration_s * 1e9)
+        self.tracer._export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.tracer._start(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> bool:
+        if exc is not None and self.error is None:
+            self.record_exception(exc)
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Exited in another context (e.g. an async generator resumed by a different task)
+                _current_span.set(None)
+        self.end()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "duration_ms": None if self.duration_s is None else round(self.duration_s * 1000, 3),
+            "attributes": self.attributes,
+            "status": "ERROR" if self.error else "OK",
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+
+    is_recording = False
+    records_payloads = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and hands finished ones to the registered sinks.
+
+    With no sink registered the tracer is disabled: `span()` returns a shared
+    no-op object and `traced` functions are called directly, so instrumented
+    code costs one attribute check. Code that computes attributes should guard
+    it with `span.is_recording`, and payload sizes (which serialize the whole
+    payload) with `span.records_payloads`, which is False while the only
+    sinks are ones that do not read them, such as the Prometheus metrics.
+
+    Example:
+        .. code-block:: python
+
+            tracer.add_sink(JsonlSpanSink("finpal_traces.jsonl"))
+            with tracer.span("llm.call", model="mistral-small") as span:
+                response = llm.invoke(messages)
+                span.set_attribute("llm.output_tokens", 42)
+    """
+
+    def __init__(self) -> None:
+        self._sinks: List[SpanSink] = []
+        self._start_hooks: List[Callable[["Span"], None]] = []
+        self.enabled = False
+        self.records_payloads = False
+
+    def _sinks_changed(self) -> None:
+        self._start_hooks = [s.on_start for s in self._sinks if hasattr(s, "on_start")]
+        self.enabled = bool(self._sinks)
+        self.records_payloads = any(getattr(s, "records_payloads", True) for s in self._sinks)
+
+    def add_sink(self, sink: SpanSink) -> None:
+        self._sinks.append(sink)
+        self._sinks_changed()
+
+    def remove_sink(self, sink: SpanSink) -> None:
+        self._sinks.remove(sink)
+        self._sinks_changed()
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        """Context manager timing the enclosed block as a child of the current span."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes)
+
+    def current_span(self) -> Any:
+        """The innermost active span, or the no-op span; handy for adding attributes."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return _current_span.get() or NOOP_SPAN
+
+    def _start(self, span: Span) -> None:
+        for hook in self._start_hooks:
+            try:
+                hook(span)
+            except Exception:
+                pass
+
+    def _export(self, span: Span) -> None:
+        for sink in list(self._sinks):
+            try:
+                sink.export(span)
+            except Exception:
+                pass  # Telemetry must never break a request
+
+    def shutdown(self) -> None:
+        for sink in list(self._sinks):
+            sink.shutdown()
+
+
+tracer = Tracer()
+
+
+def traced(name: str, **attributes: Any) -> Callable[[Callable], Callable]:
+    """Decorator wrapping every call of a function, coroutine function or async
+    generator function in a span named `name`."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def agen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not tracer.enabled:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                with tracer.span(name, **attributes):
+                    async for item in func(*args, **kwargs):
+                        yield item
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(name, **attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def run_in_context(func: Callable, *args: Any, **kwargs: Any) -> Callable[[], Any]:
+    """Bind `func` to a copy of the current context, so spans it opens on a
+    worker thread (ThreadPoolExecutor does not propagate contextvars) keep
+    the caller's span as their parent."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func, *args, **kwargs)
+
+
+def payload_size(value: Any) -> int:
+    """Approximate size in bytes of a message, tool payload or request body."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(value).encode("utf-8"))
+
+
+class _BackgroundSink:
+    """Queues spans and writes them in batches on a daemon thread."""
+
+    def __init__(self, batch_size: int = 256, flush_interval_s: float = 2.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"finpal-{type(self).__name__}", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.dropped += len(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class JsonlSpanSink(_BackgroundSink):
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path: str, **kwargs: Any):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in batch:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanSink(_BackgroundSink):
+    """Posts spans to an OTLP/HTTP collector (`/v1/traces`, JSON encoding), e.g.
+    the OpenTelemetry Collector, Jaeger or Tempo."""
+
+    def __init__(
+        self,
+        endpoint: str = "http://localhost:4318/v1/traces",
+        service_name: str = "finpal",
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: float = 5.0,
+        **kwargs: Any,
+    ):
+        import requests
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout_s = timeout_s
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json", **(headers or {})})
+        super().__init__(**kwargs)
+
+    def _encode(self, batch: List[Span]) -> Dict[str, Any]:
+        spans = []
+        for span in batch:
+            encoded = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_time_ns),
+                "endTimeUnixNano": str(span.end_time_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                ],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_span_id:
+                encoded["parentSpanId"] = span.parent_span_id
+            spans.append(encoded)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "finpal"}, "spans": spans}],
+            }]
+        }
+
+    def _write(self, batch: List[Span]) -> None:
+        response = self._session.post(self.endpoint, json=self._encode(batch), timeout=self.timeout_s)
+        response.raise_for_status()
+
+
+def configure_tracing_from_env() -> None:
+    """Register the sink selected by FINPAL_TRACING ("jsonl", "otlp" or off).
+
+    FINPAL_TRACE_FILE sets the JSONL path (default finpal_traces.jsonl);
+    FINPAL_OTLP_ENDPOINT and FINPAL_SERVICE_NAME configure the OTLP exporter.
+    """
+    mode = os.getenv("FINPAL_TRACING", "").strip().lower()
+    if mode == "jsonl":
+        tracer.add_sink(JsonlSpanSink(os.getenv("FINPAL_TRACE_FILE", "finpal_traces.jsonl")))
+    elif mode == "otlp":
+        tracer.add_sink(OtlpHttpSpanSink(
+            endpoint=os.getenv("FINPAL_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+            service_name=os.getenv("FINPAL_SERVICE_NAME", "finpal"),
+        ))
+    else:
+        return
+    atexit.register(tracer.shutdown)
+
+
+def iter_spans(path: str) -> Iterator[Dict[str, Any]]:
+    """Read back a JSONL trace file written by JsonlSpanSink."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# knn_vector encodings understood by OpenSearchVectorSearch:
+#   float - 32-bit floats (OpenSearch default)
+#   fp16  - faiss scalar quantization to 16-bit floats in the index; vectors travel
+#           as floats rounded to FP16_DECIMALS decimals
+#   byte  - `data_type: byte` (lucene/faiss); vectors are scaled by `scale` and
+#           rounded to int8, both in the index and on the wire
+VECTOR_DATA_TYPES = ("float", "fp16", "byte")
+FP16_DECIMALS = 5
+PQ_FIELD = "vector_pq"
+
+
+def fit_byte_scale(vectors: Any, percentile: float = 99.9) -> float:
+    """Scale mapping the given vectors' components onto the int8 range.
+
+    Uses a high percentile of the absolute values rather than the maximum, so
+    a few outliers are clipped instead of wasting most of the 256 levels.
+    """
+    magnitude = float(np.percentile(np.abs(np.asarray(vectors, dtype=np.float32)), percentile))
+    return 127.0 / magnitude if magnitude > 0 else 1.0
+
+
+def encode_vectors(vectors: Any, encoding: Optional[Dict[str, Any]]) -> List[list]:
+    """Vectors as JSON-ready lists for the given index encoding."""
+    data_type = (encoding or {}).get("data_type", "float")
+    if data_type == "byte":
+        scaled = np.rint(np.asarray(vectors, dtype=np.float32) * encoding["scale"])
+        return np.clip(scaled, -128, 127).astype(np.int8).tolist()
+    if data_type == "fp16":
+        # Rounded in float64 so the JSON carries short literals ("0.01233", not "0.012329101562")
+        return np.round(np.asarray(vectors, dtype=np.float64), FP16_DECIMALS).tolist()
+    return np.asarray(vectors, dtype=np.float32).tolist()
+
+
+def decode_vectors(rows: Sequence[Sequence[float]], encoding: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Vectors read back from `_source` as a float32 matrix in embedding space."""
+    matrix = np.asarray(rows, dtype=np.float32)
+    if (encoding or {}).get("data_type") == "byte":
+        matrix /= encoding["scale"]
+    return matrix
+
+
+def _kmeans(points: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = points[rng.choice(len(points), size=k, replace=False)].copy()
+    point_norms = np.einsum("ij,ij->i", points, points)
+    for _ in range(iterations):
+        distances = (
+            point_norms[:, None]
+            - 2 * points @ centroids.T
+            + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        )
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters on the points worst served by their centroid
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            worst = np.argsort(distances[np.arange(len(points)), assignment])[-len(empty):]
+            centroids[empty] = points[worst]
+    return centroids
+
+
+class ProductQuantizer:
+    """Product quantizer: a vector is split into `m` sub-vectors, each replaced
+    by the id of its nearest of 256 centroids, i.e. `m` bytes per vector.
+
+    For 768-dim embeddings and m=96 that is 96 bytes instead of 3 KiB of
+    float32 (or ~15 KiB of JSON), at a reconstruction error well below what
+    MMR's diversity term can notice.
+
+    Example:
+        .. code-block:: python
+
+            pq = ProductQuantizer.fit(sample_embeddings, m=96)
+            codes = pq.encode(embeddings)          # (n, 96) uint8
+            approx = pq.decode(codes)              # (n, 768) float32
+    """
+
+    def __init__(self, codebooks: np.ndarray):
+        # (m, ksub, dsub)
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)
+
+    @property
+    def m(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.codebooks.shape[0] * self.codebooks.shape[2]
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(self.codebooks.astype(np.float16).tobytes()).hexdigest()[:16]
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: Any,
+        m: int = 96,
+        ksub: int = 256,
+        iterations: int = 20,
+        max_training_points: int = 20000,
+        seed: int = 0,
+    ) -> ProductQuantizer:
+        """Train the codebooks with k-means on (a sample of) `vectors`."""
+        points = np.asarray(vectors, dtype=np.float32)
+        n, dimension = points.shape
+        if dimension % m:
+            raise ValueError(f"dimension {dimension} is not divisible by m={m}")
+        if not 1 <= ksub <= 256:
+            raise ValueError("ksub must be between 1 and 256 (codes are stored as bytes)")
+        if n < ksub:
+            raise ValueError(f"need at least ksub={ksub} training vectors, got {n}")
+        rng = np.random.default_rng(seed)
+        if n > max_training_points:
+            points = points[rng.choice(n, size=max_training_points, replace=False)]
+        dsub = dimension // m
+        codebooks = np.stack([
+            _kmeans(points[:, i * dsub:(i + 1) * dsub], ksub, iterations, rng) for i in range(m)
+        ])
+        # Rounded to what to_dict() stores, so every reader decodes with the same codebooks
+        return cls(codebooks.astype(np.float16))
+
+    def encode(self, vectors: Any) -> np.ndarray:
+        points = np.asarray(vectors, dtype=np.float32).reshape(-1, self.m, self.codebooks.shape[2])
+        codes = np.empty((len(points), self.m), dtype=np.uint8)
+        for i, codebook in enumerate(self.codebooks):
+            sub = points[:, i, :]
+            distances = -2 * sub @ codebook.T + np.einsum("ij,ij->i", codebook, codebook)[None, :]
+            codes[:, i] = distances.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        codes = np.asarray(codes, dtype=np.intp)
+        # codebooks[i, codes[:, i]] for every sub-space at once -> (n, m, dsub)
+        parts = self.codebooks[np.arange(self.m)[None, :], codes]
+        return parts.reshape(len(codes), -1)
+
+    def encode_base64(self, vectors: Any) -> List[str]:
+        """Codes as base64 strings, the form stored in the `binary` PQ_FIELD."""
+        return [base64.b64encode(row.tobytes()).decode("ascii") for row in self.encode(vectors)]
+
+    def decode_base64(self, encoded: Sequence[str]) -> np.ndarray:
+        raw = b"".join(base64.b64decode(value) for value in encoded)
+        return self.decode(np.frombuffer(raw, dtype=np.uint8).reshape(len(encoded), self.m))
+
+    def to_dict(self) -> Dict[str, Any]:
+        # float16 codebooks: half the size, and far below the quantization error anyway
+        return {
+            "shape": list(self.codebooks.shape),
+            "codebooks": base64.b64encode(self.codebooks.astype(np.float16).tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> ProductQuantizer:
+        raw = np.frombuffer(base64.b64decode(data["codebooks"]), dtype=np.float16)
+        return cls(raw.reshape(data["shape"]).astype(np.float32))
+
+    def save(self, path: str) -> None:
+        np.save(path, self.codebooks)
+
+    @classmethod
+    def load(cls, path: str) -> ProductQuantizer:
+        return cls(np.load(path))